@@ -0,0 +1,107 @@
+import math
+import time
+from config_loader import CONFIG
+
+
+class AdaptiveIntervalController:
+    """
+    自适应分析间隔
+
+    跟踪端到端模型延迟和画面运动强度的滑动平均，在[min_interval, max_interval]之间选择下一次分析的间隔：
+    延迟每次分析更新一次，使用系数alpha；运动强度每帧更新，按时间常数motion_time_constant平滑，
+    与摄像头帧率无关。
+    运动越强间隔越短；同时间隔不低于 平均延迟 / target_utilization，保证模型不会被持续占满，
+    慢机器上不再堆积或丢弃触发，快机器上则更密集地采样。
+    """
+
+    def __init__(self, min_interval=None, max_interval=None, alpha=None, target_utilization=None,
+                 motion_full_scale=None, motion_time_constant=None, enabled=None):
+        """
+        Args:
+            min_interval/max_interval: 间隔上下限（秒）
+            alpha: 延迟滑动平均系数（每次分析更新一次）
+            target_utilization: 模型忙碌时间占比上限（0~1）
+            motion_full_scale: 运动面积占画面的比例达到该值时视为最强运动
+            motion_time_constant: 运动强度滑动平均的时间常数（秒），约等于平均覆盖的时长
+            enabled: 是否启用；关闭时使用固定间隔motion_detector.script_interval
+        """
+        adaptive_config = CONFIG.get("adaptive_interval", {})
+        self.enabled = enabled if enabled is not None else adaptive_config.get("enabled", True)
+        self.fixed_interval = CONFIG["motion_detector"].get("script_interval", 5.0)
+        self.min_interval = min_interval if min_interval is not None else adaptive_config.get("min_interval", 2.0)
+        self.max_interval = max_interval if max_interval is not None else adaptive_config.get("max_interval", 10.0)
+        self.alpha = alpha if alpha is not None else adaptive_config.get("alpha", 0.3)
+        self.target_utilization = target_utilization or adaptive_config.get("target_utilization", 0.5)
+        self.motion_full_scale = motion_full_scale or adaptive_config.get("motion_full_scale", 0.25)
+        self.motion_time_constant = max(1e-3, motion_time_constant or adaptive_config.get("motion_time_constant", 2.0))
+
+        self.interval = self.fixed_interval
+        self.latency_ema = None
+        self.motion_ema = 0.0
+        self._last_motion_time = None
+        self._logged_interval = self.interval
+
+        # 统计信息
+        self.analysis_count = 0
+        self.dropped_count = 0
+
+    def record_motion(self, motion_area, frame_shape):
+        """记录一帧的运动面积（唤醒模式下每帧调用）"""
+        frame_area = frame_shape[0] * frame_shape[1]
+        intensity = min(1.0, motion_area / max(frame_area * self.motion_full_scale, 1))
+        # 按距上一帧的时间计算平滑系数；唤醒后的第一帧（或长时间间隔）最多按一个时间常数计算
+        now = time.time()
+        elapsed = self.motion_time_constant if self._last_motion_time is None else now - self._last_motion_time
+        self._last_motion_time = now
+        motion_alpha = 1.0 - math.exp(-min(elapsed, self.motion_time_constant) / self.motion_time_constant)
+        self.motion_ema += motion_alpha * (intensity - self.motion_ema)
+        self.update()
+
+    def record_latency(self, latency):
+        """记录一次分析的端到端耗时（秒）"""
+        self.analysis_count += 1
+        if self.latency_ema is None:
+            self.latency_ema = latency
+        else:
+            self.latency_ema += self.alpha * (latency - self.latency_ema)
+        self.update()
+
+    def record_dropped(self):
+        """记录一次因上一次分析仍在进行而放弃的触发"""
+        self.dropped_count += 1
+        print(f"[{time.strftime('%H:%M:%S')}] 上一次分析仍在进行，放弃本次触发（累计 {self.dropped_count} 次）")
+
+    def update(self):
+        """重新计算分析间隔，变化超过10%时写日志"""
+        if not self.enabled:
+            self.interval = self.fixed_interval
+            return self.interval
+
+        # 运动越强越接近下限
+        interval = self.max_interval - (self.max_interval - self.min_interval) * self.motion_ema
+        # 延迟下限：模型忙碌时间不超过target_utilization
+        if self.latency_ema is not None:
+            interval = max(interval, self.latency_ema / self.target_utilization)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+
+        if abs(self.interval - self._logged_interval) > 0.1 * self._logged_interval:
+            self._logged_interval = self.interval
+            print(f"[{time.strftime('%H:%M:%S')}] {self.describe()}")
+        return self.interval
+
+    def describe(self):
+        """当前决策的简要说明（用于状态栏和日志）"""
+        if not self.enabled:
+            return f"分析间隔 {self.interval:.1f}s（固定）"
+        latency = f"{self.latency_ema:.1f}s" if self.latency_ema is not None else "未知"
+        return f"分析间隔 {self.interval:.1f}s（延迟 {latency}，运动 {self.motion_ema * 100:.0f}%）"
+
+    def get_statistics(self):
+        """获取统计信息"""
+        return {
+            'interval': self.interval,
+            'latency_ema': self.latency_ema,
+            'motion_ema': self.motion_ema,
+            'analyses': self.analysis_count,
+            'dropped': self.dropped_count
+        }
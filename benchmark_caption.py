@@ -0,0 +1,100 @@
+import argparse
+import statistics
+import time
+
+from config_loader import CONFIG
+from benchmark_inference import load_frame
+from image_caption_interface import GROUP_BEAM_SEARCH_AVAILABLE, ImageCaptionInterface
+
+
+def legacy_captions_for_frame(caption_interface, frame, num_captions=3, num_beams=5, max_length=150):
+    """旧实现：逐条调用generate_caption，每次重新预处理和完整beam search"""
+    results = []
+    for i in range(num_captions):
+        caption = caption_interface.generate_caption(
+            frame,
+            num_beams=num_beams + i,
+            max_length=max_length,
+            repetition_penalty=1.5 + i * 0.1,
+            profile="quality",
+            time_budget=0
+        )
+        results.append({'caption_id': i + 1, 'caption': caption})
+    return results
+
+
+def time_runs(fn, runs):
+    """重复执行并返回每次耗时（秒）与最后一次结果"""
+    timings = []
+    result = None
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start_time)
+    return timings, result
+
+
+def print_timings(name, timings):
+    print(f"{name:<24} 平均 {statistics.mean(timings):7.3f}s | 中位数 {statistics.median(timings):7.3f}s | "
+          f"最小 {min(timings):7.3f}s")
+
+
+def bench_diverse_captions(caption_interface, frame, num_captions, runs):
+    """多样化描述：旧的N次循环 vs 单次generate"""
+    print(f"=== 单帧{num_captions}条描述：逐条循环 vs 单次generate ===")
+    if not GROUP_BEAM_SEARCH_AVAILABLE:
+        print("注意：当前transformers版本不内置分组beam search，分组beam一项实际使用采样")
+    legacy, legacy_result = time_runs(
+        lambda: legacy_captions_for_frame(caption_interface, frame, num_captions), runs
+    )
+    diverse, diverse_result = time_runs(
+        lambda: caption_interface.generate_captions_for_frame(frame, num_captions, method="diverse_beam",
+                                                              time_budget=0), runs
+    )
+    sampling, sampling_result = time_runs(
+        lambda: caption_interface.generate_captions_for_frame(frame, num_captions, method="sampling",
+                                                              time_budget=0), runs
+    )
+    print_timings("逐条循环（旧）", legacy)
+    print_timings("分组beam search", diverse)
+    print_timings("top-p采样", sampling)
+    print(f"加速比（旧/分组beam）: {statistics.mean(legacy) / statistics.mean(diverse):.1f}x")
+    for name, result in (("逐条循环", legacy_result), ("分组beam", diverse_result), ("采样", sampling_result)):
+        print(f"  {name}: {[item['caption'] for item in result]}")
+
+
+def bench_batch_captions(caption_interface, frame, num_frames, batch_size, runs):
+    """批量描述：逐帧generate_caption vs 分块批量generate"""
+    print(f"=== {num_frames} 帧批量描述：逐帧 vs 分块（batch_size={batch_size}）===")
+    frames = [frame.copy() for _ in range(num_frames)]
+    per_frame, _ = time_runs(
+        lambda: [caption_interface.generate_caption(f, time_budget=0) for f in frames], runs
+    )
+    batched, _ = time_runs(
+        lambda: list(caption_interface.batch_generate_captions(frames, batch_size=batch_size, time_budget=0)), runs
+    )
+    print_timings("逐帧（旧）", per_frame)
+    print_timings("分块批量", batched)
+    print(f"吞吐量: 逐帧 {num_frames / statistics.mean(per_frame):.2f} 帧/秒 | "
+          f"分块 {num_frames / statistics.mean(batched):.2f} 帧/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图像描述生成基准测试")
+    parser.add_argument("--image", help="测试图片路径（默认使用随机帧）")
+    parser.add_argument("--runs", type=int, default=3, help="重复次数")
+    parser.add_argument("--num-captions", type=int, default=3, help="单帧生成的描述数量")
+    parser.add_argument("--num-frames", type=int, default=16, help="批量测试的帧数")
+    parser.add_argument("--batch-size", type=int, default=8, help="批量测试的分块大小")
+    args = parser.parse_args()
+
+    frame = load_frame(args.image)
+    # 不启用视觉特征缓存，保证每种方式都包含完整的预处理和编码开销
+    caption_interface = ImageCaptionInterface(CONFIG["models"]["image_caption_path"])
+
+    bench_diverse_captions(caption_interface, frame, args.num_captions, args.runs)
+    bench_batch_captions(caption_interface, frame, args.num_frames, args.batch_size, args.runs)
+
+
+if __name__ == "__main__":
+    main()
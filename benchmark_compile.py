@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from config_loader import CONFIG
+
+
+def run_child(compiled, warmup, runs, image_path):
+    """子进程：加载两个模型，测量首次调用和稳态延迟"""
+    CONFIG["backend"].setdefault("compile", {})["enabled"] = compiled
+    from benchmark_inference import load_frame
+    from vqa_interface import VQAInterface
+    from image_caption_interface import ImageCaptionInterface
+
+    frame = load_frame(image_path)
+    questions = CONFIG["emergency"]["questions"]
+    binary = CONFIG["emergency"].get("binary_fast_path", True)
+
+    start_time = time.perf_counter()
+    vqa = VQAInterface(model_path=CONFIG["models"]["vqa_path"])
+    caption_interface = ImageCaptionInterface(CONFIG["models"]["image_caption_path"], warmup=False)
+    load_time = time.perf_counter() - start_time
+
+    warmup_time = 0.0
+    if warmup:
+        start_time = time.perf_counter()
+        vqa.warmup()
+        caption_interface.warmup()
+        warmup_time = time.perf_counter() - start_time
+
+    def timed(fn):
+        start_time = time.perf_counter()
+        fn()
+        return time.perf_counter() - start_time
+
+    # 与运行时相同的调用方式：问题级联逐个提问，调度器合批生成描述
+    ask = lambda: vqa.answer_frames([(frame, [questions[0]], None)], binary=binary)
+    describe = lambda: caption_interface.generate_captions([frame])
+    first_vqa = timed(ask)
+    first_caption = timed(describe)
+    steady_vqa = [timed(ask) for _ in range(runs)]
+    steady_caption = [timed(describe) for _ in range(runs)]
+
+    print("RESULT " + json.dumps({
+        'load_time': load_time,
+        'warmup_time': warmup_time,
+        'first_vqa': first_vqa,
+        'first_caption': first_caption,
+        'steady_vqa': statistics.median(steady_vqa),
+        'steady_caption': statistics.median(steady_caption)
+    }), flush=True)
+
+
+def run_mode(compiled, warmup, runs, image_path, cache_dir):
+    """在独立进程中运行一种模式（每次都是冷启动），返回结果字典"""
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--runs", str(runs)]
+    if compiled:
+        command.append("--compiled")
+    if warmup:
+        command.append("--warmup")
+    if image_path:
+        command += ["--image", image_path]
+    env = dict(os.environ, TORCHINDUCTOR_CACHE_DIR=cache_dir)
+    output = subprocess.run(command, stdout=subprocess.PIPE, text=True, env=env).stdout
+    for line in output.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编译模式基准测试：eager vs torch.compile（冷/热编译缓存）的首次调用与稳态延迟")
+    parser.add_argument("--image", help="测试图片路径（默认使用随机帧）")
+    parser.add_argument("--runs", type=int, default=10, help="稳态测量次数")
+    parser.add_argument("--warmup", action="store_true", help="首次调用前先运行warmup()（测量预热后的首次调用）")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--compiled", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.compiled, args.warmup, args.runs, args.image)
+        return
+
+    # 冷缓存使用新建的临时目录；热缓存复用同一目录，模拟重启后命中持久化的编译产物
+    cache_dir = tempfile.mkdtemp(prefix="compile_cache_")
+    modes = (
+        ("eager", False),
+        ("编译（冷缓存）", True),
+        ("编译（热缓存）", True),
+    )
+    print(f"=== 编译模式基准（稳态 {args.runs} 次，{'预热后' if args.warmup else '不预热'}）===")
+    for name, compiled in modes:
+        result = run_mode(compiled, args.warmup, args.runs, args.image, cache_dir)
+        if result is None:
+            print(f"{name:<14} 没有结果")
+            continue
+        print(f"{name:<14} 加载 {result['load_time']:6.2f}s | 预热 {result['warmup_time']:6.2f}s | "
+              f"首次提问 {result['first_vqa'] * 1000:8.1f}ms | 首次描述 {result['first_caption'] * 1000:8.1f}ms | "
+              f"稳态提问 {result['steady_vqa'] * 1000:7.1f}ms | 稳态描述 {result['steady_caption'] * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
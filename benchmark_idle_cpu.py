@@ -0,0 +1,136 @@
+import argparse
+import time
+
+import cv2
+from config_loader import CONFIG
+from frame_capture import SleepAwareCapture
+from motion_pipeline import MotionAnalyzer
+
+
+class SleepingDetector:
+    """始终休眠的检测器：与MotionDetector相同的休眠跳帧计划，分析帧只做休眠模式运动检测"""
+
+    def __init__(self):
+        detector_config = CONFIG["motion_detector"]
+        self.is_sleeping = True
+        self.sleep_frame_skip = detector_config.get("sleep_frame_skip", 5)
+        self.sleep_frame_counter = 0
+        self.min_area = detector_config["min_contour_area"] // 2
+        self.motion_analyzer = MotionAnalyzer()
+        self.analyzed_frames = 0
+
+    def will_skip_next_frame(self):
+        return (self.sleep_frame_counter + 1) % self.sleep_frame_skip != 0
+
+    def skip_frame(self):
+        self.sleep_frame_counter += 1
+
+    def process_frame(self, frame):
+        self.sleep_frame_counter += 1
+        if self.sleep_frame_counter % self.sleep_frame_skip != 0:
+            return
+        self.motion_analyzer.detect(frame, self.min_area, area_only=True)
+        self.analyzed_frames += 1
+
+
+def open_clip(path):
+    """
+    打开录制的MJPG AVI视频
+
+    使用OpenCV内置的MJPEG后端：grab()只读取压缩数据，retrieve()才解码JPEG，
+    与UVC摄像头的MJPEG模式一致（FFmpeg后端在grab()中就会解码，无法体现只grab的收益）。
+    """
+    cap = cv2.VideoCapture(path, cv2.CAP_OPENCV_MJPEG)
+    return cap if cap.isOpened() else None
+
+
+def open_camera(index):
+    """按配置打开摄像头并预热"""
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        return None
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, CONFIG["camera"]["width"])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CONFIG["camera"]["height"])
+    cap.set(cv2.CAP_PROP_FPS, CONFIG["camera"]["fps"])
+    for _ in range(CONFIG["camera"].get("preheat_frames", 10)):
+        cap.read()
+    return cap
+
+
+def measure_idle(index, duration, grab_skip, sleep_fps, clip=None):
+    """
+    在休眠状态下运行一段时间，测量进程CPU占用
+
+    Args:
+        clip: 录制的视频文件，循环回放并按camera.fps控制节奏来代替摄像头
+
+    Returns:
+        dict或None: CPU占用（单核百分比）、分析帧率、解码帧数、只grab的帧数；摄像头或视频打不开时返回None
+    """
+    cap = open_clip(clip) if clip else open_camera(index)
+    if cap is None:
+        return None
+    detector = SleepingDetector()
+    capture = SleepAwareCapture(detector, grab_skip=grab_skip, sleep_fps=sleep_fps)
+    frame_interval = 1.0 / CONFIG["camera"]["fps"]
+    try:
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        next_frame_time = wall_start
+        while time.perf_counter() - wall_start < duration:
+            if clip:
+                # 按摄像头帧率回放，CPU占用才与实时采集可比
+                next_frame_time += frame_interval
+                time.sleep(max(0.0, next_frame_time - time.perf_counter()))
+            ret, frame = capture.read(cap)
+            if not ret:
+                if clip:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+            if frame is not None:
+                detector.process_frame(frame)
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+    finally:
+        capture.restore(cap)
+        cap.release()
+    stats = capture.get_statistics()
+    return {
+        'cpu_percent': cpu_time / wall_time * 100,
+        'analyzed_fps': detector.analyzed_frames / wall_time,
+        'decoded_frames': stats['decoded_frames'],
+        'grabbed_frames': stats['grabbed_frames']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="休眠待机CPU基准测试：逐帧解码 vs 跳过的帧只grab vs 降低休眠采集帧率")
+    parser.add_argument("--camera", type=int, default=0, help="摄像头编号")
+    parser.add_argument("--clip", help="用录制的MJPG AVI视频代替摄像头（不测量降低采集帧率的模式）")
+    parser.add_argument("--duration", type=float, default=60.0, help="每种模式的测量时长（秒）")
+    parser.add_argument("--sleep-fps", type=int, default=CONFIG["camera"].get("sleep_fps") or 10,
+                        help="降低帧率模式使用的休眠采集帧率")
+    args = parser.parse_args()
+
+    modes = (
+        ("逐帧解码（原有）", False, 0),
+        ("跳过帧只grab", True, 0),
+        (f"只grab + {args.sleep_fps}fps", True, args.sleep_fps),
+    )
+    if args.clip:
+        # 视频文件不能修改采集帧率
+        modes = modes[:2]
+    print(f"=== 休眠待机CPU（每种模式 {args.duration:.0f}秒，"
+          f"每 {CONFIG['motion_detector'].get('sleep_frame_skip', 5)} 帧分析一帧）===")
+    for name, grab_skip, sleep_fps in modes:
+        result = measure_idle(args.camera, args.duration, grab_skip, sleep_fps, clip=args.clip)
+        if result is None:
+            print("错误：无法打开视频" if args.clip else "错误：无法打开摄像头")
+            return
+        print(f"{name:<16} CPU {result['cpu_percent']:6.1f}% | 分析 {result['analyzed_fps']:5.1f} fps | "
+              f"解码 {result['decoded_frames']} 帧, 只grab {result['grabbed_frames']} 帧")
+
+
+if __name__ == "__main__":
+    main()
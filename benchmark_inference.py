@@ -0,0 +1,121 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from config_loader import CONFIG
+
+
+def load_frame(image_path=None):
+    """读取测试帧；未指定图片时生成与摄像头同尺寸的随机帧"""
+    if image_path:
+        frame = cv2.imread(image_path)
+        if frame is None:
+            raise FileNotFoundError(f"无法读取图片: {image_path}")
+        return frame
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (CONFIG["camera"]["height"], CONFIG["camera"]["width"], 3), dtype=np.uint8)
+
+
+def analyze_frame(vqa, caption_interface, frame):
+    """执行一次与starting_main.py相同的分析：紧急问题、可疑问题、图像描述"""
+    binary = CONFIG["emergency"].get("binary_fast_path", True)
+    vqa.batch_answer_questions(frame, CONFIG["emergency"]["questions"], binary=binary)
+    vqa.batch_answer_questions(frame, CONFIG["emergency"]["suspicious_questions"], binary=binary)
+    caption_interface.generate_caption(frame)
+
+
+def run_cold_child(frame_path):
+    """旧流程：子进程导入torch并从磁盘加载两个模型后再回答"""
+    from vqa_interface import VQAInterface
+    from image_caption_interface import ImageCaptionInterface
+
+    frame = np.load(frame_path)
+    vqa = VQAInterface(model_path=CONFIG["models"]["vqa_path"])
+    caption_interface = ImageCaptionInterface(CONFIG["models"]["image_caption_path"])
+    analyze_frame(vqa, caption_interface, frame)
+
+
+def run_client_child(frame_path):
+    """新流程：子进程作为瘦客户端连接常驻推理服务"""
+    from inference_service import InferenceClient
+
+    frame = np.load(frame_path)
+    client = InferenceClient()
+    analyze_frame(client, client, frame)
+    client.close()
+
+
+def time_subprocess(mode, frame_path, runs):
+    """测量从启动子进程到得到全部答案的时间"""
+    timings = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, os.path.abspath(__file__), mode, frame_path], check=True)
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+
+def print_timings(name, timings):
+    print(f"{name:<28} 平均 {statistics.mean(timings):7.3f}s | 中位数 {statistics.median(timings):7.3f}s | "
+          f"最小 {min(timings):7.3f}s | 最大 {max(timings):7.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="触发到回答的延迟基准测试：子进程冷启动 vs 常驻推理服务")
+    parser.add_argument("--image", help="测试图片路径（默认使用随机帧）")
+    parser.add_argument("--runs", type=int, default=3, help="每种方式的重复次数")
+    parser.add_argument("--cold-child", dest="cold_child", help=argparse.SUPPRESS)
+    parser.add_argument("--client-child", dest="client_child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_child:
+        run_cold_child(args.cold_child)
+        return
+    if args.client_child:
+        run_client_child(args.client_child)
+        return
+
+    from inference_service import InferenceService, InferenceClient
+
+    frame = load_frame(args.image)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frame_path = os.path.join(tmp_dir, "frame.npy")
+        np.save(frame_path, frame)
+
+        print("=== 触发到回答延迟基准测试 ===")
+        print(f"[{time.strftime('%H:%M:%S')}] 旧流程：每次触发启动子进程并加载模型 ({args.runs} 次)...")
+        before = time_subprocess("--cold-child", frame_path, args.runs)
+
+        print(f"[{time.strftime('%H:%M:%S')}] 启动常驻推理服务...")
+        service = InferenceService()
+        service.start_server()
+        service.ready.wait()
+
+        print(f"[{time.strftime('%H:%M:%S')}] 新流程：瘦客户端子进程 ({args.runs} 次)...")
+        after_subprocess = time_subprocess("--client-child", frame_path, args.runs)
+
+        print(f"[{time.strftime('%H:%M:%S')}] 新流程：进程内客户端 ({args.runs} 次)...")
+        client = InferenceClient()
+        after_in_process = []
+        for _ in range(args.runs):
+            start_time = time.perf_counter()
+            analyze_frame(client, client, frame)
+            after_in_process.append(time.perf_counter() - start_time)
+        client.close()
+        service.stop()
+
+    print("-" * 50)
+    print_timings("子进程冷启动（旧）", before)
+    print_timings("瘦客户端子进程（新）", after_subprocess)
+    print_timings("进程内客户端（新）", after_in_process)
+    print(f"加速比（旧/瘦客户端）: {statistics.mean(before) / statistics.mean(after_subprocess):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from config_loader import CONFIG
+
+
+def read_memory_mb():
+    """当前进程的RSS和PSS（MB）；PSS把共享页按进程数均摊，可以反映页缓存共享，仅Linux可用"""
+    memory = {'rss': float("nan"), 'pss': float("nan")}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    memory['rss'] = int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    memory['pss'] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return memory
+
+
+def run_child(mode, hold, vqa_path, caption_path):
+    """子进程：按指定方式加载两个模型，输出加载时间和内存占用"""
+    start_time = time.perf_counter()
+    from transformers import BlipForConditionalGeneration
+    try:
+        from modelscope import BlipForQuestionAnswering
+    except ImportError:
+        from transformers import BlipForQuestionAnswering
+    from execution_backend import ExecutionBackend
+    import_time = time.perf_counter() - start_time
+
+    CONFIG["models"]["prepared_cache"] = mode == "prepared"
+    backend = ExecutionBackend(device="cpu")
+    start_time = time.perf_counter()
+    vqa = backend.load_model(BlipForQuestionAnswering, vqa_path, quantize=False)
+    caption = backend.load_model(BlipForConditionalGeneration, caption_path, quantize=False)
+    load_time = time.perf_counter() - start_time
+
+    # 等待其他并发进程也完成加载，此时的PSS才能体现共享
+    time.sleep(hold)
+    memory = read_memory_mb()
+    print("RESULT " + json.dumps({'import_time': import_time, 'load_time': load_time, **memory}), flush=True)
+    del vqa, caption
+
+
+def run_round(mode, concurrency, hold, vqa_path, caption_path):
+    """同时启动concurrency个子进程，收集各自的结果"""
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", mode, "--hold", str(hold),
+                          "--vqa-path", vqa_path, "--caption-path", caption_path],
+                         stdout=subprocess.PIPE, text=True)
+        for _ in range(concurrency)
+    ]
+    results = []
+    for process in processes:
+        output, _ = process.communicate()
+        for line in output.splitlines():
+            if line.startswith("RESULT "):
+                results.append(json.loads(line[len("RESULT "):]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型冷加载基准测试：原始权重 vs 预处理safetensors缓存")
+    parser.add_argument("--runs", type=int, default=3, help="每种方式的重复次数")
+    parser.add_argument("--concurrency", type=int, default=2, help="同时加载模型的进程数")
+    parser.add_argument("--hold", type=float, default=5.0, help="加载完成后等待多久再测量内存（秒）")
+    parser.add_argument("--vqa-path", default=CONFIG["models"]["vqa_path"], help="VQA模型路径")
+    parser.add_argument("--caption-path", default=CONFIG["models"]["image_caption_path"], help="图像描述模型路径")
+    parser.add_argument("--child", choices=["original", "prepared"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    paths = (args.vqa_path, args.caption_path)
+
+    if args.child:
+        run_child(args.child, args.hold, *paths)
+        return
+
+    # 确保预处理缓存已生成，之后的测量都是命中缓存的冷进程
+    print(f"[{time.strftime('%H:%M:%S')}] 生成预处理缓存...")
+    run_round("prepared", 1, 0, *paths)
+
+    print(f"=== 模型冷加载（{args.concurrency} 个并发进程 × {args.runs} 次）===")
+    summary = {}
+    for mode in ("original", "prepared"):
+        results = []
+        for _ in range(args.runs):
+            results.extend(run_round(mode, args.concurrency, args.hold, *paths))
+        summary[mode] = results
+
+    print("-" * 60)
+    names = {'original': "原始权重（旧）", 'prepared': "预处理缓存（新）"}
+    for mode, results in summary.items():
+        if not results:
+            print(f"{names[mode]}: 没有结果")
+            continue
+        print(f"{names[mode]:<16} 导入 {statistics.mean(r['import_time'] for r in results):6.2f}s | "
+              f"加载 {statistics.mean(r['load_time'] for r in results):6.2f}s | "
+              f"RSS {statistics.mean(r['rss'] for r in results):8.1f}MB | "
+              f"PSS {statistics.mean(r['pss'] for r in results):8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
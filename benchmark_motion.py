@@ -0,0 +1,330 @@
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+import cv2
+from config_loader import CONFIG
+from motion_pipeline import ENGINES, MotionAnalyzer
+
+
+def load_clip(clip_path, limit):
+    """读取录制的视频帧到内存，避免解码耗时计入测量"""
+    cap = cv2.VideoCapture(clip_path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def clip_fps(clip_path):
+    """录像帧率，读取不到时按30fps计算"""
+    cap = cv2.VideoCapture(clip_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps if fps and fps > 0 else 30.0
+
+
+def replay(analyzer, frames):
+    """
+    逐帧回放，记录每帧的检测耗时和与MotionDetector相同的三类判定
+
+    Returns:
+        tuple: (每帧耗时列表（毫秒）, [(唤醒, 运动, 紧急), ...])
+    """
+    detector_config = CONFIG["motion_detector"]
+    min_area = detector_config["min_contour_area"]
+    timings = []
+    decisions = []
+    for frame in frames:
+        start_time = time.perf_counter()
+        result = analyzer.detect(frame, min_area)
+        if result is None:
+            continue
+        _, motion_area, _ = result
+        timings.append((time.perf_counter() - start_time) * 1000)
+
+        # 休眠模式使用减半的最小轮廓面积和单独的唤醒阈值
+        _, sleep_area = analyzer.measure(min_area // 2)
+        decisions.append((
+            sleep_area > detector_config["sleep_motion_threshold"],
+            motion_area > detector_config["motion_threshold"],
+            motion_area >= detector_config["emergency_threshold"]
+        ))
+    return timings, decisions
+
+
+class LegacyDetector:
+    """原有实现：每帧新建灰度图、模糊图、帧差、二值图、膨胀图，并为findContours复制二值图"""
+
+    def __init__(self, min_area):
+        self.min_area = min_area
+        self.prev_frame = None
+
+    def detect(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        if self.prev_frame is None:
+            self.prev_frame = gray
+            return None
+        diff = cv2.absdiff(self.prev_frame, gray)
+        _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
+        thresh = cv2.dilate(thresh, None, iterations=2)
+        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        total_area = sum(area for area in (cv2.contourArea(c) for c in contours) if area > self.min_area)
+        self.prev_frame = gray
+        return total_area
+
+
+def profile_allocations(detect, frames):
+    """
+    逐帧统计内存分配和GC
+
+    Returns:
+        dict: 每帧临时分配（KB，tracemalloc峰值减去帧结束时的占用）、每帧分配块数、GC次数
+    """
+    collections = [0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            collections[0] += 1
+
+    gc.callbacks.append(on_gc)
+    tracemalloc.start()
+    transient = []
+    blocks = []
+    try:
+        for frame in frames:
+            before = tracemalloc.take_snapshot() if len(blocks) < 50 else None
+            tracemalloc.reset_peak()
+            current_before, _ = tracemalloc.get_traced_memory()
+            detect(frame)
+            current, peak = tracemalloc.get_traced_memory()
+            transient.append((peak - current_before) / 1024)
+            if before is not None:
+                # 前50帧逐帧比较快照，统计新分配的内存块数
+                after = tracemalloc.take_snapshot()
+                blocks.append(sum(max(0, stat.count_diff) for stat in after.compare_to(before, "traceback")))
+    finally:
+        tracemalloc.stop()
+        gc.callbacks.remove(on_gc)
+    return {
+        'transient_kb': statistics.mean(transient),
+        'blocks': statistics.mean(blocks) if blocks else 0,
+        'gc': collections[0]
+    }
+
+
+def time_frames(detect, frames):
+    """逐帧耗时（毫秒）"""
+    timings = []
+    for frame in frames:
+        start_time = time.perf_counter()
+        detect(frame)
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return timings
+
+
+def bench_allocations(frames, rounds):
+    """
+    原有实现 vs 预分配缓冲区：每帧分配、GC次数和帧耗时分位数
+
+    耗时分rounds轮测量，每轮交替两种实现的先后顺序，合并后计算分位数，减少系统负载波动的影响。
+    """
+    min_area = CONFIG["motion_detector"]["min_contour_area"]
+    height, width = frames[0].shape[:2]
+    legacy = LegacyDetector(min_area)
+    analyzer = MotionAnalyzer(scale=1.0, frame_size=(width, height))
+    candidates = (
+        ("逐帧分配（旧）", legacy.detect),
+        ("预分配缓冲区（新）", lambda frame: analyzer.detect(frame, min_area)),
+    )
+    allocations = {name: profile_allocations(detect, frames) for name, detect in candidates}
+    timings = {name: [] for name, _ in candidates}
+    for index in range(rounds):
+        for name, detect in candidates[::-1] if index % 2 else candidates:
+            timings[name].extend(time_frames(detect, frames))
+
+    print(f"=== 运动检测内存分配（{len(frames)} 帧 × {rounds} 轮，全分辨率）===")
+    for name, _ in candidates:
+        percentiles = statistics.quantiles(timings[name], n=100)
+        print(f"{name:<12} 每帧临时分配 {allocations[name]['transient_kb']:8.1f}KB | "
+              f"每帧新分配块 {allocations[name]['blocks']:6.1f} | GC {allocations[name]['gc']:4d} 次 | "
+              f"P50 {percentiles[49]:6.3f}ms P95 {percentiles[94]:6.3f}ms P99 {percentiles[98]:6.3f}ms")
+
+
+def bench_measurements(frames):
+    """
+    在同一组二值图上对比测量方式：轮廓、连通域、countNonZero（仅面积）
+
+    以轮廓测量为基准，统计唤醒模式运动判定和休眠模式唤醒判定的一致率。
+    """
+    detector_config = CONFIG["motion_detector"]
+    min_area = detector_config["min_contour_area"]
+    height, width = frames[0].shape[:2]
+    contours = MotionAnalyzer(frame_size=(width, height), measurement="contours")
+    variants = {
+        "contours": contours,
+        "components": MotionAnalyzer(frame_size=(width, height), measurement="components"),
+        "countNonZero": MotionAnalyzer(frame_size=(width, height), fast_area_path=True),
+    }
+    timings = {name: [] for name in variants}
+    regions = {name: [] for name in variants}
+    decisions = {name: [] for name in variants}
+    for frame in frames:
+        result = contours.detect(frame, min_area)
+        if result is None:
+            continue
+        thresh = result[2]
+        for name, analyzer in variants.items():
+            area_only = name == "countNonZero"
+            start_time = time.perf_counter()
+            active_regions, active_area = analyzer.measure(min_area, thresh, area_only)
+            _, sleep_area = analyzer.measure(min_area // 2, thresh, area_only)
+            timings[name].append((time.perf_counter() - start_time) * 1000)
+            regions[name].append(len(active_regions))
+            decisions[name].append((
+                active_area > detector_config["motion_threshold"],
+                sleep_area > detector_config["sleep_motion_threshold"]
+            ))
+
+    baseline = decisions["contours"]
+    print(f"=== 运动区域测量（{len(baseline)} 帧，分析比例 {contours.scale}）===")
+    for name in variants:
+        active_agree = sum(a[0] == b[0] for a, b in zip(baseline, decisions[name])) / len(baseline) * 100
+        sleep_agree = sum(a[1] == b[1] for a, b in zip(baseline, decisions[name])) / len(baseline) * 100
+        p95 = statistics.quantiles(timings[name], n=20)[-1]
+        active_text = "—（不提取区域）" if name == "countNonZero" else f"{active_agree:5.1f}%"
+        print(f"{name:<13} 平均 {statistics.mean(timings[name]):7.3f}ms | P95 {p95:7.3f}ms | "
+              f"平均区域数 {statistics.mean(regions[name]):6.1f} | "
+              f"运动判定一致 {active_text} | 唤醒判定一致 {sleep_agree:5.1f}%")
+
+
+def simulate_triggers(analyzer, frames, fps):
+    """
+    按MotionDetector的休眠/唤醒状态机回放录像，统计唤醒次数和模型触发次数
+
+    时间取录像时间戳；分析间隔固定为motion_detector.script_interval，假设分析瞬间完成，
+    使各引擎的触发次数只取决于运动判定本身。
+
+    Returns:
+        dict: 分析帧数、检测耗时（毫秒）、唤醒次数、模型触发次数、紧急帧数
+    """
+    detector_config = CONFIG["motion_detector"]
+    min_area = detector_config["min_contour_area"]
+    interval = detector_config.get("script_interval", 5.0)
+    analyzer.reset()
+    is_sleeping = True
+    sleep_frame_counter = 0
+    initialization_frames = 0
+    motion_start_time = None
+    last_motion_time = None
+    last_process_time = float("-inf")
+    detect_time = 0.0
+    stats = {'analyzed': 0, 'wakes': 0, 'triggers': 0, 'emergencies': 0}
+
+    for index, frame in enumerate(frames):
+        current_time = index / fps
+        if is_sleeping:
+            sleep_frame_counter += 1
+            if sleep_frame_counter % detector_config["sleep_frame_skip"] != 0:
+                continue
+        start_time = time.perf_counter()
+        result = analyzer.detect(frame, min_area // 2 if is_sleeping else min_area, area_only=is_sleeping)
+        detect_time += time.perf_counter() - start_time
+        stats['analyzed'] += 1
+        motion_area = result[1] if result is not None else 0
+
+        if is_sleeping:
+            if initialization_frames < detector_config.get("initialization_threshold", 10):
+                initialization_frames += 1
+            elif motion_area > detector_config["sleep_motion_threshold"]:
+                is_sleeping = False
+                stats['wakes'] += 1
+                motion_start_time = last_motion_time = current_time
+            continue
+
+        if motion_area >= detector_config["emergency_threshold"]:
+            stats['emergencies'] += 1
+        if motion_area > detector_config["motion_threshold"]:
+            last_motion_time = current_time
+            if motion_start_time is None:
+                motion_start_time = current_time
+            if (current_time - last_process_time >= interval
+                    and current_time - motion_start_time >= detector_config["motion_duration_threshold"]):
+                stats['triggers'] += 1
+                last_process_time = current_time
+        else:
+            motion_start_time = None
+            if current_time - last_motion_time >= detector_config["sleep_timeout"]:
+                is_sleeping = True
+                initialization_frames = 0
+
+    stats['detect_ms'] = detect_time * 1000
+    return stats
+
+
+def bench_engines(frames, fps, engines):
+    """同一段录像上对比运动引擎的检测帧率和模型触发次数"""
+    height, width = frames[0].shape[:2]
+    print(f"=== 运动引擎回放（{len(frames)} 帧，{len(frames) / fps:.0f}秒，{width}x{height}）===")
+    for name in engines:
+        stats = simulate_triggers(MotionAnalyzer(frame_size=(width, height), engine=name), frames, fps)
+        detect_fps = stats['analyzed'] / (stats['detect_ms'] / 1000) if stats['detect_ms'] else 0
+        print(f"{name:<16} 检测 {detect_fps:8.1f} fps（每帧 {stats['detect_ms'] / max(stats['analyzed'], 1):6.3f}ms）| "
+              f"唤醒 {stats['wakes']:4d} 次 | 模型触发 {stats['triggers']:4d} 次 | 紧急帧 {stats['emergencies']:5d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运动检测基准测试：不同分析分辨率的耗时与唤醒/紧急判定一致性")
+    parser.add_argument("clip", help="录制的视频文件")
+    parser.add_argument("--scales", nargs="+", type=float, default=[0.5, 0.25], help="对比的分析比例")
+    parser.add_argument("--limit", type=int, default=3000, help="最多回放的帧数")
+    parser.add_argument("--allocations", action="store_true", help="改为对比原有实现与预分配缓冲区的内存分配")
+    parser.add_argument("--rounds", type=int, default=5, help="内存分配对比中耗时测量的轮数")
+    parser.add_argument("--measurements", action="store_true", help="改为对比轮廓、连通域和countNonZero测量方式")
+    parser.add_argument("--engines", nargs="*", choices=ENGINES,
+                        help="改为对比运动引擎的检测帧率和模型触发次数（不指定名称时对比全部引擎）")
+    args = parser.parse_args()
+
+    frames = load_clip(args.clip, args.limit)
+    if len(frames) < 2:
+        print("错误：视频帧数不足")
+        return
+    if args.allocations:
+        bench_allocations(frames, args.rounds)
+        return
+    if args.measurements:
+        bench_measurements(frames)
+        return
+    if args.engines is not None:
+        bench_engines(frames, clip_fps(args.clip), args.engines or ENGINES)
+        return
+    height, width = frames[0].shape[:2]
+
+    baseline_timings, baseline = replay(MotionAnalyzer(scale=1.0, frame_size=(width, height)), frames)
+    print(f"=== 运动检测回放（{len(frames)} 帧，{frames[0].shape[1]}x{frames[0].shape[0]}）===")
+    print(f"{'比例':<6} {'平均耗时':>10} {'P95耗时':>10} {'加速比':>7} | 唤醒一致 运动一致 紧急一致 | 唤醒/运动/紧急帧数")
+    names = ("唤醒", "运动", "紧急")
+    for scale in [1.0] + args.scales:
+        timings, decisions = (baseline_timings, baseline) if scale == 1.0 else replay(
+            MotionAnalyzer(scale=scale, frame_size=(width, height)), frames
+        )
+        agreement = [
+            sum(a[i] == b[i] for a, b in zip(baseline, decisions)) / len(decisions) * 100 for i in range(len(names))
+        ]
+        counts = [sum(d[i] for d in decisions) for i in range(len(names))]
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"{scale:<6} {statistics.mean(timings):8.3f}ms {p95:8.3f}ms "
+              f"{statistics.mean(baseline_timings) / statistics.mean(timings):6.1f}x | "
+              f"{agreement[0]:7.1f}% {agreement[1]:7.1f}% {agreement[2]:7.1f}% | "
+              f"{counts[0]}/{counts[1]}/{counts[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import statistics
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+from transformers import BlipProcessor
+
+from config_loader import CONFIG
+from benchmark_inference import load_frame
+from fast_preprocess import FramePreprocessor
+
+
+def pil_preprocess(processor, frame):
+    """原有路径：BGR->RGB、转为PIL Image，再由BlipProcessor缩放和归一化"""
+    image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    return processor(images=image, return_tensors="pt")["pixel_values"]
+
+
+def time_calls(fn, runs):
+    """重复调用并返回每次耗时（毫秒）"""
+    timings = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="摄像头帧预处理微基准：PIL + BlipProcessor vs 向量化预处理")
+    parser.add_argument("--image", help="测试图片路径（默认使用随机帧）")
+    parser.add_argument("--runs", type=int, default=200, help="重复次数")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="允许的平均绝对误差（归一化后）")
+    parser.add_argument("--interpolation", default=CONFIG.get("preprocess", {}).get("interpolation", "auto"),
+                        choices=["auto", "area", "linear", "cubic"], help="缩放插值方式")
+    args = parser.parse_args()
+
+    frame = load_frame(args.image)
+    processor = BlipProcessor.from_pretrained(CONFIG["models"]["vqa_path"], local_files_only=True)
+    preprocessor = FramePreprocessor.from_processor(processor, interpolation=args.interpolation)
+
+    # 数值一致性
+    reference = pil_preprocess(processor, frame).numpy()
+    fast = preprocessor(frame).numpy().copy()
+    diff = np.abs(reference - fast)
+    print(f"=== 预处理一致性（{frame.shape[1]}x{frame.shape[0]} -> {preprocessor.width}x{preprocessor.height}，"
+          f"插值 {args.interpolation}）===")
+    print(f"形状: {reference.shape} vs {fast.shape} | 最大绝对误差 {diff.max():.4f} | 平均绝对误差 {diff.mean():.4f} | "
+          f"{'通过' if diff.mean() <= args.tolerance else '超出容差'}（容差 {args.tolerance}）")
+
+    # 速度
+    for _ in range(5):
+        pil_preprocess(processor, frame)
+        preprocessor(frame)
+    pil_timings = time_calls(lambda: pil_preprocess(processor, frame), args.runs)
+    fast_timings = time_calls(lambda: preprocessor(frame), args.runs)
+
+    print(f"=== 预处理耗时（{args.runs} 次）===")
+    for name, timings in (("PIL + BlipProcessor（旧）", pil_timings), ("向量化预处理（新）", fast_timings)):
+        print(f"{name:<24} 平均 {statistics.mean(timings):7.3f}ms | 中位数 {statistics.median(timings):7.3f}ms")
+    print(f"加速比: {statistics.mean(pil_timings) / statistics.mean(fast_timings):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import statistics
+import time
+
+import cv2
+from config_loader import CONFIG
+from roi import build_vqa_input
+from vqa_interface import VQAInterface
+
+
+def detect_motion_boxes(prev_gray, gray, min_contour_area):
+    """与MotionDetector相同的帧差运动检测，返回运动框"""
+    diff = cv2.absdiff(prev_gray, gray)
+    _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
+    thresh = cv2.dilate(thresh, None, iterations=2)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) > min_contour_area]
+
+
+def sample_motion_frames(clip_path, every, min_contour_area, limit):
+    """从录制的视频中每隔every帧取一个有运动的帧及其运动框"""
+    cap = cv2.VideoCapture(clip_path)
+    samples = []
+    prev_gray = None
+    index = 0
+    while len(samples) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (21, 21), 0)
+        if prev_gray is not None and index % every == 0:
+            boxes = detect_motion_boxes(prev_gray, gray, min_contour_area)
+            if boxes:
+                samples.append((f"{clip_path}#{index}", frame, boxes))
+        prev_gray = gray
+        index += 1
+    cap.release()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ROI裁剪基准测试：整帧 vs 运动区域的VQA延迟与答案一致率")
+    parser.add_argument("clips", nargs="+", help="录制的视频文件")
+    parser.add_argument("--every", type=int, default=15, help="每隔多少帧取样一次")
+    parser.add_argument("--limit", type=int, default=50, help="每个视频最多取样的帧数")
+    parser.add_argument("--modes", nargs="+", default=["crop", "crop_context"], help="对比的ROI模式")
+    args = parser.parse_args()
+
+    questions = list(dict.fromkeys(CONFIG["emergency"]["questions"] + CONFIG["emergency"]["suspicious_questions"]))
+    binary = CONFIG["emergency"].get("binary_fast_path", True)
+    min_contour_area = CONFIG["motion_detector"]["min_contour_area"]
+
+    samples = []
+    for clip in args.clips:
+        samples.extend(sample_motion_frames(clip, args.every, min_contour_area, args.limit))
+    if not samples:
+        print("错误：视频中没有检测到运动帧")
+        return
+
+    # 不启用视觉特征缓存，每种模式都包含完整的预处理和编码开销
+    vqa = VQAInterface(model_path=CONFIG["models"]["vqa_path"])
+    vqa.warmup()
+
+    modes = ["full"] + args.modes
+    latencies = {mode: [] for mode in modes}
+    answers = {mode: {} for mode in modes}
+    for name, frame, boxes in samples:
+        for mode in modes:
+            vqa_frame = build_vqa_input(frame, boxes, mode=mode)
+            start_time = time.perf_counter()
+            results = vqa.batch_answer_questions(vqa_frame, questions, binary=binary)
+            latencies[mode].append(time.perf_counter() - start_time)
+            answers[mode][name] = [result['answer'].lower() for result in results]
+
+    print(f"=== ROI基准（{len(samples)} 个运动帧，{len(questions)} 个问题）===")
+    for mode in modes:
+        total = agree = 0
+        for name, _, _ in samples:
+            for a, b in zip(answers["full"][name], answers[mode][name]):
+                total += 1
+                agree += int(a == b)
+        print(f"{mode:<14} 平均延迟 {statistics.mean(latencies[mode]) * 1000:7.1f}ms | "
+              f"中位延迟 {statistics.median(latencies[mode]) * 1000:7.1f}ms | "
+              f"与整帧一致率 {agree / max(total, 1) * 100:5.1f}%")
+
+    for mode in args.modes:
+        for name, _, _ in samples:
+            if answers[mode][name] != answers["full"][name]:
+                print(f"  不一致[{mode}]: {name} | 整帧={answers['full'][name]} | ROI={answers[mode][name]}")
+
+
+if __name__ == "__main__":
+    main()
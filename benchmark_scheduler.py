@@ -0,0 +1,112 @@
+import argparse
+import statistics
+import threading
+import time
+
+from config_loader import CONFIG
+from benchmark_inference import load_frame, analyze_frame
+from inference_scheduler import InferenceScheduler, InferenceCancelled, PRIORITY_EMERGENCY
+from vision_cache import VisionEmbeddingCache
+from vqa_interface import VQAInterface
+from image_caption_interface import ImageCaptionInterface
+
+
+def run_burst(vqa, caption_interface, frames):
+    """每帧一个线程同时发起完整分析，返回总耗时和每个请求的延迟"""
+    latencies = [0.0] * len(frames)
+
+    def worker(index, frame):
+        start_time = time.perf_counter()
+        analyze_frame(vqa, caption_interface, frame)
+        latencies[index] = time.perf_counter() - start_time
+
+    threads = [threading.Thread(target=worker, args=(i, frame)) for i, frame in enumerate(frames)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start_time, latencies
+
+
+def run_preemption(vqa, caption_interface, frame, delay, rounds, preemption):
+    """
+    常规图像描述（quality档位）执行delay秒后提交一组紧急问题，返回紧急请求的延迟列表和调度器统计
+
+    关闭抢占时紧急请求需要等待描述结束，开启后描述在下一个解码步被取消。
+    """
+    scheduler = InferenceScheduler(vqa, caption_interface, preemption=preemption)
+    scheduler.start()
+    questions = CONFIG["emergency"]["questions"]
+    binary = CONFIG["emergency"].get("binary_fast_path", True)
+    latencies = []
+    for i in range(rounds):
+        routine_frame = frame.copy()
+        routine_frame[0, 0, 0] = i
+        routine = scheduler.submit('caption', routine_frame, profile="quality")
+        time.sleep(delay)
+        start_time = time.perf_counter()
+        scheduler.submit('vqa', frame, priority=PRIORITY_EMERGENCY, questions=questions, binary=binary).result()
+        latencies.append(time.perf_counter() - start_time)
+        try:
+            routine.result()
+        except InferenceCancelled:
+            pass
+    stats = scheduler.get_statistics()
+    scheduler.stop()
+    return latencies, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="突发请求基准测试：线程直接调用模型 vs 微批调度器")
+    parser.add_argument("--image", help="测试图片路径（默认使用随机帧）")
+    parser.add_argument("--burst", type=int, default=8, help="同时到达的帧数")
+    parser.add_argument("--window-ms", type=float, default=None, help="调度器收集窗口（毫秒）")
+    parser.add_argument("--max-batch-size", type=int, default=None, help="调度器每批最多请求数")
+    parser.add_argument("--preempt", action="store_true", help="改为测试紧急请求抢占常规图像描述的延迟")
+    parser.add_argument("--delay", type=float, default=0.2, help="描述开始后多久提交紧急请求（秒）")
+    parser.add_argument("--rounds", type=int, default=5, help="抢占测试轮数")
+    args = parser.parse_args()
+
+    base_frame = load_frame(args.image)
+    # 每帧内容略有不同，避免视觉特征缓存把突发请求合并成同一帧
+    frames = [base_frame.copy() for _ in range(args.burst)]
+    for i, frame in enumerate(frames):
+        frame[0, 0, 0] = i
+
+    vision_cache = VisionEmbeddingCache(max_entries=max(args.burst, CONFIG["models"].get("vision_cache_size", 4)))
+    vqa = VQAInterface(model_path=CONFIG["models"]["vqa_path"], vision_cache=vision_cache)
+    caption_interface = ImageCaptionInterface(CONFIG["models"]["image_caption_path"], vision_cache=vision_cache)
+
+    if args.preempt:
+        print(f"=== 紧急请求抢占（{args.rounds} 轮，描述开始 {args.delay:.2f}s 后提交）===")
+        for name, preemption in (("排队等待（旧）", False), ("抢占常规推理（新）", True)):
+            latencies, stats = run_preemption(vqa, caption_interface, base_frame, args.delay, args.rounds, preemption)
+            print(f"{name:<20} 紧急请求平均延迟 {statistics.mean(latencies) * 1000:8.1f}ms | "
+                  f"最大 {max(latencies) * 1000:8.1f}ms | 抢占 {stats['preemptions']} 次，"
+                  f"抢占延迟 平均 {stats['avg_preempt_latency'] * 1000:.1f}ms / 最大 {stats['max_preempt_latency'] * 1000:.1f}ms")
+        return
+
+    print(f"=== {args.burst} 帧突发请求 ===")
+    vision_cache.clear()
+    direct_total, direct_latencies = run_burst(vqa, caption_interface, frames)
+
+    scheduler = InferenceScheduler(vqa, caption_interface, window_ms=args.window_ms,
+                                   max_batch_size=args.max_batch_size)
+    scheduler.start()
+    vision_cache.clear()
+    scheduled_total, scheduled_latencies = run_burst(scheduler, scheduler, frames)
+    scheduler.stop()
+
+    print("-" * 50)
+    for name, total, latencies in (("线程直接调用（旧）", direct_total, direct_latencies),
+                                   ("微批调度器（新）", scheduled_total, scheduled_latencies)):
+        print(f"{name:<20} 总耗时 {total:7.3f}s | 吞吐量 {len(frames) / total:6.2f} 帧/秒 | "
+              f"平均延迟 {statistics.mean(latencies):7.3f}s | 最大延迟 {max(latencies):7.3f}s")
+    stats = scheduler.get_statistics()
+    print(f"调度器: {stats['batches']} 批 / {stats['jobs']} 个请求，平均批大小 {stats['avg_batch_size']:.1f}，"
+          f"平均排队 {stats['avg_wait_time'] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ import threading
 import queue
 import subprocess
 from config_loader import CONFIG
+from motion_pipeline import MotionAnalyzer
+from frame_capture import SleepAwareCapture
+from inference_service import start_shared_service
 
 # API配置
 WEATHER_API_KEY = CONFIG["api"]["weather_api_key"]  # 替换为你的天气API密钥
@@ -41,9 +44,8 @@ class MotionDetector:
         self.emergency_threshold = emergency_threshold
         self.emergency_cooldown = emergency_cooldown
         
-        # 初始化前一帧
-        self.prev_frame = None
-        self.prev_sleep_frame = None  # 休眠模式下的前一帧
+        # 运动分析器（运动引擎由配置motion_detector.engine选择，前一帧或背景模型由休眠和唤醒模式共用）
+        self.motion_analyzer = MotionAnalyzer()
         
         # 运动状态跟踪
         self.motion_start_time = None
@@ -81,51 +83,15 @@ class MotionDetector:
         self.initialization_frames = 0
         self.initialization_threshold = 10  # 需要10帧稳定初始化
     
-    def _preprocess_frame(self, frame):
-        """预处理帧"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-        return gray
-    
     def _detect_motion(self, frame, is_sleep_mode=False):
-        """检测运动"""
-        gray_frame = self._preprocess_frame(frame)
-        
-        # 选择对应的前一帧
-        prev_frame = self.prev_sleep_frame if is_sleep_mode else self.prev_frame
-        
-        if prev_frame is None:
-            # 初始化前一帧
-            if is_sleep_mode:
-                self.prev_sleep_frame = gray_frame
-            else:
-                self.prev_frame = gray_frame
+        """检测运动（前一帧或背景模型保存在motion_analyzer中，休眠和唤醒模式共用）"""
+        min_area = self.min_contour_area // 2 if is_sleep_mode else self.min_contour_area
+        # 休眠模式只需要运动面积（配置motion_detector.fast_area_path）
+        result = self.motion_analyzer.detect(frame, min_area, area_only=is_sleep_mode)
+        if result is None:
+            # 第一帧只作为比较基准或初始背景
             return False, [], None, 0
-        
-        # 计算帧差
-        diff = cv2.absdiff(prev_frame, gray_frame)
-        _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-        thresh = cv2.dilate(thresh, None, iterations=2)
-        
-        # 检测轮廓
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # 过滤小轮廓
-        significant_contours = []
-        total_motion_area = 0
-        
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            min_area = self.min_contour_area // 2 if is_sleep_mode else self.min_contour_area
-            if area > min_area:
-                significant_contours.append(contour)
-                total_motion_area += area
-        
-        # 更新前一帧
-        if is_sleep_mode:
-            self.prev_sleep_frame = gray_frame
-        else:
-            self.prev_frame = gray_frame
+        significant_contours, total_motion_area, thresh = result
         
         # 判断是否有显著运动
         threshold = self.sleep_motion_threshold if is_sleep_mode else self.motion_threshold
@@ -133,6 +99,14 @@ class MotionDetector:
         
         return has_motion, significant_contours, thresh, total_motion_area
     
+    def will_skip_next_frame(self):
+        """休眠模式下下一帧是否会被跳过（不做运动检测）"""
+        return self.is_sleeping and (self.sleep_frame_counter + 1) % self.sleep_frame_skip != 0
+    
+    def skip_frame(self):
+        """跳过一帧：摄像头层只grab未解码的帧，只推进休眠跳帧计数"""
+        self.sleep_frame_counter += 1
+    
     def _should_execute_script(self):
         """判断是否应该执行脚本"""
         current_time = time.time()
@@ -267,7 +241,6 @@ class MotionDetector:
                 self.wake_count += 1
                 self.motion_start_time = current_time
                 self.last_motion_time = current_time
-                self.prev_frame = self.prev_sleep_frame  # 继承休眠时的前一帧
                 print(f"[{time.strftime('%H:%M:%S')}] 检测到运动，系统唤醒！")
             
             return {
@@ -334,7 +307,6 @@ class MotionDetector:
             # 检查是否应该进入休眠
             if self._should_sleep():
                 self.is_sleeping = True
-                self.prev_sleep_frame = self.prev_frame  # 保存当前帧作为休眠的起始帧
                 # 新增：进入休眠时重置初始化计数
                 self.initialization_frames = 0
                 print(f"[{time.strftime('%H:%M:%S')}] 长时间无运动，系统进入休眠模式")
@@ -355,6 +327,10 @@ class ModernSmartCalendar:
         y = (self.root.winfo_screenheight() // 2) - (900 // 2)
         self.root.geometry(f"1600x900+{x}+{y}")
         
+        # 启动常驻推理服务：模型只加载一次，starting_main.py / emergency.py 作为客户端连接
+        # （端口已被占用时使用已运行的服务，不重复启动）
+        self.inference_service = start_shared_service()
+        
         # 运动检测相关
         self.detector = MotionDetector(
             motion_threshold=CONFIG["motion_detector"]["motion_threshold"],
@@ -367,6 +343,8 @@ class ModernSmartCalendar:
         
         # 摄像头相关
         self.cap = None
+        # 按休眠跳帧计划采集：跳过的帧只grab不解码，休眠期间可降低采集帧率
+        self.capture = SleepAwareCapture(self.detector)
         self.camera_queue = queue.Queue()
         self.camera_thread = None
         self.camera_active = True
@@ -455,6 +433,7 @@ class ModernSmartCalendar:
         """暂停摄像头"""
         self.camera_paused = True
         if self.cap and self.cap.isOpened():
+            self.capture.restore(self.cap)
             self.cap.release()
             self.cap = None
         print(f"[{time.strftime('%H:%M:%S')}] 摄像头已暂停")
@@ -903,11 +882,14 @@ class ModernSmartCalendar:
                 time.sleep(0.1)
                 continue
                 
-            ret, frame = self.cap.read()
+            ret, frame = self.capture.read(self.cap)
             if not ret:
                 print(f"[{time.strftime('%H:%M:%S')}] 错误：无法从摄像头读取帧。")
                 time.sleep(0.1)
                 continue
+            if frame is None:
+                # 休眠模式下跳过的帧未解码，也不更新画面
+                continue
                 
             # 处理帧
             result = self.detector.process_frame(frame)
@@ -1005,7 +987,6 @@ class ModernSmartCalendar:
             # 手动休眠
             if not self.detector.is_sleeping:
                 self.detector.is_sleeping = True
-                self.detector.prev_sleep_frame = self.detector.prev_frame
                 # 新增：手动休眠时重置初始化计数
                 self.detector.initialization_frames = 0
                 print(f"[{time.strftime('%H:%M:%S')}] 手动进入休眠模式")
@@ -1022,8 +1003,17 @@ class ModernSmartCalendar:
         
         # 释放摄像头资源
         if self.cap and self.cap.isOpened():
+            self.capture.restore(self.cap)
             self.cap.release()
         
+        stats = self.capture.get_statistics()
+        print(f"[{time.strftime('%H:%M:%S')}] 摄像头采集: 解码 {stats['decoded_frames']} 帧, "
+              f"只grab跳过 {stats['grabbed_frames']} 帧（{stats['skip_ratio'] * 100:.1f}%）")
+        
+        # 停止推理服务
+        if self.inference_service is not None:
+            self.inference_service.stop()
+        
         self.root.quit()
         self.root.destroy()
 
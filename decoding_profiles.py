@@ -0,0 +1,102 @@
+import time
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, MaxTimeCriteria
+from config_loader import CONFIG
+
+# 内置的图像描述解码档位，可在CONFIG["caption"]["profiles"]中覆盖或新增
+DEFAULT_CAPTION_PROFILES = {
+    # 贪心解码、短句，最快
+    "fast": {
+        "num_beams": 1,
+        "max_length": 30,
+        "repetition_penalty": 1.5,
+    },
+    # 小规模beam search，所有beam结束即停止
+    "balanced": {
+        "num_beams": 3,
+        "max_length": 60,
+        "early_stopping": True,
+        "repetition_penalty": 1.5,
+        "length_penalty": 1.0,
+    },
+    # 原有参数：长beam search，鼓励长文本
+    "quality": {
+        "num_beams": 5,
+        "max_length": 150,
+        "early_stopping": False,
+        "repetition_penalty": 1.5,
+        "length_penalty": 2,
+    },
+}
+
+
+def get_caption_profile(name=None):
+    """
+    获取图像描述解码参数
+
+    Args:
+        name: 档位名称（fast / balanced / quality 或配置中自定义的档位），默认读取CONFIG["caption"]["profile"]
+
+    Returns:
+        dict: 可直接传给generate的解码参数
+    """
+    caption_config = CONFIG.get("caption", {})
+    name = name or caption_config.get("profile", "quality")
+    profiles = dict(DEFAULT_CAPTION_PROFILES)
+    profiles.update(caption_config.get("profiles", {}))
+    if name not in profiles:
+        raise ValueError(f"未知的解码档位: {name}（可选: {', '.join(profiles)}）")
+    return dict(profiles[name])
+
+
+def get_time_budget(time_budget=None):
+    """获取生成时间预算（秒），None或0表示不限制"""
+    if time_budget is None:
+        time_budget = CONFIG.get("caption", {}).get("time_budget")
+    return time_budget or None
+
+
+class CancellationCriteria(StoppingCriteria):
+    """
+    取消事件被设置或超过截止时间后，在下一个解码步停止生成（用于推理调度器抢占常规请求）
+
+    实际停止生成时调用cancel_event.mark_stopped()（如果提供，如InferenceScheduler的CancelEvent），
+    调用方据此区分输出不完整的生成和在抢占/截止时间之前已经正常结束的生成。
+    """
+
+    def __init__(self, cancel_event=None, deadline=None):
+        """
+        Args:
+            cancel_event: 可选的threading.Event
+            deadline: 可选的截止时间（time.time()时间戳）
+        """
+        self.cancel_event = cancel_event
+        self.deadline = deadline
+        self.fired = False
+
+    def __call__(self, input_ids, scores, **kwargs):
+        stop = ((self.cancel_event is not None and self.cancel_event.is_set())
+                or (self.deadline is not None and time.time() > self.deadline))
+        if stop and not self.fired:
+            self.fired = True
+            mark_stopped = getattr(self.cancel_event, "mark_stopped", None)
+            if mark_stopped is not None:
+                mark_stopped()
+        return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+
+
+def build_stopping_criteria(time_budget=None, cancel_event=None, deadline=None):
+    """
+    构建停止条件：超过时间预算后提前结束生成（beam search返回当前最优结果），
+    或在取消事件被设置、超过截止时间后中止生成
+
+    Returns:
+        StoppingCriteriaList或None
+    """
+    criteria = []
+    time_budget = get_time_budget(time_budget)
+    if time_budget is not None:
+        criteria.append(MaxTimeCriteria(max_time=time_budget))
+    if cancel_event is not None or deadline is not None:
+        criteria.append(CancellationCriteria(cancel_event, deadline))
+    return StoppingCriteriaList(criteria) if criteria else None
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
-from vqa_interface import VQAInterface
+from inference_service import connect_or_load
+from question_cascade import QuestionCascade, QuestionRule
 from send_email_v2 import send_frame_as_email
 import pygame
 import time
@@ -8,8 +9,8 @@ import datetime
 from config_loader import CONFIG
 
 def main():
-    # 初始化
-    vqa = VQAInterface(model_path=CONFIG["models"]["vqa_path"])
+    # 初始化（优先连接常驻推理服务，避免每次触发都重新加载模型）
+    vqa, _ = connect_or_load()
     
     # 处理一帧
     cap = cv2.VideoCapture(0)
@@ -27,14 +28,15 @@ def main():
     cv2.imshow('Emergency Monitor', frame)
     cv2.resizeWindow("Emergency Monitor", 640, 480)
 
-    # VQA问答
-    questions = CONFIG["emergency"]["questions"]
-    results = vqa.batch_answer_questions(frame, questions)
+    # VQA问答（按规则短路求值）
+    question_cascade = QuestionCascade(vqa, binary=CONFIG["emergency"].get("binary_fast_path", True))
+    rule = QuestionRule.from_config("emergency", CONFIG["emergency"], "questions")
+    evaluation = question_cascade.evaluate(frame, rule)
     print(f"[{time.strftime('%H:%M:%S')}] VQA 问题及回答:")
-    for result in results:
+    for result in evaluation['results']:
         print(f"Q: {result['question']} -> A: {result['answer']}")
-    # 判断是否为紧急情况：所有问题都回答 'yes'
-    if_emergency = all(result['answer'].lower() == 'yes' for result in results)
+    # 判断是否为紧急情况：满足规则（默认所有问题都回答 'yes'）
+    if_emergency = evaluation['matched']
     
 
 
@@ -105,5 +107,5 @@ def main():
 
 
 
-#if __name__ == "__main__":
-main()
+if __name__ == "__main__":
+    main()
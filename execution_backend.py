@@ -0,0 +1,155 @@
+import contextlib
+import os
+import time
+import torch
+from config_loader import CONFIG
+
+_DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
+# 编译模式下编译的子模块：视觉编码器、问题编码器（仅VQA）和逐步解码的文本解码器
+_COMPILE_MODULES = ("vision_model", "text_encoder", "text_decoder")
+
+
+def _enable_compile_cache(cache_dir):
+    """持久化Inductor编译产物（FX图缓存），重启后命中缓存不再重新编译；需在首次编译前调用"""
+    cache_dir = os.path.abspath(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", cache_dir)
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+    os.environ.setdefault("TORCHINDUCTOR_AUTOGRAD_CACHE", "1")
+    try:
+        import torch._inductor.config as inductor_config
+        inductor_config.fx_graph_cache = True
+    except (ImportError, AttributeError):
+        pass
+
+
+class ExecutionBackend:
+    """
+    推理执行后端：检测设备，统一权重精度、输入搬运、推理上下文和CPU线程数
+
+    GPU上使用float16权重；CPU上使用float32权重，可选bfloat16自动混合精度，
+    避免在CPU上走缓慢的float16模拟路径。
+    可选的编译模式（配置backend.compile）用torch.compile编译视觉编码器和解码器。
+    """
+
+    def __init__(self, device=None, cpu_dtype=None, cuda_dtype=None, num_threads=None, compile=None):
+        """
+        Args:
+            device: "auto"、"cuda"或"cpu"，默认读取配置
+            cpu_dtype: CPU计算精度，"float32"或"bfloat16"（bfloat16通过autocast实现）
+            cuda_dtype: GPU权重精度，默认"float16"
+            num_threads: CPU推理的intra-op线程数，0表示使用PyTorch默认值
+            compile: 是否启用编译模式，默认读取配置backend.compile.enabled
+        """
+        backend_config = CONFIG.get("backend", {})
+        device = device or backend_config.get("device", "auto")
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(device)
+
+        if self.device.type == "cuda":
+            self.dtype = _DTYPES[cuda_dtype or backend_config.get("cuda_dtype", "float16")]
+            self.autocast_dtype = None
+        else:
+            # CPU上权重保持float32，bfloat16只作为autocast计算精度
+            self.dtype = torch.float32
+            cpu_dtype = _DTYPES[cpu_dtype or backend_config.get("cpu_dtype", "float32")]
+            self.autocast_dtype = cpu_dtype if cpu_dtype == torch.bfloat16 else None
+
+            num_threads = num_threads if num_threads is not None else backend_config.get("num_threads", 0)
+            if num_threads and num_threads > 0:
+                torch.set_num_threads(num_threads)
+
+        self.compile_config = backend_config.get("compile", {})
+        self.compile = compile if compile is not None else self.compile_config.get("enabled", False)
+        if self.compile and not hasattr(torch.nn.Module, "compile"):
+            print(f"[{time.strftime('%H:%M:%S')}] 当前PyTorch版本不支持torch.compile，使用eager模式")
+            self.compile = False
+        if self.compile:
+            _enable_compile_cache(self.compile_config.get("cache_dir", "./compile_cache"))
+        # 编译后的图需要按实际输入形状多跑几次，直到动态形状的重新编译完成
+        self.warmup_runs = max(1, self.compile_config.get("warmup_runs", 2)) if self.compile else 1
+
+        print(f"[{time.strftime('%H:%M:%S')}] 推理后端: 设备={self.device}, 精度={self.dtype}, "
+              f"autocast={self.autocast_dtype}, 线程数={torch.get_num_threads()}, 编译={self.compile}")
+
+    def load_model(self, model_cls, model_path, dtype=None, quantize=None, **kwargs):
+        """
+        按后端设备和精度加载模型
+
+        Args:
+            model_cls: 模型类
+            model_path: 本地模型路径
+            dtype: 权重精度，默认使用后端精度
+            quantize: 是否使用动态int8量化（仅CPU），默认读取配置models.quantize
+        """
+        if quantize is None:
+            quantize = CONFIG["models"].get("quantize", False)
+        if quantize:
+            if self.device.type == "cpu":
+                from quantization import load_quantized_model
+                return load_quantized_model(model_cls, model_path, **kwargs)
+            print(f"[{time.strftime('%H:%M:%S')}] 动态int8量化仅支持CPU，使用常规精度加载")
+
+        if CONFIG["models"].get("prepared_cache", True):
+            # 已转换精度的safetensors缓存，内存映射加载
+            from model_cache import load_prepared_model
+            model = load_prepared_model(model_cls, model_path, dtype or self.dtype, **kwargs)
+        else:
+            model = model_cls.from_pretrained(
+                model_path, local_files_only=True, dtype=dtype or self.dtype, **kwargs
+            )
+        model = model.to(self.device).eval()
+        if self.compile:
+            self.compile_model(model)
+        return model
+
+    def compile_model(self, model):
+        """
+        原地编译模型的视觉编码器和解码器（nn.Module.compile，权重和state_dict保持不变）
+
+        编译在首次调用时发生，由模型接口的warmup()按实际输入形状触发。视觉编码器的输入固定为
+        处理器尺寸，使用静态形状；解码器每一步的序列长度不同，使用动态形状避免逐长度重新编译。
+        编译失败的子图自动回退为eager执行。
+        """
+        import torch._dynamo
+        torch._dynamo.config.suppress_errors = True
+        mode = self.compile_config.get("mode", "default")
+        compiled = []
+        for name in _COMPILE_MODULES:
+            module = getattr(model, name, None)
+            if module is None:
+                continue
+            module.compile(mode=mode, dynamic=name != "vision_model")
+            compiled.append(name)
+        print(f"[{time.strftime('%H:%M:%S')}] 编译模式({mode}): {', '.join(compiled)}，"
+              f"编译缓存 {os.environ.get('TORCHINDUCTOR_CACHE_DIR')}")
+        return model
+
+    def move_inputs(self, inputs, dtype=None):
+        """将处理器输出移动到推理设备，浮点张量转换为模型精度"""
+        return inputs.to(self.device, dtype or self.dtype)
+
+    def inference_context(self):
+        """推理上下文：inference_mode，CPU上按配置启用bfloat16 autocast"""
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.autocast_dtype is not None:
+            stack.enter_context(torch.autocast(device_type=self.device.type, dtype=self.autocast_dtype))
+        return stack
+
+
+_default_backend = None
+
+
+def get_backend():
+    """获取进程内共享的默认执行后端（线程数等设置是进程级的）"""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = ExecutionBackend()
+    return _default_backend
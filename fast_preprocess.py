@@ -0,0 +1,94 @@
+import threading
+import cv2
+import numpy as np
+import torch
+
+# OpenAI CLIP归一化参数（BlipImageProcessor的默认值）
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+_INTERPOLATIONS = {
+    "area": cv2.INTER_AREA,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+}
+
+
+class FramePreprocessor:
+    """
+    摄像头帧的向量化预处理
+
+    直接接收cv2.VideoCapture输出的uint8 BGR数组，先在BGR上缩放，再通过不复制的通道交换/HWC->CHW视图
+    就地乘加归一化到预先分配的float32缓冲区，不经过PIL，也不产生整帧大小的中间副本。
+    结果与BlipProcessor在容差内一致（缩放插值实现不同，像素值略有差异）。
+    """
+
+    def __init__(self, height=384, width=384, mean=CLIP_MEAN, std=CLIP_STD, rescale_factor=1 / 255,
+                 interpolation="auto"):
+        """
+        Args:
+            height/width: 模型输入尺寸
+            mean/std: RGB通道的归一化均值和标准差
+            rescale_factor: 像素缩放系数
+            interpolation: "auto"（缩小时用area、放大时用cubic）、"area"、"linear"或"cubic"
+        """
+        self.height = height
+        self.width = width
+        self.interpolation = interpolation
+        mean = np.asarray(mean, dtype=np.float32)
+        std = np.asarray(std, dtype=np.float32)
+        # (x * rescale - mean) / std 合并为 x * scale + offset
+        self.scale = (rescale_factor / std).reshape(3, 1, 1).astype(np.float32)
+        self.offset = (-mean / std).reshape(3, 1, 1).astype(np.float32)
+        # 每个线程一个缓冲区，并发调用互不覆盖
+        self._local = threading.local()
+
+    @classmethod
+    def from_processor(cls, processor, interpolation="auto"):
+        """从BlipProcessor读取输入尺寸和归一化参数"""
+        image_processor = processor.image_processor
+        size = image_processor.size
+        return cls(
+            height=size["height"],
+            width=size["width"],
+            mean=image_processor.image_mean if image_processor.do_normalize else (0.0, 0.0, 0.0),
+            std=image_processor.image_std if image_processor.do_normalize else (1.0, 1.0, 1.0),
+            rescale_factor=image_processor.rescale_factor if image_processor.do_rescale else 1.0,
+            interpolation=interpolation
+        )
+
+    def _buffer(self):
+        """当前线程的输出缓冲区：numpy数组与共享内存的torch张量"""
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            array = np.empty((1, 3, self.height, self.width), dtype=np.float32)
+            buffer = (array, torch.from_numpy(array))
+            self._local.buffer = buffer
+        return buffer
+
+    def _resize_flag(self, frame):
+        if self.interpolation != "auto":
+            return _INTERPOLATIONS[self.interpolation]
+        shrinking = frame.shape[0] >= self.height and frame.shape[1] >= self.width
+        return cv2.INTER_AREA if shrinking else cv2.INTER_CUBIC
+
+    def __call__(self, frame):
+        """
+        预处理一帧
+
+        Args:
+            frame: uint8 BGR数组 (H, W, 3)，或灰度数组 (H, W)
+
+        Returns:
+            Tensor: (1, 3, height, width) float32，指向复用的缓冲区，下次调用会被覆盖
+        """
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        resized = cv2.resize(frame, (self.width, self.height), interpolation=self._resize_flag(frame))
+
+        array, tensor = self._buffer()
+        # BGR的HWC视图 -> RGB的CHW视图（不复制），乘加结果直接写入缓冲区
+        rgb_chw = resized.transpose(2, 0, 1)[::-1]
+        np.multiply(rgb_chw, self.scale, out=array[0])
+        np.add(array[0], self.offset, out=array[0])
+        return tensor
@@ -0,0 +1,82 @@
+import time
+import cv2
+from config_loader import CONFIG
+
+
+class SleepAwareCapture:
+    """
+    按检测器的休眠跳帧计划读取摄像头
+
+    休眠模式下process_frame每sleep_frame_skip帧只分析一帧。被跳过的帧只调用grab()从驱动取出，
+    不解码也不做颜色转换；只有将被分析的帧才retrieve()（配置camera.sleep_grab_skip）。
+    可选在休眠期间降低摄像头采集帧率（配置camera.sleep_fps，0表示不降低），唤醒后恢复camera.fps。
+
+    检测器需提供is_sleeping、will_skip_next_frame()和skip_frame()。
+    """
+
+    def __init__(self, detector, grab_skip=None, sleep_fps=None):
+        """
+        Args:
+            detector: 运动检测器
+            grab_skip: 休眠模式下跳过的帧是否只grab不解码，默认读取配置
+            sleep_fps: 休眠期间的采集帧率，0表示保持camera.fps，默认读取配置
+        """
+        camera_config = CONFIG["camera"]
+        self.detector = detector
+        self.grab_skip = grab_skip if grab_skip is not None else camera_config.get("sleep_grab_skip", True)
+        self.sleep_fps = sleep_fps if sleep_fps is not None else camera_config.get("sleep_fps", 0)
+        self.active_fps = camera_config["fps"]
+        self._low_fps = False
+
+        # 统计信息
+        self.grabbed_frames = 0
+        self.decoded_frames = 0
+
+    def _update_fps(self, cap):
+        """进入休眠时降低采集帧率，唤醒时恢复"""
+        if not self.sleep_fps or self.detector.is_sleeping == self._low_fps:
+            return
+        fps = self.sleep_fps if self.detector.is_sleeping else self.active_fps
+        if not cap.set(cv2.CAP_PROP_FPS, fps):
+            # 驱动不支持运行时修改帧率，之后不再尝试
+            print(f"[{time.strftime('%H:%M:%S')}] 摄像头不支持修改采集帧率，休眠期间保持 {self.active_fps}fps")
+            self.sleep_fps = 0
+            return
+        self._low_fps = self.detector.is_sleeping
+        print(f"[{time.strftime('%H:%M:%S')}] 摄像头采集帧率: {fps}fps")
+
+    def read(self, cap):
+        """
+        读取下一帧
+
+        Returns:
+            tuple: (ret, frame)；frame为None表示该帧按休眠跳帧计划只grab未解码，
+                已计入检测器的跳帧计数，调用方无需再调用process_frame
+        """
+        self._update_fps(cap)
+        if self.grab_skip and self.detector.will_skip_next_frame():
+            if not cap.grab():
+                return False, None
+            self.detector.skip_frame()
+            self.grabbed_frames += 1
+            return True, None
+
+        ret, frame = cap.read()
+        if ret:
+            self.decoded_frames += 1
+        return ret, frame
+
+    def restore(self, cap):
+        """恢复正常采集帧率（关闭摄像头前调用）"""
+        if self._low_fps:
+            cap.set(cv2.CAP_PROP_FPS, self.active_fps)
+            self._low_fps = False
+
+    def get_statistics(self):
+        """采集统计信息"""
+        total = self.grabbed_frames + self.decoded_frames
+        return {
+            'grabbed_frames': self.grabbed_frames,
+            'decoded_frames': self.decoded_frames,
+            'skip_ratio': self.grabbed_frames / total if total else 0.0
+        }
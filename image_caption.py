@@ -4,6 +4,7 @@ from PIL import Image
 import cv2
 import time
 import numpy as np
+from decoding_profiles import get_caption_profile, build_stopping_criteria
 
 def put_text_with_newlines(img, text, pos, font_face, font_scale, color, thickness, line_type):
     """
@@ -80,16 +81,17 @@ def main():
                 # 【核心修改】将输入数据移动到与模型相同的设备上
                 inputs = {k: v.to(device) for k, v in inputs.items()}
 
-                # 生成描述
+                # 生成描述：解码参数来自配置中的解码档位（fast / balanced / quality），
+                # 超出时间预算时提前停止，避免长时间beam search卡住显示循环
+                generate_kwargs = get_caption_profile()
+                stopping_criteria = build_stopping_criteria()
+                if stopping_criteria is not None:
+                    generate_kwargs['stopping_criteria'] = stopping_criteria
                 with torch.no_grad():
                     out = model.generate(
                         **inputs,
-                        max_length=150,           # 生成序列的最大长度，默认是20，可以适当增加
-                        num_beams=5,             # 使用 Beam Search，5个候选序列，能显著提升质量
-                        early_stopping=False,    # 不提前停止，让模型生成到 max_length
-                        repetition_penalty=1.5,  # 惩罚重复，值越大惩罚越重
-                        length_penalty=2,     # 鼓励生成长文本，值>1.0时越长越好
-                        num_return_sequences=1   # 只返回一个最好的序列
+                        num_return_sequences=1,  # 只返回一个最好的序列
+                        **generate_kwargs
                     )
                 
                 caption = processor.decode(out[0], skip_special_tokens=True)
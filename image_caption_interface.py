@@ -1,43 +1,86 @@
 import torch
+import transformers
+from packaging import version
 from transformers import BlipProcessor, BlipForConditionalGeneration
 from PIL import Image
 import cv2
 import numpy as np
 import time
+from config_loader import CONFIG
+from execution_backend import get_backend
+from fast_preprocess import FramePreprocessor
+from decoding_profiles import get_caption_profile, build_stopping_criteria
+from vision_cache import compute_frame_key, processor_signature, vision_backbone_signature
+
+# transformers 4.57起分组beam search（num_beam_groups / diversity_penalty）移到Hub的custom_generate仓库，
+# 调用时需要trust_remote_code并在线下载代码；这些版本中diverse_beam改用top-p采样
+GROUP_BEAM_SEARCH_AVAILABLE = version.parse(transformers.__version__).release < (4, 57)
 
 class ImageCaptionInterface:
     """图像描述生成接口类，支持摄像头图片处理"""
     
-    def __init__(self, model_path="./model"):
-        """初始化图像描述模型"""
+    def __init__(self, model_path="./model", vision_cache=None, backend=None, quantize=None, warmup=True):
+        """
+        初始化图像描述模型
+        
+        Args:
+            model_path: 本地模型路径
+            vision_cache: 可选的VisionEmbeddingCache，与VQA模型共享同一帧的预处理和视觉编码结果
+            backend: 可选的ExecutionBackend，默认使用进程内共享的后端
+            quantize: 是否使用动态int8量化模型（仅CPU），默认读取配置models.quantize
+            warmup: 是否在加载后立即预热；为False时由调用方稍后调用warmup()
+        """
         try:
-            # 加载处理器和模型
+            # 检测并设置设备
+            self.backend = backend or get_backend()
+            self.device = self.backend.device
+            
+            # 加载处理器和模型（图像描述模型保持float32权重）
             self.processor = BlipProcessor.from_pretrained(model_path, local_files_only=True)
-            self.model = BlipForConditionalGeneration.from_pretrained(model_path, local_files_only=True)
+            self.model = self.backend.load_model(
+                BlipForConditionalGeneration, model_path, dtype=torch.float32, quantize=quantize
+            )
             
-            # 检测并设置设备
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.model.to(self.device)
+            # 视觉特征缓存
+            self.vision_cache = vision_cache
+            self.frame_preprocessor = self._create_frame_preprocessor()
+            fast = ":fast" if self.frame_preprocessor is not None else ""
+            self.pixel_cache_kind = f"pixels:{processor_signature(self.processor)}:{self.device}{fast}"
+            self.embeds_cache_kind = f"embeds:{vision_backbone_signature(self.model, self.backend.autocast_dtype)}:{self.device}"
+            self._diverse_beam_fallback_logged = False
             
             print(f"[{time.strftime('%H:%M:%S')}] 图像描述模型已加载到设备: {self.device}")
             
             # 预热模型
-            self._warmup()
+            if warmup:
+                self.warmup()
             
         except Exception as e:
             print(f"[{time.strftime('%H:%M:%S')}] 模型加载失败: {e}")
             raise
     
-    def _warmup(self):
-        """模型预热"""
+    def warmup(self):
+        """模型预热：按实际调用方式（摄像头尺寸的帧、配置的解码档位）生成描述，编译模式下重复多次"""
         try:
             # 创建一个虚拟图像进行预热（模拟摄像头帧）
-            dummy_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            _ = self.generate_caption(dummy_frame)
-            print(f"[{time.strftime('%H:%M:%S')}] 模型预热完成")
+            camera_config = CONFIG["camera"]
+            dummy_frame = np.zeros((camera_config["height"], camera_config["width"], 3), dtype=np.uint8)
+            start_time = time.time()
+            for _ in range(self.backend.warmup_runs):
+                _ = self.generate_captions([dummy_frame])
+            print(f"[{time.strftime('%H:%M:%S')}] 模型预热完成，耗时 {time.time() - start_time:.2f}s")
         except Exception as e:
             print(f"[{time.strftime('%H:%M:%S')}] 预热失败，但不影响使用: {e}")
     
+    def _create_frame_preprocessor(self):
+        """摄像头帧的快速预处理（不经过PIL），可在配置preprocess.fast_path中关闭"""
+        preprocess_config = CONFIG.get("preprocess", {})
+        if not preprocess_config.get("fast_path", True):
+            return None
+        return FramePreprocessor.from_processor(
+            self.processor, interpolation=preprocess_config.get("interpolation", "auto")
+        )
+    
     def _preprocess_image(self, image):
         """预处理图片，支持多种输入格式"""
         if isinstance(image, str):
@@ -55,27 +98,90 @@ class ImageCaptionInterface:
             raise ValueError(f"[{time.strftime('%H:%M:%S')}] 不支持的图片格式: {type(image)}")
         return image
     
-    def generate_caption(self, image, max_length=150, num_beams=5):
-        """生成图像描述"""
-        try:
-            # 预处理图像
+    def _resolve_frame_key(self, image, frame_key):
+        """未启用缓存时不计算帧键"""
+        if self.vision_cache is None:
+            return None
+        return frame_key if frame_key is not None else compute_frame_key(image)
+    
+    def _get_pixel_values(self, image, frame_key=None):
+        """获取像素张量，同一帧只预处理一次"""
+        def compute():
+            if self.frame_preprocessor is not None and isinstance(image, np.ndarray):
+                # 结果位于复用的缓冲区，拷贝到推理设备后才可缓存或拼接
+                return self.frame_preprocessor(image).to(self.device, copy=True)
             pil_image = self._preprocess_image(image)
-            
-            # 准备输入
-            inputs = self.processor(pil_image, return_tensors="pt")
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            return self.processor(pil_image, return_tensors="pt")["pixel_values"].to(self.device)
+        
+        if frame_key is None:
+            pixel_values = compute()
+        else:
+            pixel_values = self.vision_cache.get_or_compute(frame_key, self.pixel_cache_kind, compute)
+        return pixel_values.to(self.model.dtype)
+    
+    def _get_image_embeds(self, image, frame_key=None):
+        """获取视觉编码器输出，同一帧只编码一次"""
+        def compute():
+            pixel_values = self._get_pixel_values(image, frame_key)
+            return self.model.vision_model(pixel_values=pixel_values)[0]
+        
+        if frame_key is None:
+            return compute()
+        image_embeds = self.vision_cache.get_or_compute(frame_key, self.embeds_cache_kind, compute)
+        return image_embeds.to(self.model.dtype)
+    
+    def _generate_from_image_embeds(self, image_embeds, **generate_kwargs):
+        """基于已编码的图像特征生成描述（与BlipForConditionalGeneration.generate等价）"""
+        batch_size = image_embeds.size(0)
+        image_attention_mask = torch.ones(image_embeds.size()[:-1], dtype=torch.long, device=image_embeds.device)
+        
+        text_config = self.model.config.text_config
+        input_ids = torch.LongTensor(
+            [[self.model.decoder_input_ids, text_config.eos_token_id]]
+        ).repeat(batch_size, 1).to(image_embeds.device)
+        input_ids[:, 0] = text_config.bos_token_id
+        
+        return self.model.text_decoder.generate(
+            input_ids=input_ids[:, :-1],
+            eos_token_id=text_config.sep_token_id,
+            pad_token_id=text_config.pad_token_id,
+            encoder_hidden_states=image_embeds,
+            encoder_attention_mask=image_attention_mask,
+            **generate_kwargs
+        )
+    
+    def _resolve_generate_kwargs(self, profile=None, time_budget=None, cancel_event=None, deadline=None, **overrides):
+        """合并解码档位、显式参数、时间预算和取消条件"""
+        generate_kwargs = get_caption_profile(profile)
+        generate_kwargs.update({k: v for k, v in overrides.items() if v is not None})
+        stopping_criteria = build_stopping_criteria(time_budget, cancel_event, deadline)
+        if stopping_criteria is not None:
+            generate_kwargs['stopping_criteria'] = stopping_criteria
+        return generate_kwargs
+    
+    def generate_caption(self, image, max_length=None, num_beams=None, repetition_penalty=None, frame_key=None,
+                         profile=None, time_budget=None):
+        """
+        生成图像描述
+        
+        Args:
+            image: 图片（文件路径、numpy数组或PIL Image）
+            max_length/num_beams/repetition_penalty: 显式指定时覆盖档位中的对应参数
+            frame_key: 可选的帧键，传入后与其他模型共享该帧的视觉特征
+            profile: 解码档位（fast / balanced / quality），默认读取配置
+            time_budget: 生成时间预算（秒），超时后提前停止，默认读取配置
+        """
+        try:
+            frame_key = self._resolve_frame_key(image, frame_key)
+            generate_kwargs = self._resolve_generate_kwargs(
+                profile, time_budget,
+                max_length=max_length, num_beams=num_beams, repetition_penalty=repetition_penalty
+            )
             
             # 生成描述
-            with torch.no_grad():
-                out = self.model.generate(
-                    **inputs,
-                    max_length=max_length,
-                    num_beams=num_beams,
-                    early_stopping=False,
-                    repetition_penalty=1.5,
-                    length_penalty=2,
-                    num_return_sequences=1
-                )
+            with self.backend.inference_context():
+                image_embeds = self._get_image_embeds(image, frame_key)
+                out = self._generate_from_image_embeds(image_embeds, num_return_sequences=1, **generate_kwargs)
             
             # 解码结果
             caption = self.processor.decode(out[0], skip_special_tokens=True)
@@ -85,49 +191,196 @@ class ImageCaptionInterface:
             print(f"[{time.strftime('%H:%M:%S')}] 生成描述时出错: {e}")
             return "生成失败"
     
-    def generate_captions_for_frame(self, frame, num_captions=3, **kwargs):
+    def _get_image_embeds_batch(self, images, frame_keys):
+        """多帧视觉特征：缓存未命中的帧合并为一个批次，只运行一次视觉编码器"""
+        image_embeds = [None] * len(images)
+        missing = []
+        for i, frame_key in enumerate(frame_keys):
+            cached = None if frame_key is None else self.vision_cache.get(frame_key, self.embeds_cache_kind)
+            if cached is not None:
+                image_embeds[i] = cached.to(self.model.dtype)
+            else:
+                missing.append(i)
+        
+        if missing:
+            pixel_values = torch.cat([self._get_pixel_values(images[i], frame_keys[i]) for i in missing])
+            encoded = self.model.vision_model(pixel_values=pixel_values)[0]
+            for row, i in enumerate(missing):
+                image_embeds[i] = encoded[row:row + 1]
+                if frame_keys[i] is not None:
+                    self.vision_cache.put(frame_keys[i], self.embeds_cache_kind, image_embeds[i])
+        return image_embeds
+    
+    def generate_captions(self, images, frame_keys=None, max_length=None, num_beams=None, repetition_penalty=None,
+                          profile=None, time_budget=None, cancel_event=None, deadline=None):
         """
-        为单个摄像头帧生成多个描述（仿VQA的batch_answer_questions）
+        多帧描述合批：视觉编码合并为一次，所有帧在一次generate中解码
+        
+        与batch_generate_captions不同，这里复用视觉特征缓存，适合调度器合并的实时请求。
         
         Args:
-            frame: 摄像头帧（numpy数组）
-            num_captions: 要生成的描述数量
-            **kwargs: generate_caption的其他参数
+            images: 图片列表
+            frame_keys: 与images对应的帧键列表，可为None
+            cancel_event: 可选的threading.Event，被设置后在下一个解码步停止（结果不完整，由调用方丢弃）
+            deadline: 可选的截止时间（time.time()时间戳），超过后同样停止生成
+            其他参数同generate_caption
             
         Returns:
-            list: 描述列表
+            list: 与images一一对应的描述
         """
-        results = []
-        for i in range(num_captions):
-            # 每次生成时稍微调整参数以获得不同的描述
-            caption = self.generate_caption(
-                frame, 
-                num_beams=kwargs.get('num_beams', 5) + i,  # 改变beam数量
-                max_length=kwargs.get('max_length', 150),
-                repetition_penalty=1.5 + i * 0.1  # 调整重复惩罚
+        if not images:
+            return []
+        try:
+            frame_keys = frame_keys or [None] * len(images)
+            frame_keys = [self._resolve_frame_key(image, key) for image, key in zip(images, frame_keys)]
+            generate_kwargs = self._resolve_generate_kwargs(
+                profile, time_budget, cancel_event, deadline,
+                max_length=max_length, num_beams=num_beams, repetition_penalty=repetition_penalty
             )
-            results.append({
-                'caption_id': i + 1,
-                'caption': caption
+            
+            with self.backend.inference_context():
+                image_embeds = torch.cat(self._get_image_embeds_batch(images, frame_keys))
+                out = self._generate_from_image_embeds(image_embeds, num_return_sequences=1, **generate_kwargs)
+            return self.processor.batch_decode(out, skip_special_tokens=True)
+            
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 多帧生成描述时出错: {e}")
+            return ["生成失败"] * len(images)
+    
+    def _diverse_generate_kwargs(self, num_captions, method, **kwargs):
+        """多样化描述的解码参数：分组beam search或top-p采样，一次返回num_captions条序列"""
+        generate_kwargs = {
+            'max_length': kwargs.get('max_length', get_caption_profile().get('max_length', 60)),
+            'repetition_penalty': kwargs.get('repetition_penalty', 1.5),
+            'num_return_sequences': num_captions,
+        }
+        if method == "diverse_beam" and not GROUP_BEAM_SEARCH_AVAILABLE:
+            if not self._diverse_beam_fallback_logged:
+                print(f"[{time.strftime('%H:%M:%S')}] transformers {transformers.__version__} "
+                      f"不再内置分组beam search，多样化描述改用采样")
+                self._diverse_beam_fallback_logged = True
+            method = "sampling"
+        if method == "diverse_beam":
+            # 每组至少一个beam，组间用多样性惩罚拉开差异
+            beams_per_group = max(1, kwargs.get('num_beams', 2 * num_captions) // num_captions)
+            generate_kwargs.update({
+                'num_beams': beams_per_group * num_captions,
+                'num_beam_groups': num_captions,
+                'diversity_penalty': kwargs.get('diversity_penalty', 1.0),
+                'early_stopping': True,
             })
-        return results
+        elif method == "sampling":
+            generate_kwargs.update({
+                'do_sample': True,
+                'top_p': kwargs.get('top_p', 0.9),
+                'temperature': kwargs.get('temperature', 0.8),
+            })
+        else:
+            raise ValueError(f"未知的多样化生成方式: {method}")
+        stopping_criteria = build_stopping_criteria(kwargs.get('time_budget'))
+        if stopping_criteria is not None:
+            generate_kwargs['stopping_criteria'] = stopping_criteria
+        return generate_kwargs
     
-    def batch_generate_captions(self, frames, **kwargs):
+    def generate_captions_for_frame(self, frame, num_captions=3, method="diverse_beam", frame_key=None, **kwargs):
         """
-        批量生成图像描述（完全仿VQA的batch_answer_questions）
+        为单个摄像头帧生成多个不同的描述
+        
+        只调用一次generate：图像只预处理、编码一次，
+        通过分组beam search（组间多样性惩罚）或采样一次返回num_captions条描述。
         
         Args:
-            frames: 图像列表（可以是文件路径、numpy数组、PIL Image的混合）
-            **kwargs: generate_caption的其他参数
+            frame: 摄像头帧（numpy数组）
+            num_captions: 要生成的描述数量
+            method: "diverse_beam"（分组beam search，transformers 4.57起改用采样）或 "sampling"（top-p采样）
+            frame_key: 可选的帧键，传入后与其他模型共享该帧的视觉特征
+            **kwargs: 解码参数（max_length、num_beams、diversity_penalty、top_p、temperature、time_budget）
             
         Returns:
             list: 描述列表
         """
-        results = []
-        for i, frame in enumerate(frames):
-            caption = self.generate_caption(frame, **kwargs)
-            results.append({
-                'frame_index': i,
-                'caption': caption
-            })
-        return results
+        try:
+            frame_key = self._resolve_frame_key(frame, frame_key)
+            generate_kwargs = self._diverse_generate_kwargs(num_captions, method, **kwargs)
+            
+            with self.backend.inference_context():
+                image_embeds = self._get_image_embeds(frame, frame_key)
+                out = self._generate_from_image_embeds(image_embeds, **generate_kwargs)
+            captions = self.processor.batch_decode(out, skip_special_tokens=True)
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 生成多个描述时出错: {e}")
+            captions = ["生成失败"] * num_captions
+        
+        return [{'caption_id': i + 1, 'caption': caption} for i, caption in enumerate(captions)]
+    
+    def _iter_chunks(self, frames, batch_size):
+        """将输入按batch_size切块，附带原始序号；支持任意可迭代对象"""
+        chunk = []
+        for index, frame in enumerate(frames):
+            chunk.append((index, frame))
+            if len(chunk) >= batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _generate_chunk(self, images, generate_kwargs):
+        """对一批已转换为PIL的图片执行一次预处理、视觉编码和generate"""
+        pixel_values = self.processor(images, return_tensors="pt")["pixel_values"]
+        pixel_values = pixel_values.to(self.device, self.model.dtype)
+        with self.backend.inference_context():
+            image_embeds = self.model.vision_model(pixel_values=pixel_values)[0]
+            out = self._generate_from_image_embeds(image_embeds, num_return_sequences=1, **generate_kwargs)
+        return self.processor.batch_decode(out, skip_special_tokens=True)
+    
+    def batch_generate_captions(self, frames, batch_size=None, max_length=None, num_beams=None,
+                                repetition_penalty=None, profile=None, time_budget=None):
+        """
+        批量生成图像描述（生成器）
+        
+        按batch_size将帧堆叠成张量，每块只调用一次generate，逐块产出结果，
+        输入很多时内存占用也只与块大小有关。
+        
+        Args:
+            frames: 图像列表或可迭代对象（可以是文件路径、numpy数组、PIL Image的混合）
+            batch_size: 每块的帧数，默认读取配置caption.batch_size
+            max_length/num_beams/repetition_penalty/profile: 同generate_caption
+            time_budget: 每块的生成时间预算（秒），默认读取配置
+            
+        Yields:
+            dict: {'frame_index': 原始序号, 'caption': 描述}，按输入顺序产出
+        """
+        if batch_size is None:
+            batch_size = CONFIG.get("caption", {}).get("batch_size", 8)
+        batch_size = max(1, int(batch_size))
+        
+        for chunk in self._iter_chunks(frames, batch_size):
+            # 逐帧转换格式，单帧失败不影响同块的其他帧
+            captions = {}
+            images = []
+            indices = []
+            for index, frame in chunk:
+                try:
+                    images.append(self._preprocess_image(frame).convert("RGB"))
+                    indices.append(index)
+                except Exception as e:
+                    print(f"[{time.strftime('%H:%M:%S')}] 第 {index} 帧预处理失败: {e}")
+                    captions[index] = "生成失败"
+            
+            if images:
+                try:
+                    # 每块重新构建停止条件，时间预算从该块开始计时
+                    generate_kwargs = self._resolve_generate_kwargs(
+                        profile, time_budget,
+                        max_length=max_length, num_beams=num_beams, repetition_penalty=repetition_penalty
+                    )
+                    captions.update(zip(indices, self._generate_chunk(images, generate_kwargs)))
+                except Exception as e:
+                    print(f"[{time.strftime('%H:%M:%S')}] 批量生成描述时出错（第 {chunk[0][0]}-{chunk[-1][0]} 帧）: {e}")
+                    captions.update((index, "生成失败") for index in indices)
+            
+            for index, _ in chunk:
+                yield {
+                    'frame_index': index,
+                    'caption': captions[index]
+                }
\ No newline at end of file
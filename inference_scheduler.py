@@ -0,0 +1,429 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from config_loader import CONFIG
+from result_cache import perceptual_hash
+
+# 请求优先级（数值越小越先执行）：紧急请求不可取消，常规请求（图像描述、可疑人员检测）可被抢占
+PRIORITY_EMERGENCY = 0
+PRIORITY_ROUTINE = 1
+# 停止标记排在所有已提交的请求之后
+_PRIORITY_STOP = 99
+
+
+class InferenceCancelled(Exception):
+    """常规请求在执行中被紧急请求抢占"""
+
+
+class DeadlineExceeded(InferenceCancelled):
+    """请求未能在截止时间前完成"""
+
+
+class CancelEvent(threading.Event):
+    """
+    分组的停止信号：调度器抢占时set()；生成的停止条件（CancellationCriteria）因抢占或截止时间
+    实际中途停止生成时调用mark_stopped()，只有这时输出才不完整
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.stopped = False
+
+    def mark_stopped(self):
+        self.stopped = True
+
+
+class _Job:
+    """一个待执行的推理请求"""
+
+    __slots__ = ('future', 'task', 'frame', 'kwargs', 'priority', 'deadline', 'use_cache', 'submit_time')
+
+    def __init__(self, task, frame, kwargs, priority=PRIORITY_ROUTINE, deadline=None, use_cache=True):
+        self.future = Future()
+        self.task = task
+        self.frame = frame
+        self.kwargs = kwargs
+        self.priority = priority
+        self.deadline = deadline
+        self.use_cache = use_cache
+        self.submit_time = time.time()
+
+
+class InferenceScheduler:
+    """
+    微批推理调度器
+
+    摄像头处理线程、紧急处理线程和推理服务连接都把请求交给同一个调度器，只有调度器的
+    工作线程访问模型：收集一个时间窗口内（或达到最大条数）的请求，按任务类型和参数分组，
+    每组合并为一次前向计算，再逐个完成请求的Future。
+    请求按优先级排队：紧急请求到达时，正在执行的常规请求通过generate的停止条件中途取消
+    （以InferenceCancelled失败），尚未开始的常规请求放回队列，紧急请求随即执行。
+    带截止时间的请求超时后以DeadlineExceeded失败。
+    同时提供与VQAInterface / ImageCaptionInterface相同的阻塞调用方法，可直接替代模型对象。
+    """
+
+    def __init__(self, vqa_model=None, caption_model=None, window_ms=None, max_batch_size=None, model_loader=None,
+                 result_cache=None, preemption=None):
+        """
+        Args:
+            vqa_model: VQAInterface
+            caption_model: ImageCaptionInterface
+            window_ms: 收集请求的时间窗口（毫秒），默认读取配置scheduler.window_ms
+            max_batch_size: 每批最多合并的请求数，默认读取配置scheduler.max_batch_size
+            model_loader: 可选的模型加载函数，返回 (vqa_model, caption_model)，在工作线程中调用
+            result_cache: 可选的ResultCache，近似帧上的相同问题直接复用之前的答案
+            preemption: 是否允许紧急请求抢占正在执行的常规请求，默认读取配置scheduler.preemption
+        """
+        scheduler_config = CONFIG.get("scheduler", {})
+        self.vqa_model = vqa_model
+        self.caption_model = caption_model
+        window_ms = window_ms if window_ms is not None else scheduler_config.get("window_ms", 20)
+        self.window = max(0.0, window_ms / 1000)
+        self.max_batch_size = max(1, int(max_batch_size or scheduler_config.get("max_batch_size", 8)))
+        self.model_loader = model_loader
+        self.result_cache = result_cache
+        self.preemption = preemption if preemption is not None else scheduler_config.get("preemption", True)
+        self._jobs = queue.PriorityQueue()
+        self._sequence = 0
+        self._worker = None
+        self._running = False
+        self._stop_requested = False
+        # 正在执行的分组：优先级、取消事件和收到抢占请求的时间
+        self._lock = threading.Lock()
+        self._active_priority = None
+        self._active_cancel = None
+        self._preempt_time = None
+
+        # 统计信息
+        self.batch_count = 0
+        self.job_count = 0
+        self.max_batch_seen = 0
+        self.total_batch_time = 0.0
+        self.total_wait_time = 0.0
+        self.preemption_count = 0
+        self.cancelled_count = 0
+        self.expired_count = 0
+        self.total_preempt_latency = 0.0
+        self.max_preempt_latency = 0.0
+
+    def start(self):
+        """启动工作线程（启动前提交的请求会排队等待）"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._running = True
+        self._stop_requested = False
+        self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self._worker.start()
+
+    def submit(self, task, frame, priority=PRIORITY_ROUTINE, deadline=None, use_cache=True, **kwargs):
+        """
+        提交推理请求
+
+        Args:
+            task: 任务类型，'vqa'（需要questions参数）、'caption' 或 'ping'
+            frame: 图像帧
+            priority: PRIORITY_EMERGENCY 或 PRIORITY_ROUTINE
+            deadline: 可选的截止时间（time.time()时间戳），超时后请求以DeadlineExceeded失败
+            use_cache: VQA请求是否可以复用结果缓存中近似帧的答案（答案总会写入缓存）
+            **kwargs: 任务参数
+
+        Returns:
+            Future: 请求结果
+        """
+        job = _Job(task, frame, kwargs, priority, deadline, use_cache)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            if (self._active_cancel is not None and priority < self._active_priority
+                    and not self._active_cancel.is_set()):
+                self._preempt_time = job.submit_time
+                self._active_cancel.set()
+                print(f"[{time.strftime('%H:%M:%S')}] 紧急推理请求到达，抢占正在执行的常规推理")
+        self._jobs.put((priority, sequence, job))
+        return job.future
+
+    def _requeue(self, job):
+        """已开始执行的请求放回队列（保持原有顺序）"""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        self._jobs.put((job.priority, sequence, job))
+
+    def _peek_priority(self):
+        """队首请求的优先级，队列为空时返回None"""
+        with self._jobs.mutex:
+            return self._jobs.queue[0][0] if self._jobs.queue else None
+
+    def _worker_loop(self):
+        """工作线程：按需加载模型，然后循环收集并执行批次"""
+        if self.model_loader is not None:
+            try:
+                self.vqa_model, self.caption_model = self.model_loader()
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] 推理调度器模型加载失败: {e}")
+                self._running = False
+
+        while True:
+            jobs = self._collect()
+            if jobs:
+                self._run_batch(jobs)
+            if self._stop_requested:
+                break
+
+    def _collect(self):
+        """阻塞等待第一个请求，然后在时间窗口内继续收集，直到达到最大条数（紧急请求不等待）"""
+        _, _, job = self._jobs.get()
+        if job is None:
+            self._stop_requested = True
+            return []
+        jobs = [job]
+        window = 0.0 if job.priority <= PRIORITY_EMERGENCY else self.window
+        window_end = time.time() + window
+        while len(jobs) < self.max_batch_size:
+            remaining = window_end - time.time()
+            if remaining <= 0:
+                break
+            try:
+                _, _, job = self._jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                self._stop_requested = True
+                break
+            jobs.append(job)
+        return jobs
+
+    @staticmethod
+    def _group_key(job):
+        """可以合并为一次前向计算的请求具有相同的分组键"""
+        if job.task == 'vqa':
+            return ('vqa', bool(job.kwargs.get('binary', False)))
+        if job.task == 'caption':
+            options = tuple(sorted((k, repr(v)) for k, v in job.kwargs.items() if k != 'frame_key'))
+            return ('caption', options)
+        return (job.task,)
+
+    def _run_batch(self, jobs):
+        """按优先级分组执行一批请求并完成对应的Future"""
+        # 被抢占后放回队列的请求已处于运行状态
+        jobs = [job for job in jobs if job.future.running() or job.future.set_running_or_notify_cancel()]
+        if not jobs:
+            return
+
+        start_time = time.time()
+        if not self._running:
+            for job in jobs:
+                job.future.set_exception(RuntimeError("推理调度器未运行"))
+            return
+
+        groups = {}
+        for job in jobs:
+            if job.deadline is not None and start_time > job.deadline:
+                self.expired_count += 1
+                job.future.set_exception(DeadlineExceeded("推理请求在开始执行前已超过截止时间"))
+                continue
+            groups.setdefault((job.priority,) + self._group_key(job), []).append(job)
+
+        executed = []
+        ordered = sorted(groups.items(), key=lambda item: item[0][0])
+        for index, (key, group) in enumerate(ordered):
+            waiting = self._peek_priority()
+            if self.preemption and waiting is not None and waiting < key[0]:
+                # 有更高优先级的请求在排队：剩余分组放回队列，先执行紧急请求
+                for _, remaining in ordered[index:]:
+                    for job in remaining:
+                        self._requeue(job)
+                break
+            self._execute_group(group)
+            executed.extend(group)
+        if not executed:
+            return
+
+        self.batch_count += 1
+        self.job_count += len(executed)
+        self.max_batch_seen = max(self.max_batch_seen, len(executed))
+        self.total_batch_time += time.time() - start_time
+        self.total_wait_time += sum(start_time - job.submit_time for job in executed)
+
+    def _execute_group(self, group):
+        """
+        执行一个分组：常规分组可被抢占，结束后按生成是否被中途停止完成Future
+
+        合批后的generate只能整体停止，以分组中最早的截止时间为准；因截止时间停止时，只有已超过
+        各自截止时间的请求以DeadlineExceeded失败，其余请求（包括没有截止时间的）放回队列重新执行。
+        """
+        priority = group[0].priority
+        preemptible = self.preemption and priority > PRIORITY_EMERGENCY
+        deadlines = [job.deadline for job in group if job.deadline is not None]
+        deadline = min(deadlines) if deadlines else None
+        cancel_event = CancelEvent() if preemptible or deadline is not None else None
+        with self._lock:
+            self._active_priority = priority
+            self._active_cancel = cancel_event if preemptible else None
+
+        error = None
+        results = None
+        try:
+            results = self._run_group(group, cancel_event, deadline)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                self._active_priority = None
+                self._active_cancel = None
+                preempt_time = self._preempt_time
+                self._preempt_time = None
+
+        # 只有生成确实被中途停止时结果才不完整；抢占到达前已完成的分组（如是非题打分）照常返回结果
+        truncated = error is None and cancel_event is not None and cancel_event.stopped
+        if truncated and cancel_event.is_set():
+            # 抢占延迟：紧急请求到达到常规推理让出模型
+            latency = time.time() - preempt_time
+            self.preemption_count += 1
+            self.cancelled_count += len(group)
+            self.total_preempt_latency += latency
+            self.max_preempt_latency = max(self.max_preempt_latency, latency)
+            print(f"[{time.strftime('%H:%M:%S')}] 常规推理已被抢占，取消 {len(group)} 个请求，"
+                  f"抢占延迟 {latency * 1000:.0f}ms")
+            error = InferenceCancelled("推理请求被紧急请求抢占")
+        elif truncated:
+            now = time.time()
+            for job in group:
+                if job.deadline is not None and now > job.deadline:
+                    self.expired_count += 1
+                    job.future.set_exception(DeadlineExceeded("推理请求未能在截止时间前完成"))
+                else:
+                    self._requeue(job)
+            return
+
+        if error is not None:
+            for job in group:
+                job.future.set_exception(error)
+        else:
+            for job, result in zip(group, results):
+                job.future.set_result(result)
+
+    def _run_group(self, group, cancel_event=None, deadline=None):
+        """
+        执行同一分组的请求，返回与请求一一对应的结果
+
+        cancel_event和deadline用于中途停止generate；是否实际停止由cancel_event.stopped记录。
+        """
+        task = group[0].task
+        if task == 'vqa':
+            return self._run_vqa_group(group, cancel_event, deadline)
+        if task == 'caption':
+            caption_kwargs = {k: v for k, v in group[0].kwargs.items() if k != 'frame_key'}
+            return self.caption_model.generate_captions(
+                [job.frame for job in group], [job.kwargs.get('frame_key') for job in group],
+                cancel_event=cancel_event, deadline=deadline, **caption_kwargs
+            )
+        if task == 'ping':
+            return ['pong'] * len(group)
+        raise ValueError(f"未知的任务类型: {task}")
+
+    def _run_vqa_group(self, group, cancel_event=None, deadline=None):
+        """
+        VQA请求：先查结果缓存，只把未命中的问题合批送入模型
+
+        use_cache=False的请求不查缓存（如大面积运动触发的紧急检查：近似帧的哈希距离对局部变化
+        不敏感，复用旧答案可能漏报），其新答案仍写入缓存。
+        """
+        binary = group[0].kwargs.get('binary', False)
+        frame_hashes = []
+        cached = []
+        requests = []
+        for job in group:
+            questions = job.kwargs['questions']
+            frame_hash = perceptual_hash(job.frame) if self.result_cache is not None else None
+            hits = {}
+            if frame_hash is not None and job.use_cache:
+                for question in questions:
+                    result = self.result_cache.get(frame_hash, question, binary)
+                    if result is not None:
+                        hits[question] = result
+            frame_hashes.append(frame_hash)
+            cached.append(hits)
+            requests.append((job.frame, [q for q in questions if q not in hits], job.kwargs.get('frame_key')))
+
+        if any(missing for _, missing, _ in requests):
+            outputs = self.vqa_model.answer_frames(requests, binary=binary, cancel_event=cancel_event,
+                                                   deadline=deadline)
+        else:
+            outputs = [[] for _ in requests]
+
+        # 被中途停止的generate输出不完整，不写入缓存
+        truncated = cancel_event is not None and cancel_event.stopped
+        results = []
+        for job, frame_hash, hits, answered in zip(group, frame_hashes, cached, outputs):
+            answered = {result['question']: result for result in answered}
+            if self.result_cache is not None and not truncated:
+                for question, result in answered.items():
+                    if result['answer'] != "处理失败":
+                        self.result_cache.put(frame_hash, question, binary, result)
+            results.append([hits.get(question) or answered[question] for question in job.kwargs['questions']])
+        return results
+
+    def batch_answer_questions(self, image, questions, frame_key=None, binary=False, priority=PRIORITY_ROUTINE,
+                               deadline=None, use_cache=True):
+        """批量回答多个问题（经由调度器合批；被抢占或超时时抛出InferenceCancelled）"""
+        try:
+            return self.submit('vqa', image, priority=priority, deadline=deadline, use_cache=use_cache,
+                               questions=list(questions), frame_key=frame_key, binary=binary).result()
+        except InferenceCancelled:
+            raise
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] VQA处理出错: {e}")
+            return [{'question': question, 'answer': "处理失败"} for question in questions]
+
+    def answer_question(self, image, question, frame_key=None):
+        """对图片回答问题"""
+        return self.batch_answer_questions(image, [question], frame_key=frame_key)[0]['answer']
+
+    def generate_caption(self, image, frame_key=None, priority=PRIORITY_ROUTINE, deadline=None, **kwargs):
+        """生成图像描述（经由调度器合批；被抢占或超时时抛出InferenceCancelled）"""
+        try:
+            return self.submit('caption', image, priority=priority, deadline=deadline, frame_key=frame_key,
+                               **kwargs).result()
+        except InferenceCancelled:
+            raise
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 生成描述时出错: {e}")
+            return "生成失败"
+
+    def stop(self, wait=False):
+        """
+        处理完已提交的请求后停止工作线程
+
+        Args:
+            wait: 是否等待工作线程退出（释放模型内存前需要等待，否则线程可能仍在使用模型）
+        """
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        self._jobs.put((_PRIORITY_STOP, sequence, None))
+        worker = self._worker
+        if wait and worker is not None and worker is not threading.current_thread():
+            worker.join()
+
+    def get_statistics(self):
+        """获取统计信息"""
+        stats = {
+            'batches': self.batch_count,
+            'jobs': self.job_count,
+            'pending_jobs': self._jobs.qsize(),
+            'avg_batch_size': self.job_count / self.batch_count if self.batch_count > 0 else 0,
+            'max_batch_size': self.max_batch_seen,
+            'avg_batch_time': self.total_batch_time / self.batch_count if self.batch_count > 0 else 0,
+            'avg_wait_time': self.total_wait_time / self.job_count if self.job_count > 0 else 0,
+            'preemptions': self.preemption_count,
+            'cancelled_jobs': self.cancelled_count,
+            'expired_jobs': self.expired_count,
+            'avg_preempt_latency': (self.total_preempt_latency / self.preemption_count
+                                    if self.preemption_count > 0 else 0),
+            'max_preempt_latency': self.max_preempt_latency
+        }
+        if self.result_cache is not None:
+            stats['result_cache'] = self.result_cache.get_statistics()
+        return stats
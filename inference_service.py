@@ -0,0 +1,290 @@
+import os
+import secrets
+import stat
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from config_loader import CONFIG
+from inference_scheduler import InferenceScheduler
+from result_cache import create_result_cache
+
+
+def _authkey_path():
+    """认证密钥文件路径（相对路径以程序目录为基准）"""
+    path = CONFIG.get("inference_service", {}).get("authkey_file", "inference_service.key")
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+def load_authkey(create=False):
+    """
+    读取推理服务认证密钥
+
+    服务通过pickle交换数据，持有密钥即可在模型进程中执行任意代码，因此密钥不能是公开的常量：
+    服务端首次启动时随机生成，保存在仅当前用户可读写（0600）的文件中，客户端从同一文件读取。
+
+    Args:
+        create: 文件不存在时是否生成（仅服务端）
+
+    Returns:
+        bytes: 认证密钥
+
+    Raises:
+        FileNotFoundError: 密钥文件不存在（服务从未启动过）
+    """
+    path = _authkey_path()
+    if create:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            print(f"[{time.strftime('%H:%M:%S')}] 已生成推理服务认证密钥: {path}")
+        if os.name == "posix" and stat.S_IMODE(os.stat(path).st_mode) & 0o077:
+            # 其他用户可读的密钥文件收紧为0600
+            os.chmod(path, 0o600)
+            print(f"[{time.strftime('%H:%M:%S')}] 推理服务认证密钥文件权限过宽，已改为0600")
+    with open(path, "rb") as f:
+        authkey = f.read().strip()
+    if not authkey:
+        raise ValueError(f"推理服务认证密钥文件为空: {path}")
+    return authkey
+
+
+def get_service_address(create_authkey=False):
+    """从配置读取推理服务地址，从密钥文件读取认证密钥（create_authkey见load_authkey）"""
+    service_config = CONFIG.get("inference_service", {})
+    address = (service_config.get("host", "127.0.0.1"), service_config.get("port", 6060))
+    return address, load_authkey(create=create_authkey)
+
+
+class InferenceService:
+    """
+    常驻推理服务
+
+    VQAInterface和ImageCaptionInterface只加载一次，所有帧分析任务交给同一个InferenceScheduler，
+    由其工作线程按时间窗口合批执行。既可以在进程内直接submit，也可以通过本地socket为
+    starting_main.py / emergency.py等客户端脚本提供服务。
+    """
+
+    def __init__(self, vqa_model=None, caption_model=None):
+        """
+        Args:
+            vqa_model: 已加载的VQA模型（为None时由工作线程加载）
+            caption_model: 已加载的图像描述模型（为None时由工作线程加载）
+        """
+        self.vqa_model = vqa_model
+        self.caption_model = caption_model
+        self.scheduler = InferenceScheduler(
+            vqa_model, caption_model, model_loader=self.load_models, result_cache=create_result_cache()
+        )
+        self._listener = None
+        self._listener_thread = None
+        self._running = False
+        self.ready = threading.Event()
+
+    def load_models(self):
+        """加载模型（仅在首次调用时真正加载）"""
+        if self.vqa_model is None or self.caption_model is None:
+            from vqa_interface import VQAInterface
+            from image_caption_interface import ImageCaptionInterface
+            from vision_cache import VisionEmbeddingCache
+
+            print(f"[{time.strftime('%H:%M:%S')}] 推理服务正在加载模型...")
+            vision_cache = VisionEmbeddingCache(max_entries=CONFIG["models"].get("vision_cache_size", 4))
+            if self.vqa_model is None:
+                self.vqa_model = VQAInterface(model_path=CONFIG["models"]["vqa_path"], vision_cache=vision_cache)
+            if self.caption_model is None:
+                self.caption_model = ImageCaptionInterface(
+                    CONFIG["models"]["image_caption_path"], vision_cache=vision_cache
+                )
+        self.ready.set()
+        print(f"[{time.strftime('%H:%M:%S')}] 推理服务模型就绪")
+        return self.vqa_model, self.caption_model
+
+    def start(self):
+        """启动调度器工作线程（模型在工作线程中加载，任务在加载完成前排队等待）"""
+        self._running = True
+        self.scheduler.start()
+
+    def submit(self, task, frame, **kwargs):
+        """
+        提交帧分析任务
+
+        Args:
+            task: 任务类型，'vqa'（需要questions参数）或 'caption'
+            frame: 图像帧
+            **kwargs: 任务参数
+
+        Returns:
+            Future: 任务结果
+        """
+        return self.scheduler.submit(task, frame, **kwargs)
+
+    def start_server(self, address=None, authkey=None):
+        """
+        启动本地socket服务，供外部脚本以客户端方式调用
+
+        Raises:
+            OSError: 端口已被占用（例如另一个启动器已在运行推理服务）
+        """
+        default_address, default_authkey = get_service_address(create_authkey=True)
+        address = address or default_address
+        authkey = authkey or default_authkey
+
+        # 先绑定端口，失败时不启动调度器
+        self._listener = Listener(address, authkey=authkey)
+        self.start()
+        self._listener_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._listener_thread.start()
+        print(f"[{time.strftime('%H:%M:%S')}] 推理服务已启动: {address[0]}:{address[1]}")
+
+    def _accept_loop(self):
+        """接受客户端连接，每个连接一个处理线程"""
+        while self._running:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                break
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] 推理服务连接失败: {e}")
+                continue
+            threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def _handle_connection(self, conn):
+        """处理一个客户端连接上的所有请求"""
+        try:
+            while True:
+                try:
+                    task, frame, kwargs = conn.recv()
+                except EOFError:
+                    break
+                try:
+                    result = self.submit(task, frame, **kwargs).result()
+                    conn.send(('ok', result))
+                except Exception as e:
+                    conn.send(('error', str(e)))
+        finally:
+            conn.close()
+
+    def stop(self):
+        """停止服务"""
+        self._running = False
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
+        self.scheduler.stop()
+
+    def get_statistics(self):
+        """获取统计信息"""
+        stats = {'ready': self.ready.is_set()}
+        stats.update(self.scheduler.get_statistics())
+        return stats
+
+
+class InferenceClient:
+    """推理服务客户端，提供与VQAInterface / ImageCaptionInterface相同的调用方式"""
+
+    def __init__(self, address=None, authkey=None):
+        default_address, default_authkey = get_service_address()
+        self.conn = Client(address or default_address, authkey=authkey or default_authkey)
+        self._lock = threading.Lock()
+
+    def _call(self, task, frame, **kwargs):
+        with self._lock:
+            self.conn.send((task, frame, kwargs))
+            status, payload = self.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(f"推理服务返回错误: {payload}")
+        return payload
+
+    def ping(self):
+        """检查服务是否可用"""
+        return self._call('ping', None) == 'pong'
+
+    def batch_answer_questions(self, image, questions, frame_key=None, binary=False):
+        """批量回答多个问题"""
+        try:
+            return self._call('vqa', image, questions=list(questions), frame_key=frame_key, binary=binary)
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] VQA处理出错: {e}")
+            return [{'question': question, 'answer': "处理失败"} for question in questions]
+
+    def answer_question(self, image, question, frame_key=None):
+        """对图片回答问题"""
+        return self.batch_answer_questions(image, [question], frame_key=frame_key)[0]['answer']
+
+    def generate_caption(self, image, frame_key=None, **kwargs):
+        """生成图像描述"""
+        try:
+            return self._call('caption', image, frame_key=frame_key, **kwargs)
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 生成描述时出错: {e}")
+            return "生成失败"
+
+    def close(self):
+        """关闭连接"""
+        self.conn.close()
+
+
+def start_shared_service():
+    """
+    启动器使用：启动常驻推理服务；端口已被占用时不再重复启动
+
+    另一个启动器已在运行服务时，starting_main.py / emergency.py通过connect_or_load()连接该服务；
+    服务不可用时它们退回到在本进程中加载模型。
+
+    Returns:
+        InferenceService或None: 本进程启动的服务，未启动时为None
+    """
+    service = InferenceService()
+    try:
+        service.start_server()
+        return service
+    except OSError as e:
+        try:
+            client = InferenceClient()
+            client.ping()
+            client.close()
+            print(f"[{time.strftime('%H:%M:%S')}] 推理服务已在运行（{e}），使用现有服务")
+        except Exception:
+            print(f"[{time.strftime('%H:%M:%S')}] 推理服务启动失败（{e}），子脚本将在各自进程中加载模型")
+        return None
+
+
+def connect_or_load():
+    """
+    获取模型调用对象
+
+    常驻推理服务可用时返回客户端（无需导入torch和加载权重），
+    否则退回到在当前进程中加载模型。
+
+    Returns:
+        tuple: (vqa, caption_interface)
+    """
+    try:
+        client = InferenceClient()
+        print(f"[{time.strftime('%H:%M:%S')}] 已连接常驻推理服务")
+        return client, client
+    except (OSError, ValueError, AuthenticationError) as e:
+        print(f"[{time.strftime('%H:%M:%S')}] 推理服务不可用（{e}），在本进程中加载模型")
+        service = InferenceService()
+        service.load_models()
+        return service.vqa_model, service.caption_model
+
+
+if __name__ == "__main__":
+    # 独立运行推理服务
+    service = InferenceService()
+    service.start_server()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n[{time.strftime('%H:%M:%S')}] 推理服务正在停止...")
+        service.stop()
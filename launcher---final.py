@@ -11,24 +11,87 @@ import threading
 import queue
 import pygame
 import os
-from vqa_interface import VQAInterface
-from image_caption_interface import ImageCaptionInterface
+from vision_cache import VisionEmbeddingCache, compute_frame_key
+from question_cascade import QuestionCascade, QuestionRule
+from inference_scheduler import InferenceScheduler, InferenceCancelled, PRIORITY_EMERGENCY, PRIORITY_ROUTINE
+from model_lifecycle import ModelLifecycleManager, ModelLoadTimeout
+from startup_profiler import StartupProfiler
+from result_cache import create_result_cache
+from roi import build_vqa_input
+from adaptive_interval import AdaptiveIntervalController
 from send_email_v2 import send_frame_as_email
 from config_loader import CONFIG
+from motion_pipeline import MotionAnalyzer
+from frame_capture import SleepAwareCapture
 
 # 全局模型实例
 vqa_model = None
 caption_model = None
+vision_cache = VisionEmbeddingCache(max_entries=CONFIG["models"].get("vision_cache_size", 4))
+question_cascade = None
+inference_scheduler = None
+# 近似帧的VQA结果缓存，不随模型卸载而清空
+result_cache = create_result_cache()
+
+# 启动耗时记录；模型加载进度由后台线程写入、界面定时读取
+startup_profiler = StartupProfiler()
+model_load_status = {'stage': "等待加载", 'progress': 0}
+
+# 紧急情况和可疑人员的判定规则
+EMERGENCY_RULE = QuestionRule.from_config("emergency", CONFIG["emergency"], "questions")
+SUSPICIOUS_RULE = QuestionRule.from_config("suspicious", CONFIG["emergency"], "suspicious_questions")
+
+def _set_load_status(stage, progress):
+    """更新模型加载进度"""
+    model_load_status['stage'] = stage
+    model_load_status['progress'] = progress
 
 def initialize_models():
-    """一次性加载所有模型"""
-    global vqa_model, caption_model
-    if vqa_model is None:
-        print(f"[{time.strftime('%H:%M:%S')}] 正在加载VQA模型...")
-        vqa_model = VQAInterface(model_path=CONFIG["models"]["vqa_path"])
-    if caption_model is None:
-        print(f"[{time.strftime('%H:%M:%S')}] 正在加载图像描述模型...")
-        caption_model = ImageCaptionInterface(CONFIG["models"]["image_caption_path"])
+    """一次性加载所有模型（在后台线程中调用，torch/transformers也在此时才导入）"""
+    global vqa_model, caption_model, question_cascade, inference_scheduler
+    try:
+        _set_load_status("导入模型库", 5)
+        with startup_profiler.stage("导入模型库"):
+            from vqa_interface import VQAInterface
+            from image_caption_interface import ImageCaptionInterface
+        if vqa_model is None:
+            _set_load_status("加载VQA模型", 30)
+            print(f"[{time.strftime('%H:%M:%S')}] 正在加载VQA模型...")
+            with startup_profiler.stage("加载VQA权重"):
+                vqa_model = VQAInterface(model_path=CONFIG["models"]["vqa_path"], vision_cache=vision_cache)
+        if caption_model is None:
+            _set_load_status("加载图像描述模型", 55)
+            print(f"[{time.strftime('%H:%M:%S')}] 正在加载图像描述模型...")
+            with startup_profiler.stage("加载描述权重"):
+                caption_model = ImageCaptionInterface(
+                    CONFIG["models"]["image_caption_path"], vision_cache=vision_cache, warmup=False
+                )
+        _set_load_status("模型预热", 80)
+        with startup_profiler.stage("模型预热"):
+            vqa_model.warmup()
+            caption_model.warmup()
+    except Exception:
+        _set_load_status("模型加载失败", 0)
+        raise
+    if inference_scheduler is None:
+        # 各处理线程经由调度器访问模型：并发请求合批执行，不再同时调用generate
+        inference_scheduler = InferenceScheduler(vqa_model, caption_model, result_cache=result_cache)
+        inference_scheduler.start()
+        question_cascade = QuestionCascade(inference_scheduler, binary=CONFIG["emergency"].get("binary_fast_path", True))
+    _set_load_status("模型就绪", 100)
+
+def release_models():
+    """释放所有模型引用，由模型生命周期管理器在长时间空闲后调用"""
+    global vqa_model, caption_model, question_cascade, inference_scheduler
+    if inference_scheduler is not None:
+        # 等工作线程处理完已提交的请求并退出，之后生命周期管理器才回收内存
+        inference_scheduler.stop(wait=True)
+    vqa_model = caption_model = question_cascade = inference_scheduler = None
+    vision_cache.clear()
+    _set_load_status("模型已卸载", 0)
+
+# 模型按需加载：首次使用或系统唤醒时加载，空闲超过models.idle_unload_seconds后卸载
+model_lifecycle = ModelLifecycleManager(initialize_models, release_models)
 
 class MotionDetector:
     """运动检测类，集成VQA和图像处理功能"""
@@ -43,16 +106,17 @@ class MotionDetector:
         self.emergency_threshold = emergency_threshold
         self.emergency_cooldown = emergency_cooldown
         
-        # 初始化前一帧
-        self.prev_frame = None
-        self.prev_sleep_frame = None
+        # 运动分析器（运动引擎由配置motion_detector.engine选择，前一帧或背景模型由休眠和唤醒模式共用）
+        self.motion_analyzer = MotionAnalyzer()
         
         # 运动状态跟踪
         self.motion_start_time = None
         self.is_motion_detected = False
         self.last_motion_time = None
         self.last_process_time = 0  # 最后一次处理时间
-        self.process_interval = 5.0  # 处理间隔（秒）
+        # 处理间隔（秒）：根据模型延迟和运动强度自适应调整
+        self.interval_controller = AdaptiveIntervalController()
+        self.trigger_dropped = False
         
         # 休眠/唤醒状态
         self.is_sleeping = True
@@ -83,55 +147,42 @@ class MotionDetector:
         self.initialization_frames = 0
         self.initialization_threshold = 10
     
-    def _preprocess_frame(self, frame):
-        """预处理帧"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-        return gray
-    
     def _detect_motion(self, frame, is_sleep_mode=False):
-        """检测运动"""
-        gray_frame = self._preprocess_frame(frame)
-        
-        prev_frame = self.prev_sleep_frame if is_sleep_mode else self.prev_frame
-        
-        if prev_frame is None:
-            if is_sleep_mode:
-                self.prev_sleep_frame = gray_frame
-            else:
-                self.prev_frame = gray_frame
+        """检测运动（前一帧或背景模型保存在motion_analyzer中，休眠和唤醒模式共用）"""
+        min_area = self.min_contour_area // 2 if is_sleep_mode else self.min_contour_area
+        # 休眠模式只需要运动面积（配置motion_detector.fast_area_path）
+        result = self.motion_analyzer.detect(frame, min_area, area_only=is_sleep_mode)
+        if result is None:
+            # 第一帧只作为比较基准或初始背景
             return False, [], None, 0
+        significant_contours, total_motion_area, thresh = result
         
-        diff = cv2.absdiff(prev_frame, gray_frame)
-        _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-        thresh = cv2.dilate(thresh, None, iterations=2)
-        
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        significant_contours = []
-        total_motion_area = 0
-        
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            min_area = self.min_contour_area // 2 if is_sleep_mode else self.min_contour_area
-            if area > min_area:
-                significant_contours.append(contour)
-                total_motion_area += area
-        
-        if is_sleep_mode:
-            self.prev_sleep_frame = gray_frame
-        else:
-            self.prev_frame = gray_frame
-        
+        # 判断是否有显著运动
         threshold = self.sleep_motion_threshold if is_sleep_mode else self.motion_threshold
         has_motion = total_motion_area > threshold
         
         return has_motion, significant_contours, thresh, total_motion_area
     
     def _should_process(self):
-        """判断是否应该处理帧"""
+        """判断是否应该处理帧（模型仍在后台加载时跳过分析）"""
+        if model_lifecycle.is_loading:
+            return False
         current_time = time.time()
-        return (current_time - self.last_process_time) >= self.process_interval
+        return (current_time - self.last_process_time) >= self.interval_controller.interval
+    
+    def _should_check_emergency(self, motion_area, current_time):
+        """常规分析进行中出现超过emergency_threshold的大面积运动时，是否立即进行紧急检查"""
+        return (motion_area >= self.emergency_threshold and not self.emergency_running
+                and current_time - self.last_emergency_time >= self.emergency_cooldown
+                and not model_lifecycle.is_loading)
+    
+    def will_skip_next_frame(self):
+        """休眠模式下下一帧是否会被跳过（不做运动检测）"""
+        return self.is_sleeping and (self.sleep_frame_counter + 1) % self.sleep_frame_skip != 0
+    
+    def skip_frame(self):
+        """跳过一帧：摄像头层只grab未解码的帧，只推进休眠跳帧计数"""
+        self.sleep_frame_counter += 1
     
     def _should_sleep(self):
         """判断是否应该进入休眠"""
@@ -161,28 +212,56 @@ class MotionDetector:
             print(f"[{time.strftime('%H:%M:%S')}] 图片保存失败")
             return None
     
-    def process_frame_with_models(self, frame):
-        """使用加载的模型处理帧"""
+    def process_frame_with_models(self, frame, motion_boxes=None):
+        """使用加载的模型处理帧（motion_boxes用于ROI模式下裁剪VQA输入）"""
         if self.process_running:
             return
         
         self.process_running = True
+        self.trigger_dropped = False
+        start_time = time.time()
+        # 图像描述和可疑人员检测为常规请求：可被紧急请求抢占，超过截止时间后放弃
+        routine = {
+            'priority': PRIORITY_ROUTINE,
+            'deadline': start_time + CONFIG.get("scheduler", {}).get("routine_deadline", 20.0)
+        }
+        acquired = False
+        # 当前阶段，用于报告被抢占或超时中止的是哪一部分
+        stage = "帧预处理"
         try:
+            # 按需加载模型，处理期间不会被空闲卸载（截止时间前仍未加载完成时放弃本帧）
+            model_lifecycle.acquire(timeout=max(0.0, routine['deadline'] - time.time()))
+            acquired = True
             # 保存帧
             self.save_frame_to_shots(frame)
+            # 同一帧的预处理和视觉编码结果在所有问题和图像描述间共享
+            frame_key = compute_frame_key(frame)
+            # VQA输入：ROI模式下只送入运动区域（配置roi.enabled / roi.mode）
+            vqa_frame = build_vqa_input(frame, motion_boxes or [])
+            vqa_frame_key = frame_key if vqa_frame is frame else compute_frame_key(vqa_frame)
             # 图像描述
             if caption_model:
-                single_caption = caption_model.generate_caption(frame)
+                try:
+                    single_caption = inference_scheduler.generate_caption(frame, frame_key=frame_key, **routine)
+                except InferenceCancelled as e:
+                    # 描述被中止不影响本帧的紧急情况判断
+                    print(f"[{time.strftime('%H:%M:%S')}] 图像描述已中止: {e}")
+                    single_caption = "生成失败"
                 print(f"摄像头图片描述: {single_caption}")
-            # VQA问答
-            questions = CONFIG["emergency"]["questions"]
-            results = vqa_model.batch_answer_questions(frame, questions)
+            # VQA问答（按规则短路求值，结论确定后不再提问；同一帧的答案在规则间复用）
+            answers = {}
+            stage = "紧急情况判断"
+            evaluation = question_cascade.evaluate(
+                vqa_frame, EMERGENCY_RULE, frame_key=vqa_frame_key, answers=answers,
+                job_options={'priority': PRIORITY_EMERGENCY}
+            )
+            results = evaluation['results']
             print(f"[{time.strftime('%H:%M:%S')}] VQA 问题及回答:")
             for result in results:
                 print(f"Q: {result['question']} -> A: {result['answer']}")
             
             # 判断紧急情况
-            if_emergency = all(result['answer'].lower() == 'yes' for result in results)
+            if_emergency = evaluation['matched']
             
             if if_emergency:
                 print(f"[{time.strftime('%H:%M:%S')}] 紧急情况检测到！")
@@ -192,12 +271,14 @@ class MotionDetector:
                 print(f"[{time.strftime('%H:%M:%S')}] 未检测到紧急情况。")
                 
                 # 可疑人员检测
-                questions2 = CONFIG["emergency"]["suspicious_questions"]
-                results2 = vqa_model.batch_answer_questions(frame, questions2)
-                for result in results2:
+                stage = "可疑人员检测"
+                evaluation2 = question_cascade.evaluate(
+                    vqa_frame, SUSPICIOUS_RULE, frame_key=vqa_frame_key, answers=answers, job_options=routine
+                )
+                for result in evaluation2['results']:
                     print(f"Q: {result['question']} -> A: {result['answer']}")
                 
-                if_suspicious = all(result['answer'].lower() == 'yes' for result in results2)
+                if_suspicious = evaluation2['matched']
                 if if_suspicious:
                     print(f"[{time.strftime('%H:%M:%S')}] 可疑人员检测到！")
                     msg = f"""
@@ -211,17 +292,53 @@ class MotionDetector:
                 else:
                     print(f"[{time.strftime('%H:%M:%S')}] 未检测到可疑人员。")
             
-
-            
-            self.last_process_time = time.time()
-            self.process_count += 1
-            
+        except ModelLoadTimeout as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 跳过本帧分析: {e}")
+        except InferenceCancelled as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 本帧的{stage}已中止: {e}")
         except Exception as e:
             print(f"[{time.strftime('%H:%M:%S')}] 处理帧时出错: {e}")
         finally:
+            if acquired:
+                # 被抢占或中止的分析同样计入间隔，避免下一帧运动立即重新触发完整分析
+                self.last_process_time = time.time()
+                self.process_count += 1
+                self.interval_controller.record_latency(self.last_process_time - start_time)
+                model_lifecycle.release()
             self.process_running = False
             self.pending_process = False
     
+    def emergency_check(self, frame, motion_boxes=None):
+        """常规分析进行中的紧急检查：只求值紧急情况规则，以紧急优先级抢占正在执行的常规推理"""
+        acquired = False
+        try:
+            # 模型正在加载时最多等待models.emergency_load_timeout秒
+            model_lifecycle.acquire(timeout=CONFIG["models"].get("emergency_load_timeout", 10.0))
+            acquired = True
+            vqa_frame = build_vqa_input(frame, motion_boxes or [])
+            evaluation = question_cascade.evaluate(
+                vqa_frame, EMERGENCY_RULE, frame_key=compute_frame_key(vqa_frame),
+                # 大面积运动触发的检查不复用近似帧的缓存答案（局部变化可能不改变帧哈希）
+                job_options={'priority': PRIORITY_EMERGENCY, 'use_cache': False}
+            )
+            print(f"[{time.strftime('%H:%M:%S')}] 紧急检查完成，耗时 "
+                  f"{(time.time() - self.last_emergency_time) * 1000:.0f}ms")
+            if evaluation['matched']:
+                print(f"[{time.strftime('%H:%M:%S')}] 紧急情况检测到！")
+                self.save_frame_to_shots(frame)
+                self.emergency_count += 1
+                threading.Thread(
+                    target=self.emergency_process, args=(frame, evaluation['results']), daemon=True
+                ).start()
+        except ModelLoadTimeout as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 跳过紧急检查: {e}")
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 紧急检查时出错: {e}")
+        finally:
+            if acquired:
+                model_lifecycle.release()
+            self.emergency_running = False
+    
     def emergency_process(self, frame, vqa_results):
         """处理紧急情况"""
         print(f"[{time.strftime('%H:%M:%S')}] 系统将在30秒内等待响应，否则将发送警报邮件。")
@@ -327,8 +444,11 @@ class MotionDetector:
                 self.wake_count += 1
                 self.motion_start_time = current_time
                 self.last_motion_time = current_time
-                self.prev_frame = self.prev_sleep_frame
                 print(f"[{time.strftime('%H:%M:%S')}] 检测到运动，系统唤醒！")
+                model_lifecycle.prewarm()
+            elif motion_area > self.sleep_motion_threshold * CONFIG["models"].get("prewarm_motion_ratio", 0.5):
+                # 运动接近唤醒阈值，预计即将唤醒，提前在后台加载模型
+                model_lifecycle.prewarm()
             
             return {
                 'frame': frame,
@@ -346,6 +466,7 @@ class MotionDetector:
         self.frame_count += 1
         
         has_motion, contours, thresh, motion_area = self._detect_motion(frame, is_sleep_mode=False)
+        self.interval_controller.record_motion(motion_area, frame.shape)
         
         result = {
             'frame': frame,
@@ -354,6 +475,7 @@ class MotionDetector:
             'motion_area': motion_area,
             'thresh': thresh,
             'should_process': False,
+            'emergency_check': False,
             'motion_boxes': [],
             'is_sleeping': False,
             'status': 'ACTIVE'
@@ -381,6 +503,17 @@ class MotionDetector:
                     result['should_process'] = True
                     self.pending_process = True
                     print(f"[{time.strftime('%H:%M:%S')}] 检测到持续运动，准备处理帧")
+            elif self.process_running and not self.trigger_dropped and self._should_process():
+                # 间隔已到但上一次分析尚未结束，每次分析最多记录一次
+                self.trigger_dropped = True
+                self.interval_controller.record_dropped()
+            
+            # 常规分析进行中出现大面积运动：立即检查当前帧，不再等待上一次分析结束
+            if self.process_running and self._should_check_emergency(motion_area, current_time):
+                result['emergency_check'] = True
+                self.emergency_running = True
+                self.last_emergency_time = current_time
+                print(f"[{time.strftime('%H:%M:%S')}] 分析进行中检测到大面积运动，立即进行紧急检查")
         else:
             if self.is_motion_detected:
                 self.is_motion_detected = False
@@ -388,7 +521,6 @@ class MotionDetector:
             
             if self._should_sleep():
                 self.is_sleeping = True
-                self.prev_sleep_frame = self.prev_frame
                 self.initialization_frames = 0
                 print(f"[{time.strftime('%H:%M:%S')}] 长时间无运动，系统进入休眠模式")
                 result['status'] = 'ENTERING_SLEEP'
@@ -408,8 +540,9 @@ class ModernSmartCalendar:
         y = (self.root.winfo_screenheight() // 2) - (900 // 2)
         self.root.geometry(f"1600x900+{x}+{y}")
         
-        # 初始化模型
-        initialize_models()
+        # 模型在界面显示后于后台加载；唤醒时预加载，长时间休眠后自动卸载
+        model_lifecycle.start_monitor()
+        self.first_frame_shown = False
         
         # 运动检测相关
         self.detector = MotionDetector(
@@ -423,6 +556,8 @@ class ModernSmartCalendar:
         
         # 摄像头相关
         self.cap = None
+        # 按休眠跳帧计划采集：跳过的帧只grab不解码，休眠期间可降低采集帧率
+        self.capture = SleepAwareCapture(self.detector)
         self.camera_queue = queue.Queue()
         self.camera_thread = None
         self.camera_active = True
@@ -465,6 +600,10 @@ class ModernSmartCalendar:
         self.update_weather()
         self.update_news()
         self.update_camera()
+        self.update_model_status()
+        
+        # 窗口先显示，模型随后在后台线程中加载
+        self.root.after(100, model_lifecycle.prewarm)
         
         # 定时更新
         self.root.after(CONFIG["update_intervals"]["time_ms"], self.update_time)
@@ -803,6 +942,67 @@ class ModernSmartCalendar:
             bg="#1a1a3e"
         )
         control_label.pack(side=tk.RIGHT, padx=20, pady=10)
+        
+        # 模型加载进度
+        style = ttk.Style()
+        style.configure(
+            "Model.Horizontal.TProgressbar",
+            troughcolor="#2a2a4e",
+            background="#6a6aff",
+            bordercolor="#2a2a4e",
+            lightcolor="#6a6aff",
+            darkcolor="#6a6aff"
+        )
+        self.model_progress = ttk.Progressbar(
+            status_frame,
+            style="Model.Horizontal.TProgressbar",
+            length=140,
+            maximum=100,
+            mode="determinate"
+        )
+        self.model_progress.pack(side=tk.RIGHT, padx=(0, 20), pady=10)
+        
+        self.model_status_label = tk.Label(
+            status_frame,
+            text="🧠 模型等待加载",
+            font=("Segoe UI", 10),
+            fg="#a0a0c0",
+            bg="#1a1a3e"
+        )
+        self.model_status_label.pack(side=tk.RIGHT, padx=(20, 8), pady=10)
+        
+        # 自适应分析间隔
+        self.interval_label = tk.Label(
+            status_frame,
+            text="",
+            font=("Segoe UI", 10),
+            fg="#707090",
+            bg="#1a1a3e"
+        )
+        self.interval_label.pack(side=tk.RIGHT, padx=20, pady=10)
+
+    def update_model_status(self):
+        """刷新状态栏中的模型加载进度"""
+        if model_lifecycle.is_loaded:
+            text = "🧠 模型就绪"
+            progress = 100
+            # 模型就绪且首帧已显示，启动完成
+            if self.first_frame_shown:
+                startup_profiler.report()
+        elif model_lifecycle.is_loading:
+            text = f"⏳ {model_load_status['stage']}..."
+            progress = model_load_status['progress']
+        elif model_load_status['stage'] == "模型加载失败":
+            text = "❌ 模型加载失败"
+            progress = 0
+        else:
+            text = "💤 模型未加载（唤醒时加载）"
+            progress = 0
+        
+        self.model_status_label.config(text=text)
+        self.model_progress['value'] = progress
+        self.interval_label.config(text=f"⏱️ {self.detector.interval_controller.describe()}")
+        self.root.after(200, self.update_model_status)
 
     def update_time(self):
         """更新时间显示"""
@@ -888,11 +1088,14 @@ class ModernSmartCalendar:
                 time.sleep(0.1)
                 continue
                 
-            ret, frame = self.cap.read()
+            ret, frame = self.capture.read(self.cap)
             if not ret:
                 print(f"[{time.strftime('%H:%M:%S')}] 错误：无法从摄像头读取帧。")
                 time.sleep(0.1)
                 continue
+            if frame is None:
+                # 休眠模式下跳过的帧未解码，也不更新画面
+                continue
                 
             # 处理帧
             result = self.detector.process_frame(frame)
@@ -901,7 +1104,13 @@ class ModernSmartCalendar:
             if result['should_process'] and not self.detector.process_running:
                 threading.Thread(
                     target=self.detector.process_frame_with_models,
-                    args=(frame,),
+                    args=(frame, result['motion_boxes']),
+                    daemon=True
+                ).start()
+            elif result.get('emergency_check'):
+                threading.Thread(
+                    target=self.detector.emergency_check,
+                    args=(frame, result['motion_boxes']),
                     daemon=True
                 ).start()
             
@@ -920,6 +1129,9 @@ class ModernSmartCalendar:
                         self.camera_status_label.config(text="状态: 处理中")
                 else:
                     frame = data['frame']
+                    if not self.first_frame_shown:
+                        self.first_frame_shown = True
+                        startup_profiler.mark("首帧显示")
                     
                     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                     image = Image.fromarray(frame_rgb)
@@ -957,10 +1169,10 @@ class ModernSmartCalendar:
                 self.detector.wake_time = time.time()
                 self.detector.last_motion_time = time.time()
                 print(f"[{time.strftime('%H:%M:%S')}] 手动唤醒系统")
+                model_lifecycle.prewarm()
         elif key == 's':
             if not self.detector.is_sleeping:
                 self.detector.is_sleeping = True
-                self.detector.prev_sleep_frame = self.detector.prev_frame
                 self.detector.initialization_frames = 0
                 print(f"[{time.strftime('%H:%M:%S')}] 手动进入休眠模式")
     
@@ -974,8 +1186,33 @@ class ModernSmartCalendar:
             self.camera_thread.join(timeout=1)
         
         if self.cap and self.cap.isOpened():
+            self.capture.restore(self.cap)
             self.cap.release()
         
+        stats = self.capture.get_statistics()
+        print(f"[{time.strftime('%H:%M:%S')}] 摄像头采集: 解码 {stats['decoded_frames']} 帧, "
+              f"只grab跳过 {stats['grabbed_frames']} 帧（{stats['skip_ratio'] * 100:.1f}%）")
+        
+        if inference_scheduler is not None:
+            stats = inference_scheduler.get_statistics()
+            print(f"[{time.strftime('%H:%M:%S')}] 推理调度: 抢占 {stats['preemptions']} 次"
+                  f"（平均延迟 {stats['avg_preempt_latency'] * 1000:.0f}ms，"
+                  f"最大 {stats['max_preempt_latency'] * 1000:.0f}ms）, "
+                  f"取消 {stats['cancelled_jobs']} 个、超时 {stats['expired_jobs']} 个请求")
+        
+        model_lifecycle.stop()
+        stats = model_lifecycle.get_statistics()
+        print(f"[{time.strftime('%H:%M:%S')}] 模型生命周期: 加载 {stats['loads']} 次, 卸载 {stats['unloads']} 次, "
+              f"预加载 {stats['prewarms']} 次, 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次")
+        if result_cache is not None:
+            stats = result_cache.get_statistics()
+            print(f"[{time.strftime('%H:%M:%S')}] VQA结果缓存: 命中率 {stats['hit_ratio']:.1f}%, "
+                  f"节省 {stats['model_calls_saved']} 次模型调用")
+        
+        stats = self.detector.interval_controller.get_statistics()
+        print(f"[{time.strftime('%H:%M:%S')}] 自适应间隔: 完成分析 {stats['analyses']} 次, "
+              f"放弃触发 {stats['dropped']} 次, 最终间隔 {stats['interval']:.1f}s")
+        
         self.root.quit()
         self.root.destroy()
 
@@ -2,6 +2,9 @@ import cv2
 import numpy as np
 import time
 import subprocess
+from inference_service import start_shared_service
+from motion_pipeline import MotionAnalyzer
+from frame_capture import SleepAwareCapture
 
 class MotionDetector:
     """运动检测类，集成休眠唤醒机制和脚本执行功能"""
@@ -27,9 +30,8 @@ class MotionDetector:
         self.emergency_threshold = emergency_threshold
         self.emergency_cooldown = emergency_cooldown
         
-        # 初始化前一帧
-        self.prev_frame = None
-        self.prev_sleep_frame = None  # 休眠模式下的前一帧
+        # 运动分析器（运动引擎由配置motion_detector.engine选择，前一帧或背景模型由休眠和唤醒模式共用）
+        self.motion_analyzer = MotionAnalyzer()
         
         # 运动状态跟踪
         self.motion_start_time = None
@@ -66,50 +68,15 @@ class MotionDetector:
         self.emergency_running = False
         self.last_emergency_time = 0  # 最后一次紧急事件时间
     
-    def _preprocess_frame(self, frame):
-        """预处理帧"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-        return gray
-    
     def _detect_motion(self, frame, is_sleep_mode=False):
-        """检测运动"""
-        gray_frame = self._preprocess_frame(frame)
-        
-        # 选择对应的前一帧
-        prev_frame = self.prev_sleep_frame if is_sleep_mode else self.prev_frame
-        
-        if prev_frame is None:
-            if is_sleep_mode:
-                self.prev_sleep_frame = gray_frame
-            else:
-                self.prev_frame = gray_frame
+        """检测运动（前一帧或背景模型保存在motion_analyzer中，休眠和唤醒模式共用）"""
+        min_area = self.min_contour_area // 2 if is_sleep_mode else self.min_contour_area
+        # 休眠模式只需要运动面积（配置motion_detector.fast_area_path）
+        result = self.motion_analyzer.detect(frame, min_area, area_only=is_sleep_mode)
+        if result is None:
+            # 第一帧只作为比较基准或初始背景
             return False, [], None, 0
-        
-        # 计算帧差
-        diff = cv2.absdiff(prev_frame, gray_frame)
-        _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-        thresh = cv2.dilate(thresh, None, iterations=2)
-        
-        # 检测轮廓
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # 过滤小轮廓
-        significant_contours = []
-        total_motion_area = 0
-        
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            min_area = self.min_contour_area // 2 if is_sleep_mode else self.min_contour_area
-            if area > min_area:
-                significant_contours.append(contour)
-                total_motion_area += area
-        
-        # 更新前一帧
-        if is_sleep_mode:
-            self.prev_sleep_frame = gray_frame
-        else:
-            self.prev_frame = gray_frame
+        significant_contours, total_motion_area, thresh = result
         
         # 判断是否有显著运动
         threshold = self.sleep_motion_threshold if is_sleep_mode else self.motion_threshold
@@ -117,6 +84,14 @@ class MotionDetector:
         
         return has_motion, significant_contours, thresh, total_motion_area
     
+    def will_skip_next_frame(self):
+        """休眠模式下下一帧是否会被跳过（不做运动检测）"""
+        return self.is_sleeping and (self.sleep_frame_counter + 1) % self.sleep_frame_skip != 0
+    
+    def skip_frame(self):
+        """跳过一帧：摄像头层只grab未解码的帧，只推进休眠跳帧计数"""
+        self.sleep_frame_counter += 1
+    
     def _should_execute_script(self):
         """判断是否应该执行脚本"""
         current_time = time.time()
@@ -186,7 +161,7 @@ class MotionDetector:
         finally:
             self.emergency_running = False
             # 重置帧缓存防止误触发
-            self.prev_sleep_frame = None
+            self.motion_analyzer.reset()
             self.sleep_frame_counter = 0
     
     def process_frame(self, frame):
@@ -249,7 +224,6 @@ class MotionDetector:
                 self.wake_count += 1
                 self.motion_start_time = current_time
                 self.last_motion_time = current_time
-                self.prev_frame = self.prev_sleep_frame  # 继承休眠时的前一帧
                 print(f"[{time.strftime('%H:%M:%S')}] 检测到运动，系统唤醒！")
             
             return {
@@ -316,7 +290,6 @@ class MotionDetector:
             # 检查是否应该进入休眠
             if self._should_sleep():
                 self.is_sleeping = True
-                self.prev_sleep_frame = self.prev_frame  # 保存当前帧作为休眠的起始帧
                 print(f"[{time.strftime('%H:%M:%S')}] 长时间无运动，系统进入休眠模式")
                 result['status'] = 'ENTERING_SLEEP'
         
@@ -339,6 +312,27 @@ class MotionDetector:
         }
 
 
+def handle_key(detector, key):
+    """
+    处理按键
+    
+    Returns:
+        bool: 是否退出
+    """
+    if key == ord('q'):
+        return True
+    elif key == ord('w'):  # 手动唤醒
+        if detector.is_sleeping:
+            detector.is_sleeping = False
+            detector.wake_time = time.time()
+            detector.last_motion_time = time.time()
+            print(f"[{time.strftime('%H:%M:%S')}] 手动唤醒系统")
+    elif key == ord('s'):  # 手动休眠
+        if not detector.is_sleeping:
+            detector.is_sleeping = True
+            print(f"[{time.strftime('%H:%M:%S')}] 手动进入休眠模式")
+    return False
+
 def main():
     """主函数 - 运动检测触发脚本执行，支持休眠唤醒"""
     print("=== 运动检测触发脚本执行系统（支持休眠唤醒）===")
@@ -353,11 +347,19 @@ def main():
         emergency_cooldown=30.0             # 紧急事件冷却时间（秒）
     )
     
+    # 启动常驻推理服务：模型只加载一次，starting_main.py / emergency.py 作为客户端连接
+    # （端口已被占用时使用已运行的服务，不重复启动）
+    inference_service = start_shared_service()
+    
     # 打开摄像头
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("错误：无法打开摄像头")
+        if inference_service is not None:
+            inference_service.stop()
         return
+    # 按休眠跳帧计划采集：跳过的帧只grab不解码，休眠期间可降低采集帧率
+    capture = SleepAwareCapture(detector)
     
     print("摄像头已启动，系统处于休眠模式，等待运动唤醒...")
     print("按 'q' 键退出")
@@ -370,9 +372,14 @@ def main():
     cv2.resizeWindow("Motion Detection", 640, 480)
     
     while True:
-        ret, frame = cap.read()
+        ret, frame = capture.read(cap)
         if not ret:
             break
+        if frame is None:
+            # 休眠模式下跳过的帧未解码，不更新画面，只处理按键
+            if handle_key(detector, cv2.waitKey(1) & 0xFF):
+                break
+            continue
         
         # 处理帧
         result = detector.process_frame(frame)
@@ -380,6 +387,7 @@ def main():
         # 处理紧急事件
         if result['should_run_emergency'] and not detector.emergency_running:
             # 释放摄像头资源
+            capture.restore(cap)
             cap.release()
             cv2.destroyAllWindows()
             
@@ -456,6 +464,7 @@ def main():
         # 当需要执行脚本时
         if result['should_run_script'] and not detector.script_running:
             # 释放摄像头资源
+            capture.restore(cap)
             cap.release()
             cv2.destroyAllWindows()
             
@@ -469,8 +478,7 @@ def main():
                 break
                 
             # 重置检测器状态
-            detector.prev_frame = None
-            detector.prev_sleep_frame = None
+            detector.motion_analyzer.reset()
             detector.last_motion_time = time.time()
             detector.motion_start_time = None
             detector.is_motion_detected = False
@@ -480,23 +488,14 @@ def main():
             print(f"[{time.strftime('%H:%M:%S')}] 系统已恢复运动检测")
         
         # 按键处理
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
+        if handle_key(detector, cv2.waitKey(1) & 0xFF):
             break
-        elif key == ord('w'):  # 手动唤醒
-            if detector.is_sleeping:
-                detector.is_sleeping = False
-                detector.wake_time = time.time()
-                detector.last_motion_time = time.time()
-                print(f"[{time.strftime('%H:%M:%S')}] 手动唤醒系统")
-        elif key == ord('s'):  # 手动休眠
-            if not detector.is_sleeping:
-                detector.is_sleeping = True
-                detector.prev_sleep_frame = detector.prev_frame
-                print(f"[{time.strftime('%H:%M:%S')}] 手动进入休眠模式")
     
     # 清理资源
+    capture.restore(cap)
     cap.release()
+    if inference_service is not None:
+        inference_service.stop()
     
     # 安全销毁所有窗口
     detector._safe_destroy_window("Motion Detection")
@@ -515,6 +514,8 @@ def main():
     print(f"唤醒次数: {final_stats['wake_count']}")
     print(f"运动比例: {final_stats['motion_ratio']:.1f}%")
     print(f"休眠比例: {final_stats['sleep_ratio']:.1f}%")
+    capture_stats = capture.get_statistics()
+    print(f"摄像头采集: 解码 {capture_stats['decoded_frames']} 帧, 只grab跳过 {capture_stats['grabbed_frames']} 帧")
     print(f"最终状态: {final_stats['current_status']}")
     print("程序已结束")
 
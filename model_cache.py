@@ -0,0 +1,100 @@
+import os
+import time
+from safetensors import safe_open
+from safetensors.torch import load_file, save_model
+from config_loader import CONFIG
+from transformers.integrations.accelerate import init_empty_weights
+from quantization import source_signature, no_init_weights
+
+
+def _dtype_name(dtype):
+    return str(dtype).replace("torch.", "")
+
+
+def _cache_file(model_cls, model_path, dtype, cache_dir):
+    """预处理权重缓存文件路径"""
+    name = os.path.basename(os.path.normpath(model_path))
+    return os.path.join(cache_dir, f"{name}_{model_cls.__name__}_{_dtype_name(dtype)}.safetensors")
+
+
+def _read_metadata(cache_file):
+    """只读取safetensors文件头中的元数据，不加载权重"""
+    with safe_open(cache_file, framework="pt") as f:
+        return f.metadata() or {}
+
+
+def _load_from_cache(model_cls, model_path, cache_file, metadata):
+    """
+    在meta设备上创建模型结构（参数不分配内存），再直接采用内存映射的权重张量（不复制）
+
+    safetensors在CPU上以内存映射方式读取文件，load_state_dict(assign=True)让模型参数
+    直接引用这些张量：权重按需从页缓存调入，多个进程加载同一文件时共享物理内存。
+    缓冲区（如position_ids）不在meta上创建，不写入state_dict的非持久缓冲区由构造函数正常计算。
+    """
+    config = model_cls.config_class.from_pretrained(model_path, local_files_only=True)
+    with no_init_weights(), init_empty_weights(include_buffers=False):
+        model = model_cls(config)
+
+    state_dict = load_file(cache_file)
+    # save_model去掉了共享（绑定）的权重，元数据中记录了 被去掉的名称 -> 保留的名称
+    for removed, kept in metadata.items():
+        if removed not in state_dict and kept in state_dict:
+            state_dict[removed] = state_dict[kept]
+    model.load_state_dict(state_dict, strict=True, assign=True)
+    # assign=True为每个名称各建一个Parameter，重新绑定让共享的权重仍是同一个参数
+    model.tie_weights()
+
+    empty = [name for name, tensor in model.state_dict().items() if tensor.is_meta]
+    if empty:
+        raise ValueError(f"预处理缓存缺少权重: {', '.join(empty[:5])}")
+    return model
+
+
+def load_prepared_model(model_cls, model_path, dtype, cache_dir=None, **kwargs):
+    """
+    通过预处理权重缓存加载模型
+
+    首次加载时从原始目录from_pretrained，然后把已转换为目标精度的权重写成一个safetensors文件；
+    之后的进程直接内存映射该文件，跳过原始权重的解析和精度转换。
+    源目录中任意文件的名称、大小或修改时间变化后缓存自动失效。
+
+    Args:
+        model_cls: 模型类，如BlipForQuestionAnswering
+        model_path: 本地模型路径
+        dtype: 权重精度
+        cache_dir: 缓存目录，默认读取配置models.prepared_cache_dir
+
+    Returns:
+        模型（CPU）
+    """
+    cache_dir = cache_dir or CONFIG["models"].get("prepared_cache_dir", "./prepared_cache")
+    cache_file = _cache_file(model_cls, model_path, dtype, cache_dir)
+    signature = source_signature(model_path)
+
+    if os.path.exists(cache_file):
+        try:
+            start_time = time.time()
+            metadata = _read_metadata(cache_file)
+            if metadata.pop("source_signature", None) == signature:
+                metadata.pop("dtype", None)
+                model = _load_from_cache(model_cls, model_path, cache_file, metadata)
+                print(f"[{time.strftime('%H:%M:%S')}] 已从预处理缓存加载模型: {cache_file} "
+                      f"({time.time() - start_time:.1f}s)")
+                return model
+            print(f"[{time.strftime('%H:%M:%S')}] 源模型已变化，重新生成预处理权重: {model_path}")
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 预处理缓存读取失败，从原始权重加载: {e}")
+
+    start_time = time.time()
+    model = model_cls.from_pretrained(model_path, local_files_only=True, dtype=dtype, **kwargs)
+    print(f"[{time.strftime('%H:%M:%S')}] 已从原始权重加载模型 ({time.time() - start_time:.1f}s)")
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        save_model(model, tmp_file, metadata={"source_signature": signature, "dtype": _dtype_name(dtype)})
+        os.replace(tmp_file, cache_file)
+        print(f"[{time.strftime('%H:%M:%S')}] 预处理权重已缓存到: {cache_file}")
+    except Exception as e:
+        print(f"[{time.strftime('%H:%M:%S')}] 预处理权重缓存失败，但不影响使用: {e}")
+    return model
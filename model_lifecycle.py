@@ -0,0 +1,226 @@
+import contextlib
+import ctypes
+import gc
+import sys
+import threading
+import time
+from config_loader import CONFIG
+
+
+def release_memory():
+    """回收已释放模型占用的内存：Python垃圾回收、CUDA缓存，以及把glibc空闲堆归还给操作系统"""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+class ModelLoadTimeout(TimeoutError):
+    """等待模型加载超时（加载仍在后台继续）"""
+    pass
+
+
+class _LoadAttempt:
+    """一次后台加载：完成事件和加载时的异常"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class ModelLifecycleManager:
+    """
+    模型生命周期管理
+
+    首次使用或系统唤醒时加载模型，空闲超过idle_timeout后卸载并回收内存，
+    让夜间长时间休眠的进程只保留摄像头和界面所需的内存。
+    使用期间（use()上下文内）不会被卸载。
+
+    加载在后台线程中进行且不持有锁，调用方等待加载完成事件，可以设置超时；
+    同一时间只有一次加载，并发的acquire()和prewarm()共用它。
+    """
+
+    def __init__(self, load_fn, unload_fn, idle_timeout=None, check_interval=5.0):
+        """
+        Args:
+            load_fn: 加载模型的函数
+            unload_fn: 释放模型引用的函数
+            idle_timeout: 空闲多少秒后卸载，0或None表示常驻，默认读取配置models.idle_unload_seconds
+            check_interval: 后台检查空闲的间隔（秒）
+        """
+        if idle_timeout is None:
+            idle_timeout = CONFIG["models"].get("idle_unload_seconds", 0)
+        self.load_fn = load_fn
+        self.unload_fn = unload_fn
+        self.idle_timeout = idle_timeout or None
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._loading = None
+        self._users = 0
+        self._last_used = 0.0
+        self._monitor = None
+        self._running = False
+
+        # 统计信息
+        self.load_count = 0
+        self.unload_count = 0
+        self.prewarm_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.total_load_time = 0.0
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    @property
+    def is_loading(self):
+        return self._loading is not None
+
+    def _start_load(self):
+        """在锁内调用：没有正在进行的加载时启动后台加载线程，返回当前的加载"""
+        if self._loading is None:
+            self._loading = _LoadAttempt()
+            threading.Thread(target=self._load_worker, args=(self._loading,), daemon=True).start()
+        return self._loading
+
+    def _load_worker(self, attempt):
+        """后台加载线程：在锁外调用load_fn，完成后更新状态并设置完成事件"""
+        start_time = time.time()
+        try:
+            self.load_fn()
+        except Exception as e:
+            attempt.error = e
+        load_time = time.time() - start_time
+        with self._lock:
+            self._loading = None
+            if attempt.error is None:
+                self._loaded = True
+                self._last_used = time.time()
+                self.load_count += 1
+                self.total_load_time += load_time
+        attempt.done.set()
+        if attempt.error is None:
+            print(f"[{time.strftime('%H:%M:%S')}] 模型已加载，耗时 {load_time:.1f}s（第 {self.load_count} 次）")
+        else:
+            print(f"[{time.strftime('%H:%M:%S')}] 模型加载失败: {attempt.error}")
+
+    def ensure_loaded(self, timeout=None):
+        """确保模型已加载（见acquire()），不占用模型"""
+        self.acquire(timeout)
+        self.release()
+
+    def acquire(self, timeout=None):
+        """
+        开始使用模型：按需加载，并在release()之前禁止卸载
+
+        Args:
+            timeout: 等待加载完成的最长时间（秒），None表示一直等待
+
+        Raises:
+            ModelLoadTimeout: 超时仍未加载完成（加载在后台继续，之后的调用可直接使用）
+            RuntimeError: 加载失败
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        missed = False
+        while True:
+            with self._lock:
+                if self._loaded:
+                    if missed:
+                        self.misses += 1
+                    else:
+                        self.hits += 1
+                    self._users += 1
+                    self._last_used = time.time()
+                    return
+                missed = True
+                attempt = self._start_load()
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            if not attempt.done.wait(remaining):
+                raise ModelLoadTimeout(f"模型加载未在 {timeout:.1f}s 内完成")
+            if attempt.error is not None:
+                raise RuntimeError(f"模型加载失败: {attempt.error}") from attempt.error
+
+    def release(self):
+        """结束使用模型"""
+        with self._lock:
+            self._users -= 1
+            self._last_used = time.time()
+
+    @contextlib.contextmanager
+    def use(self):
+        """使用模型的上下文，等价于acquire() / release()"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def prewarm(self):
+        """在后台线程中预先加载模型（例如系统即将唤醒时）"""
+        with self._lock:
+            self._last_used = time.time()
+            if self._loaded or self._loading is not None:
+                return
+            self.prewarm_count += 1
+            print(f"[{time.strftime('%H:%M:%S')}] 预加载模型...")
+            self._start_load()
+
+    def unload(self):
+        """卸载模型并回收内存（正在使用或正在加载时不卸载；unload_fn需等推理线程退出后再返回）"""
+        with self._lock:
+            if not self._loaded or self._users > 0:
+                return False
+            self.unload_fn()
+            self._loaded = False
+            self.unload_count += 1
+        release_memory()
+        print(f"[{time.strftime('%H:%M:%S')}] 模型已卸载，内存已回收（第 {self.unload_count} 次）")
+        return True
+
+    def release_if_idle(self):
+        """空闲超过阈值时卸载模型"""
+        if self.idle_timeout is None or not self._loaded or self._users > 0:
+            return False
+        if time.time() - self._last_used < self.idle_timeout:
+            return False
+        return self.unload()
+
+    def start_monitor(self):
+        """启动后台空闲检查线程"""
+        if self.idle_timeout is None or (self._monitor is not None and self._monitor.is_alive()):
+            return
+        self._running = True
+        self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self):
+        while self._running:
+            time.sleep(self.check_interval)
+            try:
+                self.release_if_idle()
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] 卸载模型时出错: {e}")
+
+    def stop(self):
+        """停止后台检查线程"""
+        self._running = False
+
+    def get_statistics(self):
+        """获取统计信息"""
+        return {
+            'loaded': self._loaded,
+            'loads': self.load_count,
+            'unloads': self.unload_count,
+            'prewarms': self.prewarm_count,
+            'hits': self.hits,
+            'misses': self.misses,
+            'avg_load_time': self.total_load_time / self.load_count if self.load_count > 0 else 0,
+            'idle_time': time.time() - self._last_used if self._loaded else 0
+        }
@@ -0,0 +1,351 @@
+import time
+import cv2
+import numpy as np
+from config_loader import CONFIG
+
+
+def _odd(value):
+    """不小于1的奇数（高斯核边长）"""
+    value = max(1, int(round(value)))
+    return value if value % 2 == 1 else value + 1
+
+
+class FrameDiffEngine:
+    """
+    两帧差分（原有方式）：当前帧与前一帧相减
+
+    前一帧和当前帧的预处理结果在两个缓冲区间交替。对慢速移动不敏感，噪声和光照闪烁会直接进入前景。
+    """
+
+    name = "diff"
+
+    def __init__(self, analyzer, options):
+        self.analyzer = analyzer
+
+    def allocate(self, shape):
+        """按分析分辨率分配缓冲区，并清除前一帧"""
+        # 前一帧 / 当前帧双缓冲
+        self._gray = [np.empty(shape, dtype=np.uint8) for _ in range(2)]
+        self._current = 0
+        self._has_previous = False
+
+    def reset(self):
+        self._has_previous = False
+
+    def input_buffer(self):
+        """下一帧预处理结果写入的缓冲区"""
+        return self._gray[self._current]
+
+    def apply(self, gray):
+        """返回二值前景图；还没有前一帧时返回None"""
+        previous = self._gray[1 - self._current] if self._has_previous else None
+        # 下一帧写入另一个缓冲区，当前帧成为前一帧
+        self._current = 1 - self._current
+        self._has_previous = True
+        if previous is None:
+            return None
+        return self.analyzer.difference(previous, gray)
+
+
+class BackgroundSubtractorEngine:
+    """
+    OpenCV背景建模：MOG2（高斯混合）或KNN
+
+    背景模型逐帧学习，缓慢移动的物体也会与背景产生差异；摄像头噪声和周期性闪烁被模型吸收。
+    关闭阴影检测，前景图只有0/255两个值。
+
+    新建或重置后的模型需要若干帧才能收敛（KNN在样本填满前会把整帧判为前景），
+    这段预热期（warmup_frames）内只学习背景，不输出前景。
+    """
+
+    def __init__(self, analyzer, options, kind):
+        self.analyzer = analyzer
+        self.name = kind
+        self.kind = kind
+        self.history = options.get("history", 500)
+        self.learning_rate = options.get("learning_rate", -1)
+        if kind == "mog2":
+            self.threshold = options.get("var_threshold", 16)
+        else:
+            self.threshold = options.get("dist2_threshold", 400.0)
+        self.warmup_frames = options.get("warmup_frames")
+        self._subtractor = None
+
+    def _convergence_frames(self):
+        """模型收敛所需的帧数：MOG2用第一帧初始化，KNN需要填满每个像素的样本"""
+        if self.kind == "knn":
+            return self._subtractor.getNSamples()
+        return 1
+
+    def _create(self):
+        if self.kind == "mog2":
+            return cv2.createBackgroundSubtractorMOG2(
+                history=self.history, varThreshold=self.threshold, detectShadows=False
+            )
+        return cv2.createBackgroundSubtractorKNN(
+            history=self.history, dist2Threshold=self.threshold, detectShadows=False
+        )
+
+    def allocate(self, shape):
+        self._gray = np.empty(shape, dtype=np.uint8)
+        self._mask = np.empty(shape, dtype=np.uint8)
+        self.reset()
+
+    def reset(self):
+        """丢弃已学习的背景，重新预热"""
+        self._subtractor = self._create()
+        warmup_frames = self.warmup_frames if self.warmup_frames is not None else self._convergence_frames()
+        self._warmup_remaining = max(1, warmup_frames)
+
+    def input_buffer(self):
+        return self._gray
+
+    def apply(self, gray):
+        self._subtractor.apply(gray, fgmask=self._mask, learningRate=self.learning_rate)
+        if self._warmup_remaining > 0:
+            # 预热期只用于学习背景模型
+            self._warmup_remaining -= 1
+            return None
+        return self.analyzer.binarize(self._mask)
+
+
+class RunningAverageEngine:
+    """
+    滑动平均背景：accumulateWeighted维护float32背景，当前帧与背景相减
+
+    alpha越小背景更新越慢，缓慢移动的物体越容易被检出，但光照变化后需要更长时间恢复。
+    """
+
+    name = "running_average"
+
+    def __init__(self, analyzer, options):
+        self.analyzer = analyzer
+        self.alpha = options.get("alpha", 0.05)
+
+    def allocate(self, shape):
+        self._gray = np.empty(shape, dtype=np.uint8)
+        self._background = np.empty(shape, dtype=np.float32)
+        self._background_u8 = np.empty(shape, dtype=np.uint8)
+        self.reset()
+
+    def reset(self):
+        self._has_background = False
+
+    def input_buffer(self):
+        return self._gray
+
+    def apply(self, gray):
+        if not self._has_background:
+            self._background[...] = gray
+            self._has_background = True
+            return None
+        cv2.convertScaleAbs(self._background, dst=self._background_u8)
+        thresh = self.analyzer.difference(self._background_u8, gray)
+        # 先与旧背景比较，再把当前帧融合进背景
+        cv2.accumulateWeighted(gray, self._background, self.alpha)
+        return thresh
+
+
+ENGINES = ("diff", "mog2", "knn", "running_average")
+
+
+def create_engine(analyzer, name=None):
+    """
+    按名称创建运动引擎（配置motion_detector.engine）
+
+    引擎参数读取配置motion_detector.engines.<name>。
+    """
+    detector_config = CONFIG["motion_detector"]
+    name = name or detector_config.get("engine", "diff")
+    options = detector_config.get("engines", {}).get(name, {})
+    if name == "diff":
+        return FrameDiffEngine(analyzer, options)
+    if name in ("mog2", "knn"):
+        return BackgroundSubtractorEngine(analyzer, options, name)
+    if name == "running_average":
+        return RunningAverageEngine(analyzer, options)
+    raise ValueError(f"未知的运动引擎: {name}（可选: {', '.join(ENGINES)}）")
+
+
+class MotionAnalyzer:
+    """
+    运动分析：灰度、高斯模糊、前景提取（运动引擎）、二值化、膨胀、轮廓
+
+    前景提取由可替换的运动引擎完成（配置motion_detector.engine）：
+    - "diff": 两帧差分（原有方式）
+    - "mog2" / "knn": OpenCV背景建模
+    - "running_average": accumulateWeighted滑动平均背景
+
+    整条流水线可以在缩小后的图像上运行（配置motion_detector.analysis_scale，如0.5或0.25），
+    模糊核和膨胀次数按比例缩小；轮廓坐标和面积换算回原始分辨率，调用方的面积阈值和运动框保持不变。
+    默认1.0（原始分辨率）；调小前先用benchmark_motion.py在实际录制的视频上确认检测结果与1.0一致。
+
+    所有中间图像使用按摄像头分辨率预先分配的缓冲区（OpenCV的dst输出），每帧不再分配新的图像。
+    帧尺寸变化时自动重新分配，并丢弃前一帧或已学习的背景。
+
+    运动区域的测量方式可选（配置motion_detector.measurement）：
+    - "contours": findContours + 逐个contourArea（原有方式）
+    - "components": connectedComponentsWithStats，一次调用得到所有区域的面积和外接矩形
+    只需要运动面积时（如休眠模式），可用countNonZero直接计数（配置motion_detector.fast_area_path）。
+    """
+
+    MEASUREMENTS = ("contours", "components")
+
+    def __init__(self, scale=None, blur_size=21, diff_threshold=25, dilate_iterations=2, frame_size=None,
+                 measurement=None, fast_area_path=None, engine=None):
+        """
+        Args:
+            scale: 分析分辨率相对原始帧的比例，默认读取配置motion_detector.analysis_scale
+            blur_size: 原始分辨率下的高斯核边长
+            diff_threshold: 帧差二值化阈值
+            dilate_iterations: 原始分辨率下的膨胀次数
+            frame_size: 预分配缓冲区的帧尺寸 (width, height)，默认读取配置camera.width / camera.height
+            measurement: 运动区域测量方式，"contours"或"components"，默认读取配置
+            fast_area_path: 只需要面积时是否使用countNonZero，默认读取配置
+            engine: 运动引擎名称，默认读取配置motion_detector.engine
+        """
+        detector_config = CONFIG["motion_detector"]
+        scale = scale if scale is not None else detector_config.get("analysis_scale", 1.0)
+        if not 0 < scale <= 1:
+            raise ValueError(f"analysis_scale必须在(0, 1]之间: {scale}")
+        self.scale = scale
+        self.blur_size = _odd(blur_size * scale)
+        self.diff_threshold = diff_threshold
+        self.dilate_iterations = max(1, int(round(dilate_iterations * scale)))
+        # 分析分辨率下一个像素对应的原始面积
+        self.area_factor = 1.0 / (scale * scale)
+        self.measurement = measurement or detector_config.get("measurement", "contours")
+        if self.measurement not in self.MEASUREMENTS:
+            raise ValueError(f"未知的运动测量方式: {self.measurement}（可选: {', '.join(self.MEASUREMENTS)}）")
+        self.fast_area_path = (fast_area_path if fast_area_path is not None
+                               else detector_config.get("fast_area_path", False))
+        self.engine = create_engine(self, engine)
+
+        camera_config = CONFIG["camera"]
+        width, height = frame_size or (camera_config["width"], camera_config["height"])
+        self.reallocations = 0
+        self._allocate(width, height)
+
+    def _allocate(self, width, height):
+        """按帧尺寸分配全部中间缓冲区，并清除前一帧"""
+        self.frame_size = (width, height)
+        self.analysis_size = (max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale))))
+        analysis_w, analysis_h = self.analysis_size
+        self._full_gray = np.empty((height, width), dtype=np.uint8)
+        self._small_gray = np.empty((analysis_h, analysis_w), dtype=np.uint8) if self.scale < 1 else None
+        self._diff = np.empty((analysis_h, analysis_w), dtype=np.uint8)
+        self._binary = np.empty((analysis_h, analysis_w), dtype=np.uint8)
+        self._thresh = np.empty((analysis_h, analysis_w), dtype=np.uint8)
+        self._labels = np.empty((analysis_h, analysis_w), dtype=np.int32)
+        self.engine.allocate((analysis_h, analysis_w))
+
+    def reset(self):
+        """丢弃前一帧或已学习的背景（下一帧只作为比较基准）"""
+        self.engine.reset()
+
+    def preprocess(self, frame, dst=None):
+        """灰度、缩小到分析分辨率、高斯模糊；dst为None时返回新分配的图像"""
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._full_gray)
+        source = self._full_gray
+        if self.scale < 1:
+            cv2.resize(self._full_gray, self.analysis_size, dst=self._small_gray, interpolation=cv2.INTER_AREA)
+            source = self._small_gray
+        if dst is None:
+            return cv2.GaussianBlur(source, (self.blur_size, self.blur_size), 0)
+        cv2.GaussianBlur(source, (self.blur_size, self.blur_size), 0, dst=dst)
+        return dst
+
+    def difference(self, prev_gray, gray):
+        """帧差、二值化、膨胀，返回位于复用缓冲区的二值图"""
+        cv2.absdiff(prev_gray, gray, dst=self._diff)
+        return self.binarize(self._diff)
+
+    def binarize(self, diff):
+        """差值图或前景图二值化、膨胀，返回位于复用缓冲区的二值图"""
+        cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY, dst=self._binary)
+        cv2.dilate(self._binary, None, dst=self._thresh, iterations=self.dilate_iterations)
+        return self._thresh
+
+    def _to_full_resolution(self, contour):
+        """轮廓坐标换算回原始分辨率"""
+        if self.scale == 1:
+            return contour
+        return (contour / self.scale).astype(np.int32)
+
+    def _box_contours(self, boxes):
+        """外接矩形 (x, y, w, h) 转为原始分辨率的四点轮廓，与轮廓测量的输出格式一致"""
+        x0 = boxes[:, 0] / self.scale
+        y0 = boxes[:, 1] / self.scale
+        x1 = (boxes[:, 0] + boxes[:, 2]) / self.scale - 1
+        y1 = (boxes[:, 1] + boxes[:, 3]) / self.scale - 1
+        corners = np.stack([x0, y0, x1, y0, x1, y1, x0, y1], axis=1)
+        return list(corners.reshape(-1, 4, 1, 2).astype(np.int32))
+
+    def measure(self, min_area, thresh=None, area_only=False):
+        """
+        从二值图中提取显著运动区域
+
+        Args:
+            min_area: 原始分辨率下的最小区域面积
+            thresh: 二值图，默认使用最近一次difference的结果
+            area_only: 调用方只需要运动面积；启用fast_area_path时用countNonZero计数，
+                       不提取区域，也不过滤小区域
+
+        Returns:
+            tuple: (显著区域轮廓列表, 运动总面积)，均为原始分辨率；
+                连通域测量返回外接矩形的四点轮廓，可直接用于cv2.boundingRect
+        """
+        thresh = self._thresh if thresh is None else thresh
+        if area_only and self.fast_area_path:
+            return [], cv2.countNonZero(thresh) * self.area_factor
+        if self.measurement == "components":
+            return self._measure_components(thresh, min_area)
+        return self._measure_contours(thresh, min_area)
+
+    def _measure_components(self, thresh, min_area):
+        """连通域测量：一次调用得到所有区域的像素面积和外接矩形，过滤在numpy中向量化完成"""
+        _, _, stats, _ = cv2.connectedComponentsWithStats(
+            thresh, labels=self._labels, connectivity=8, ltype=cv2.CV_32S
+        )
+        # 第0个连通域是背景
+        stats = stats[1:]
+        areas = stats[:, cv2.CC_STAT_AREA] * self.area_factor
+        significant = areas > min_area
+        return self._box_contours(stats[significant, :4]), float(areas[significant].sum())
+
+    def _measure_contours(self, thresh, min_area):
+        """轮廓测量：findContours后逐个计算contourArea"""
+        # OpenCV 3.2起findContours不再修改输入图像，无需复制
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        significant_contours = []
+        total_area = 0
+        for contour in contours:
+            area = cv2.contourArea(contour) * self.area_factor
+            if area > min_area:
+                significant_contours.append(self._to_full_resolution(contour))
+                total_area += area
+        return significant_contours, total_area
+
+    def detect(self, frame, min_area, area_only=False):
+        """
+        预处理当前帧，由运动引擎提取前景（area_only见measure）
+
+        Returns:
+            tuple或None: (显著轮廓列表, 运动总面积, 二值图)；还没有前一帧或背景时返回None。
+                二值图位于复用的缓冲区，处理下一帧时会被覆盖
+        """
+        height, width = frame.shape[:2]
+        if (width, height) != self.frame_size:
+            print(f"[{time.strftime('%H:%M:%S')}] 帧尺寸 {width}x{height} 与缓冲区 "
+                  f"{self.frame_size[0]}x{self.frame_size[1]} 不一致，重新分配运动检测缓冲区")
+            self.reallocations += 1
+            self._allocate(width, height)
+
+        current = self.preprocess(frame, dst=self.engine.input_buffer())
+        thresh = self.engine.apply(current)
+        if thresh is None:
+            return None
+
+        significant_contours, total_area = self.measure(min_area, thresh, area_only)
+        return significant_contours, total_area, thresh
@@ -0,0 +1,116 @@
+import contextlib
+import hashlib
+import os
+import time
+import torch
+from config_loader import CONFIG
+
+try:
+    from transformers.modeling_utils import no_init_weights
+except ImportError:
+    no_init_weights = contextlib.nullcontext
+
+# 默认量化的子模块：视觉编码器和文本解码器
+DEFAULT_QUANTIZE_MODULES = ("vision_model", "text_decoder")
+
+
+def source_signature(model_path):
+    """根据模型目录中文件的名称、大小和修改时间计算签名，源权重变化后量化缓存自动失效"""
+    h = hashlib.blake2b(digest_size=16)
+    for root, _, files in sorted(os.walk(model_path)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            h.update(f"{os.path.relpath(path, model_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def quantize_blip_model(model, modules=None):
+    """
+    对BLIP模型指定子模块中的Linear层做动态int8量化（原地替换）
+
+    Args:
+        model: BLIP模型（float32，CPU）
+        modules: 要量化的子模块名称列表，默认为视觉编码器和文本解码器
+
+    Returns:
+        量化后的模型
+    """
+    for name in modules or DEFAULT_QUANTIZE_MODULES:
+        submodule = getattr(model, name, None)
+        if submodule is None:
+            continue
+        torch.ao.quantization.quantize_dynamic(submodule, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def _cache_file(model_cls, model_path, modules, cache_dir):
+    """量化缓存文件路径"""
+    name = os.path.basename(os.path.normpath(model_path))
+    suffix = "-".join(modules)
+    return os.path.join(cache_dir, f"{name}_{model_cls.__name__}_{suffix}_int8.pt")
+
+
+def load_quantized_model(model_cls, model_path, modules=None, cache_dir=None, **kwargs):
+    """
+    加载动态int8量化模型
+
+    首次加载时从float32权重量化并将结果保存到磁盘；之后直接按模型结构量化空权重并载入缓存，
+    无需读取原始权重，也不必重新计算量化参数。
+
+    Args:
+        model_cls: 模型类，如BlipForQuestionAnswering
+        model_path: 本地模型路径
+        modules: 要量化的子模块名称列表
+        cache_dir: 量化缓存目录，默认读取配置
+
+    Returns:
+        量化后的模型（CPU）
+    """
+    modules = list(modules or CONFIG["models"].get("quantize_modules", DEFAULT_QUANTIZE_MODULES))
+    cache_dir = cache_dir or CONFIG["models"].get("quantized_cache_dir", "./quantized_cache")
+    cache_file = _cache_file(model_cls, model_path, modules, cache_dir)
+    signature = source_signature(model_path)
+
+    if os.path.exists(cache_file):
+        try:
+            start_time = time.time()
+            checkpoint = torch.load(cache_file, map_location="cpu", mmap=True, weights_only=False)
+            if checkpoint.get("source_signature") == signature:
+                config = model_cls.config_class.from_pretrained(model_path, local_files_only=True)
+                with no_init_weights():
+                    model = model_cls(config)
+                quantize_blip_model(model, modules)
+                model.load_state_dict(checkpoint["state_dict"])
+                print(f"[{time.strftime('%H:%M:%S')}] 已从缓存加载int8量化模型: {cache_file} "
+                      f"({time.time() - start_time:.1f}s)")
+                return model.eval()
+            print(f"[{time.strftime('%H:%M:%S')}] 源模型已变化，重新量化: {model_path}")
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 量化缓存读取失败，重新量化: {e}")
+
+    start_time = time.time()
+    model = model_cls.from_pretrained(model_path, local_files_only=True, dtype=torch.float32, **kwargs)
+    quantize_blip_model(model, modules)
+    print(f"[{time.strftime('%H:%M:%S')}] int8动态量化完成 ({time.time() - start_time:.1f}s)")
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        torch.save({"source_signature": signature, "state_dict": model.state_dict()}, tmp_file)
+        os.replace(tmp_file, cache_file)
+        print(f"[{time.strftime('%H:%M:%S')}] 量化权重已缓存到: {cache_file}")
+    except Exception as e:
+        print(f"[{time.strftime('%H:%M:%S')}] 量化权重缓存失败，但不影响使用: {e}")
+    return model.eval()
+
+
+def model_size_mb(model):
+    """模型序列化后的大小（MB），量化后的Linear层以打包权重计算"""
+    total = 0
+    for value in model.state_dict().values():
+        if isinstance(value, torch.Tensor):
+            total += value.numel() * value.element_size()
+        elif isinstance(value, tuple):
+            total += sum(v.numel() * v.element_size() for v in value if isinstance(v, torch.Tensor))
+    return total / 1024 / 1024
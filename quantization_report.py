@@ -0,0 +1,104 @@
+import argparse
+import os
+import statistics
+import time
+
+import cv2
+from config_loader import CONFIG
+from execution_backend import ExecutionBackend
+from quantization import model_size_mb
+from vqa_interface import VQAInterface
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def read_rss_mb():
+    """当前进程常驻内存（MB），仅Linux可用"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def load_frames(frames_dir):
+    """读取样本帧目录下的所有图片"""
+    frames = []
+    for name in sorted(os.listdir(frames_dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            frame = cv2.imread(os.path.join(frames_dir, name))
+            if frame is not None:
+                frames.append((name, frame))
+    return frames
+
+
+def run_variant(quantize, frames, questions, backend):
+    """加载一个模型变体，在所有样本帧上回答问题"""
+    rss_before = read_rss_mb()
+    start_time = time.perf_counter()
+    vqa = VQAInterface(model_path=CONFIG["models"]["vqa_path"], backend=backend, quantize=quantize)
+    load_time = time.perf_counter() - start_time
+    rss_after = read_rss_mb()
+
+    answers = {}
+    latencies = []
+    for name, frame in frames:
+        start_time = time.perf_counter()
+        results = vqa.batch_answer_questions(frame, questions)
+        latencies.append((time.perf_counter() - start_time) / len(questions))
+        answers[name] = [result['answer'].lower() for result in results]
+
+    report = {
+        'load_time': load_time,
+        'model_size': model_size_mb(vqa.model),
+        'rss_delta': rss_after - rss_before,
+        'latency_mean': statistics.mean(latencies),
+        'latency_median': statistics.median(latencies),
+        'answers': answers
+    }
+    del vqa
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8动态量化精度/延迟报告")
+    parser.add_argument("frames_dir", help="样本帧目录")
+    parser.add_argument("--threads", type=int, default=None, help="CPU推理线程数")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames_dir)
+    if not frames:
+        print(f"错误：目录中没有图片: {args.frames_dir}")
+        return
+    questions = list(dict.fromkeys(CONFIG["emergency"]["questions"] + CONFIG["emergency"]["suspicious_questions"]))
+    backend = ExecutionBackend(device="cpu", num_threads=args.threads)
+
+    print(f"=== int8动态量化报告（{len(frames)} 帧，{len(questions)} 个问题）===")
+    fp32 = run_variant(False, frames, questions, backend)
+    int8 = run_variant(True, frames, questions, backend)
+
+    total = agree = 0
+    for name, _ in frames:
+        for a, b in zip(fp32['answers'][name], int8['answers'][name]):
+            total += 1
+            agree += int(a == b)
+
+    print("-" * 60)
+    print(f"{'指标':<20}{'float32':>15}{'int8':>15}")
+    print(f"{'加载时间 (s)':<20}{fp32['load_time']:>15.2f}{int8['load_time']:>15.2f}")
+    print(f"{'权重大小 (MB)':<20}{fp32['model_size']:>15.1f}{int8['model_size']:>15.1f}")
+    print(f"{'加载后RSS增量 (MB)':<20}{fp32['rss_delta']:>15.1f}{int8['rss_delta']:>15.1f}")
+    print(f"{'单问题平均延迟 (ms)':<20}{fp32['latency_mean'] * 1000:>15.1f}{int8['latency_mean'] * 1000:>15.1f}")
+    print(f"{'单问题中位延迟 (ms)':<20}{fp32['latency_median'] * 1000:>15.1f}{int8['latency_median'] * 1000:>15.1f}")
+    print(f"答案一致率: {agree}/{total} ({agree / max(total, 1) * 100:.1f}%)")
+
+    for name, _ in frames:
+        if fp32['answers'][name] != int8['answers'][name]:
+            print(f"  不一致: {name} | float32={fp32['answers'][name]} | int8={int8['answers'][name]}")
+
+
+if __name__ == "__main__":
+    main()
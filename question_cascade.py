@@ -0,0 +1,310 @@
+import re
+import threading
+import time
+
+_TOKEN_PATTERN = re.compile(r"\s*(?:(\()|(\))|(and|or|not)\b|(q\d+))", re.IGNORECASE)
+
+
+class _Question:
+    """表达式叶子节点：一个是非题"""
+
+    def __init__(self, question):
+        self.question = question
+
+    def questions(self):
+        return [self.question]
+
+    def estimate(self, cascade):
+        """返回 (回答为真的概率, 预期代价)"""
+        return cascade.yes_rate(self.question), cascade.expected_cost(self.question)
+
+    def evaluate(self, cascade, ask):
+        return ask(self.question)
+
+
+class _Not:
+    def __init__(self, child):
+        self.child = child
+
+    def questions(self):
+        return self.child.questions()
+
+    def estimate(self, cascade):
+        p_true, cost = self.child.estimate(cascade)
+        return 1.0 - p_true, cost
+
+    def evaluate(self, cascade, ask):
+        return not self.child.evaluate(cascade, ask)
+
+
+class _And:
+    def __init__(self, children):
+        self.children = children
+
+    def questions(self):
+        return [q for child in self.children for q in child.questions()]
+
+    def estimate(self, cascade):
+        p_true, cost, p_reach = 1.0, 0.0, 1.0
+        for child in self.ordered(cascade):
+            child_p, child_cost = child.estimate(cascade)
+            cost += p_reach * child_cost
+            p_reach *= child_p
+            p_true *= child_p
+        return p_true, cost
+
+    def ordered(self, cascade):
+        """先问代价低且最可能回答"否"的问题：按 代价 / P(否) 升序"""
+        def key(child):
+            p_true, cost = child.estimate(cascade)
+            return cost / max(1.0 - p_true, 1e-3)
+        return sorted(self.children, key=key)
+
+    def evaluate(self, cascade, ask):
+        for child in self.ordered(cascade):
+            if not child.evaluate(cascade, ask):
+                return False
+        return True
+
+
+class _Or:
+    def __init__(self, children):
+        self.children = children
+
+    def questions(self):
+        return [q for child in self.children for q in child.questions()]
+
+    def estimate(self, cascade):
+        p_false, cost, p_reach = 1.0, 0.0, 1.0
+        for child in self.ordered(cascade):
+            child_p, child_cost = child.estimate(cascade)
+            cost += p_reach * child_cost
+            p_reach *= 1.0 - child_p
+            p_false *= 1.0 - child_p
+        return 1.0 - p_false, cost
+
+    def ordered(self, cascade):
+        """先问代价低且最可能回答"是"的问题：按 代价 / P(是) 升序"""
+        def key(child):
+            p_true, cost = child.estimate(cascade)
+            return cost / max(p_true, 1e-3)
+        return sorted(self.children, key=key)
+
+    def evaluate(self, cascade, ask):
+        for child in self.ordered(cascade):
+            if child.evaluate(cascade, ask):
+                return True
+        return False
+
+
+class QuestionRule:
+    """
+    基于配置问题列表的判定规则
+
+    表达式用 q1、q2 ... 引用问题列表中的第1、2 ... 个问题，支持 and / or / not 和括号，
+    例如 "q1 and (q2 or not q3)"。未提供表达式时等价于所有问题都回答"yes"。
+    """
+
+    def __init__(self, name, questions, expression=None):
+        """
+        Args:
+            name: 规则名称
+            questions: 问题列表
+            expression: 规则表达式，默认为 "q1 and q2 and ..."
+        """
+        self.name = name
+        self.questions = list(questions)
+        self.expression = expression or " and ".join(f"q{i + 1}" for i in range(len(self.questions)))
+        self._tokens = []
+        self._pos = 0
+        self.root = self._parse(self.expression)
+
+    def _parse(self, expression):
+        """递归下降解析：or < and < not < 括号/问题"""
+        self._tokens = []
+        pos = 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = _TOKEN_PATTERN.match(expression, pos)
+            if not match:
+                raise ValueError(f"规则 {self.name} 表达式无法解析: {expression!r}（位置 {pos}）")
+            self._tokens.append(match.group(0).strip().lower())
+            pos = match.end()
+            while pos < len(expression) and expression[pos].isspace():
+                pos += 1
+        self._pos = 0
+        node = self._parse_or()
+        if self._pos != len(self._tokens):
+            raise ValueError(f"规则 {self.name} 表达式有多余内容: {expression!r}")
+        return node
+
+    def _peek(self):
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        self._pos += 1
+        return token
+
+    def _parse_or(self):
+        children = [self._parse_and()]
+        while self._peek() == "or":
+            self._next()
+            children.append(self._parse_and())
+        return children[0] if len(children) == 1 else _Or(children)
+
+    def _parse_and(self):
+        children = [self._parse_not()]
+        while self._peek() == "and":
+            self._next()
+            children.append(self._parse_not())
+        return children[0] if len(children) == 1 else _And(children)
+
+    def _parse_not(self):
+        if self._peek() == "not":
+            self._next()
+            return _Not(self._parse_not())
+        return self._parse_atom()
+
+    def _parse_atom(self):
+        token = self._next()
+        if token == "(":
+            node = self._parse_or()
+            if self._next() != ")":
+                raise ValueError(f"规则 {self.name} 表达式括号不匹配: {self.expression!r}")
+            return node
+        if token is not None and token.startswith("q"):
+            index = int(token[1:]) - 1
+            if not 0 <= index < len(self.questions):
+                raise ValueError(f"规则 {self.name} 引用了不存在的问题: {token}")
+            return _Question(self.questions[index])
+        raise ValueError(f"规则 {self.name} 表达式语法错误: {self.expression!r}")
+
+    @classmethod
+    def from_config(cls, name, emergency_config, questions_key):
+        """从CONFIG["emergency"]构建规则，表达式读取 <questions_key>_rule（可选）"""
+        return cls(name, emergency_config[questions_key], emergency_config.get(f"{questions_key}_rule"))
+
+
+class QuestionCascade:
+    """
+    短路求值的问题级联引擎
+
+    按规则表达式惰性求值，得到结论后不再提问。每个问题维护回答"yes"的比例和延迟的滑动平均，
+    据此优先提问代价最低、最可能使结论确定的问题。同一帧的答案在多个规则之间复用。
+    """
+
+    def __init__(self, vqa, binary=True, ema_alpha=0.2, default_cost=1.0):
+        """
+        Args:
+            vqa: VQAInterface或InferenceClient
+            binary: 是否使用是非题快速路径
+            ema_alpha: 延迟滑动平均系数
+            default_cost: 尚无统计数据的问题的默认代价（秒）
+        """
+        self.vqa = vqa
+        self.binary = binary
+        self.ema_alpha = ema_alpha
+        self.default_cost = default_cost
+        self._stats = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.evaluation_count = 0
+        self.model_calls = 0
+        self.model_calls_saved = 0
+
+    def yes_rate(self, question):
+        """回答"yes"的比例（拉普拉斯平滑）"""
+        stats = self._stats.get(question)
+        if stats is None:
+            return 0.5
+        return (stats['yes'] + 1) / (stats['asked'] + 2)
+
+    def expected_cost(self, question):
+        """问题的预期延迟（秒）"""
+        stats = self._stats.get(question)
+        if stats is None or stats['latency'] is None:
+            known = [s['latency'] for s in self._stats.values() if s['latency'] is not None]
+            return sum(known) / len(known) if known else self.default_cost
+        return stats['latency']
+
+    def _record(self, question, answer_yes, latency):
+        with self._lock:
+            stats = self._stats.setdefault(question, {'asked': 0, 'yes': 0, 'latency': None})
+            stats['asked'] += 1
+            stats['yes'] += int(answer_yes)
+            if stats['latency'] is None:
+                stats['latency'] = latency
+            else:
+                stats['latency'] += self.ema_alpha * (latency - stats['latency'])
+
+    def evaluate(self, frame, rule, frame_key=None, answers=None, job_options=None):
+        """
+        对一帧求值规则
+
+        Args:
+            frame: 图像帧
+            rule: QuestionRule
+            frame_key: 可选的帧键（与视觉特征缓存共享）
+            answers: 可选的答案字典，同一帧的多个规则传入同一个字典以复用答案
+            job_options: 可选的调度参数（如priority、deadline），原样传给InferenceScheduler
+
+        Returns:
+            dict: {'matched': 是否满足规则, 'results': 求值用到的结果列表,
+                   'asked': 本次提交给模型的问题数, 'reused': 复用同一帧已有答案的问题数,
+                   'saved': 与逐题全部提问相比节省的模型调用次数}
+        """
+        answers = {} if answers is None else answers
+        results = []
+        asked = 0
+        # 求值前已有的答案（同一帧之前的规则回答过的问题）
+        prior = set(answers)
+        reused = set()
+
+        def ask(question):
+            nonlocal asked
+            if question not in answers:
+                start_time = time.time()
+                result = self.vqa.batch_answer_questions(
+                    frame, [question], frame_key=frame_key, binary=self.binary, **(job_options or {})
+                )[0]
+                self._record(question, result['answer'].lower() == 'yes', time.time() - start_time)
+                answers[question] = result
+                asked += 1
+            elif question in prior:
+                reused.add(question)
+            result = answers[question]
+            if result not in results:
+                results.append(result)
+            return result['answer'].lower() == 'yes'
+
+        matched = rule.root.evaluate(self, ask)
+
+        # 节省的调用：不使用级联时规则的每个问题都要提交给模型，减去本次实际提交的问题
+        # （包括短路跳过的问题和复用其他规则答案的问题）
+        saved = len(set(rule.root.questions())) - asked
+        self.evaluation_count += 1
+        self.model_calls += asked
+        self.model_calls_saved += saved
+        print(f"[{time.strftime('%H:%M:%S')}] 规则 {rule.name}: {'满足' if matched else '不满足'}"
+              f"（提问 {asked} 次，复用 {len(reused)} 个答案，节省 {saved} 次模型调用）")
+        return {'matched': matched, 'results': results, 'asked': asked, 'reused': len(reused), 'saved': saved}
+
+    def get_statistics(self):
+        """获取统计信息"""
+        with self._lock:
+            questions = {
+                question: {
+                    'asked': stats['asked'],
+                    'yes_rate': self.yes_rate(question),
+                    'latency': stats['latency']
+                }
+                for question, stats in self._stats.items()
+            }
+        return {
+            'evaluations': self.evaluation_count,
+            'model_calls': self.model_calls,
+            'model_calls_saved': self.model_calls_saved,
+            'questions': questions
+        }
@@ -0,0 +1,109 @@
+import threading
+import time
+import cv2
+import numpy as np
+from PIL import Image
+from config_loader import CONFIG
+
+
+def perceptual_hash(image, hash_size=8):
+    """
+    计算帧的差值哈希（dHash）：缩小为 (hash_size+1) x hash_size 的灰度图，比较相邻像素的明暗
+
+    相似画面的哈希只有少数位不同，可用汉明距离判断两帧是否近似。
+
+    Args:
+        image: numpy数组（BGR或灰度）或PIL Image；其他类型返回None
+
+    Returns:
+        int: hash_size * hash_size 位的哈希值
+    """
+    if isinstance(image, Image.Image):
+        image = cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    if not isinstance(image, np.ndarray):
+        return None
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class ResultCache:
+    """
+    近似帧的VQA结果缓存
+
+    以帧的感知哈希加问题文本为键。新帧与缓存帧的哈希汉明距离不超过max_distance、
+    且缓存结果未超过ttl秒时，直接复用之前的答案。ttl从写入时开始计算，命中不会延长，
+    所以静止画面也会定期重新提问。
+    """
+
+    def __init__(self, max_distance=None, ttl=None, max_entries=None):
+        """
+        Args:
+            max_distance: 判定为近似帧的最大汉明距离，默认读取配置result_cache.max_distance
+            ttl: 结果有效期（秒），默认读取配置result_cache.ttl
+            max_entries: 每个问题最多保留的结果数
+        """
+        cache_config = CONFIG.get("result_cache", {})
+        self.max_distance = max_distance if max_distance is not None else cache_config.get("max_distance", 4)
+        self.ttl = ttl if ttl is not None else cache_config.get("ttl", 30.0)
+        self.max_entries = max(1, max_entries or cache_config.get("max_entries", 32))
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame_hash, question, binary=False):
+        """查找近似帧上同一问题的答案，未命中返回None"""
+        if frame_hash is None:
+            return None
+        now = time.time()
+        with self._lock:
+            entries = self._entries.get((question, binary))
+            best = None
+            if entries:
+                # 先清理过期结果
+                entries[:] = [entry for entry in entries if now - entry[0] <= self.ttl]
+                for _, cached_hash, result in entries:
+                    distance = (cached_hash ^ frame_hash).bit_count()
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, result)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(best[1])
+
+    def put(self, frame_hash, question, binary, result):
+        """写入一条答案"""
+        if frame_hash is None:
+            return
+        with self._lock:
+            entries = self._entries.setdefault((question, binary), [])
+            entries.append((time.time(), frame_hash, dict(result)))
+            if len(entries) > self.max_entries:
+                del entries[:len(entries) - self.max_entries]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_statistics(self):
+        """获取统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': sum(len(entries) for entries in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total * 100 if total > 0 else 0,
+                'model_calls_saved': self.hits
+            }
+
+
+def create_result_cache():
+    """按配置创建结果缓存，未启用时返回None"""
+    if not CONFIG.get("result_cache", {}).get("enabled", True):
+        return None
+    return ResultCache()
@@ -0,0 +1,97 @@
+import cv2
+from config_loader import CONFIG
+
+
+def union_box(boxes, frame_shape, padding=0.2, min_size=160):
+    """
+    运动框的并集，四周按比例留白并扩展为正方形（模型输入是正方形，避免拉伸变形）
+
+    正方形超出画面短边时（如横跨整个画面宽度的运动），改用留白后的矩形并集，由处理器缩放，
+    保证运动区域不被裁掉。
+
+    Args:
+        boxes: [(x, y, w, h), ...]
+        frame_shape: 帧的形状 (H, W, ...)
+        padding: 每边留白占并集边长的比例
+        min_size: 区域最小边长（像素），避免把很小的区域放大得过于模糊
+
+    Returns:
+        tuple: (x0, y0, x1, y1)，没有运动框时返回None
+    """
+    if not boxes:
+        return None
+    frame_h, frame_w = frame_shape[:2]
+    x0 = min(x for x, _, _, _ in boxes)
+    y0 = min(y for _, y, _, _ in boxes)
+    x1 = max(x + w for x, _, w, _ in boxes)
+    y1 = max(y + h for _, y, _, h in boxes)
+
+    side = max(x1 - x0, y1 - y0)
+    side = int(side * (1 + 2 * padding))
+    side = max(side, min_size)
+    if side > min(frame_w, frame_h):
+        # 正方形放不下：使用留白后的矩形并集
+        pad_x = int((x1 - x0) * padding)
+        pad_y = int((y1 - y0) * padding)
+        return max(x0 - pad_x, 0), max(y0 - pad_y, 0), min(x1 + pad_x, frame_w), min(y1 + pad_y, frame_h)
+
+    # 以并集中心为中心，超出画面时整体平移
+    cx, cy = (x0 + x1) // 2, (y0 + y1) // 2
+    left = min(max(cx - side // 2, 0), frame_w - side)
+    top = min(max(cy - side // 2, 0), frame_h - side)
+    return left, top, left + side, top + side
+
+
+def crop_with_context(frame, box, context_size=0.25):
+    """
+    区域裁剪并在左上角嵌入整帧的低分辨率缩略图，让模型同时看到细节和全局
+
+    Args:
+        frame: BGR图像
+        box: (x0, y0, x1, y1)
+        context_size: 缩略图宽度占裁剪图边长的比例
+    """
+    x0, y0, x1, y1 = box
+    crop = frame[y0:y1, x0:x1].copy()
+    # 裁剪区域可能不是正方形，缩略图按短边计算
+    side = min(crop.shape[:2])
+    frame_h, frame_w = frame.shape[:2]
+    thumb_w = max(1, int(side * context_size))
+    thumb_h = max(1, int(thumb_w * frame_h / frame_w))
+    thumbnail = cv2.resize(frame, (thumb_w, thumb_h), interpolation=cv2.INTER_AREA)
+    crop[:thumb_h, :thumb_w] = thumbnail
+    cv2.rectangle(crop, (0, 0), (thumb_w - 1, thumb_h - 1), (255, 255, 255), 1)
+    return crop
+
+
+def build_vqa_input(frame, motion_boxes, mode=None):
+    """
+    根据运动框构建VQA模型输入
+
+    Args:
+        frame: 原始帧
+        motion_boxes: process_frame计算出的运动框 [(x, y, w, h), ...]
+        mode: "full"（整帧）、"crop"（运动区域）或 "crop_context"（运动区域 + 整帧缩略图），
+              默认读取配置roi.mode；roi.enabled为false时始终使用整帧
+
+    Returns:
+        numpy数组: 送入VQA模型的图像（没有运动框时为原始帧）
+    """
+    roi_config = CONFIG.get("roi", {})
+    if mode is None:
+        mode = roi_config.get("mode", "crop") if roi_config.get("enabled", False) else "full"
+    if mode == "full":
+        return frame
+
+    box = union_box(
+        motion_boxes, frame.shape,
+        padding=roi_config.get("padding", 0.2), min_size=roi_config.get("min_size", 160)
+    )
+    if box is None:
+        return frame
+    if mode == "crop_context":
+        return crop_with_context(frame, box, context_size=roi_config.get("context_size", 0.25))
+    if mode == "crop":
+        x0, y0, x1, y1 = box
+        return frame[y0:y1, x0:x1].copy()
+    raise ValueError(f"未知的ROI模式: {mode}")
@@ -1,7 +1,8 @@
 import cv2
 import numpy as np
-from vqa_interface import VQAInterface
-from image_caption_interface import ImageCaptionInterface
+from inference_service import connect_or_load
+from vision_cache import compute_frame_key
+from question_cascade import QuestionCascade, QuestionRule
 import subprocess
 import time
 from send_email_v2 import send_frame_as_email
@@ -31,9 +32,9 @@ def save_frame_to_shots(frame):
 
 
 def main(frame=None):
-    # 初始化VQA接口
-    vqa = VQAInterface(model_path=CONFIG["models"]["vqa_path"])
-    caption_interface = ImageCaptionInterface(CONFIG["models"]["image_caption_path"])
+    # 初始化VQA接口（优先连接常驻推理服务，避免每次触发都重新加载模型）
+    vqa, caption_interface = connect_or_load()
+    question_cascade = QuestionCascade(vqa, binary=CONFIG["emergency"].get("binary_fast_path", True))
 
 
     # 处理摄像头图片
@@ -43,12 +44,14 @@ def main(frame=None):
     if ret:
         # 图片保存
         save_frame_to_shots(frame)
-        # vqa问答
-        questions = CONFIG["emergency"]["questions"]
-        results = vqa.batch_answer_questions(frame, questions)
-        for result in results:
+        frame_key = compute_frame_key(frame)
+        # vqa问答（按规则短路求值，同一帧的答案在规则间复用）
+        answers = {}
+        rule = QuestionRule.from_config("emergency", CONFIG["emergency"], "questions")
+        evaluation = question_cascade.evaluate(frame, rule, frame_key=frame_key, answers=answers)
+        for result in evaluation['results']:
             print(f"Q: {result['question']} -> A: {result['answer']}")
-        if_emergency = all(result['answer'].lower() == 'yes' for result in results)
+        if_emergency = evaluation['matched']
         if if_emergency:
             print(f"[{time.strftime('%H:%M:%S')}] 紧急情况检测到！")
             # 进一步询问
@@ -67,11 +70,11 @@ def main(frame=None):
             print(f"[{time.strftime('%H:%M:%S')}] 未检测到紧急情况。")
 
 
-        questions2 = CONFIG["emergency"]["suspicious_questions"]
-        results = vqa.batch_answer_questions(frame, questions2)
-        for result in results:
+        rule2 = QuestionRule.from_config("suspicious", CONFIG["emergency"], "suspicious_questions")
+        evaluation2 = question_cascade.evaluate(frame, rule2, frame_key=frame_key, answers=answers)
+        for result in evaluation2['results']:
             print(f"Q: {result['question']} -> A: {result['answer']}")
-        if_suspicious = all(result['answer'].lower() == 'yes' for result in results)
+        if_suspicious = evaluation2['matched']
         if if_suspicious:
             print(f"[{time.strftime('%H:%M:%S')}] 可疑人员检测到！")
             msg="""
@@ -89,11 +92,11 @@ def main(frame=None):
 
 
         # 图像描述
-        single_caption = caption_interface.generate_caption(frame)
+        single_caption = caption_interface.generate_caption(frame, frame_key=frame_key)
         print(f"摄像头图片描述: {single_caption}")
     cap.release()
 
 
 
-#if __name__ == "__main__":
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import contextlib
+import threading
+import time
+
+
+class StartupProfiler:
+    """
+    启动耗时记录
+
+    记录各启动阶段（导入模型库、加载权重、预热、首帧显示等）的耗时，
+    以及每个阶段结束时距程序启动的时间，便于定位启动瓶颈。
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.stages = []
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def record(self, name, duration):
+        """记录一个阶段的耗时"""
+        elapsed = time.time() - self.start_time
+        with self._lock:
+            self.stages.append({'name': name, 'duration': duration, 'elapsed': elapsed})
+        print(f"[{time.strftime('%H:%M:%S')}] 启动阶段 {name}: {duration:.2f}s（启动后 {elapsed:.2f}s）")
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """计时一个阶段"""
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, time.time() - start_time)
+
+    def mark(self, name):
+        """记录一个时间点（耗时按距程序启动计算）"""
+        self.record(name, time.time() - self.start_time)
+
+    def report(self):
+        """打印启动耗时汇总（只打印一次）"""
+        with self._lock:
+            if self.reported:
+                return
+            self.reported = True
+            stages = list(self.stages)
+        print(f"[{time.strftime('%H:%M:%S')}] ===== 启动耗时 =====")
+        for stage in stages:
+            print(f"  {stage['name']:<16} {stage['duration']:7.2f}s   （启动后 {stage['elapsed']:6.2f}s）")
+        print(f"  {'总计':<16} {time.time() - self.start_time:7.2f}s")
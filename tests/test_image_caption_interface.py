@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+import image_caption_interface
+from image_caption_interface import ImageCaptionInterface
+
+
+@pytest.fixture
+def interface():
+    """不加载模型，只测试解码参数"""
+    interface = object.__new__(ImageCaptionInterface)
+    interface._diverse_beam_fallback_logged = False
+    return interface
+
+
+def test_diverse_beam_uses_beam_groups_when_available(interface, monkeypatch):
+    monkeypatch.setattr(image_caption_interface, "GROUP_BEAM_SEARCH_AVAILABLE", True)
+    kwargs = interface._diverse_generate_kwargs(3, "diverse_beam", time_budget=0)
+    assert kwargs['num_beam_groups'] == 3
+    assert kwargs['num_beams'] == 6
+
+
+def test_diverse_beam_falls_back_to_sampling_without_beam_groups(interface, monkeypatch, capsys):
+    monkeypatch.setattr(image_caption_interface, "GROUP_BEAM_SEARCH_AVAILABLE", False)
+    for _ in range(2):
+        kwargs = interface._diverse_generate_kwargs(3, "diverse_beam", time_budget=0)
+        assert 'num_beam_groups' not in kwargs and 'diversity_penalty' not in kwargs
+        assert kwargs['do_sample'] and kwargs['num_return_sequences'] == 3
+    # 只提示一次
+    assert capsys.readouterr().out.count("改用采样") == 1
@@ -0,0 +1,162 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from inference_scheduler import (
+    DeadlineExceeded, InferenceCancelled, InferenceScheduler, PRIORITY_EMERGENCY, PRIORITY_ROUTINE
+)
+from result_cache import ResultCache, perceptual_hash
+
+
+class FakeVQA:
+    """
+    记录每次送入模型的问题，所有问题回答"no"
+
+    非是非题按generate处理：与CancellationCriteria相同，结束时已被抢占或超过截止时间则记录为中途停止
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def answer_frames(self, requests, binary=False, cancel_event=None, deadline=None):
+        self.calls.append([question for _, questions, _ in requests for question in questions])
+        if not binary and cancel_event is not None and (
+                cancel_event.is_set() or (deadline is not None and time.time() > deadline)):
+            cancel_event.mark_stopped()
+        return [[{'question': question, 'answer': "no"} for question in questions] for _, questions, _ in requests]
+
+
+@pytest.fixture
+def scheduler():
+    vqa = FakeVQA()
+    scheduler = InferenceScheduler(vqa_model=vqa, window_ms=0, preemption=False,
+                                   result_cache=ResultCache(max_distance=4, ttl=30.0))
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def _frames():
+    """一帧画面和只有小块区域变化的近似帧"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, size=(120, 160, 3)).astype(np.uint8)
+    near = frame.copy()
+    near[50:56, 70:76] = 255
+    assert (perceptual_hash(frame) ^ perceptual_hash(near)).bit_count() <= 4
+    return frame, near
+
+
+def test_routine_job_reuses_cached_answer_on_near_duplicate(scheduler):
+    frame, near = _frames()
+    question = "Did someone fall?"
+    scheduler.submit('vqa', frame, priority=PRIORITY_ROUTINE, questions=[question], binary=True).result()
+    scheduler.submit('vqa', near, priority=PRIORITY_ROUTINE, questions=[question], binary=True).result()
+    assert scheduler.vqa_model.calls == [[question]]
+
+
+def test_periodic_emergency_rule_uses_cache(scheduler):
+    frame, near = _frames()
+    question = "Did someone fall?"
+    scheduler.submit('vqa', frame, priority=PRIORITY_EMERGENCY, questions=[question], binary=True).result()
+    scheduler.submit('vqa', near, priority=PRIORITY_EMERGENCY, questions=[question], binary=True).result()
+    assert scheduler.vqa_model.calls == [[question]]
+
+
+def test_cache_bypass_reasks_question_on_near_duplicate(scheduler):
+    frame, near = _frames()
+    question = "Did someone fall?"
+    scheduler.submit('vqa', frame, priority=PRIORITY_ROUTINE, questions=[question], binary=True).result()
+    result = scheduler.submit('vqa', near, priority=PRIORITY_EMERGENCY, use_cache=False,
+                              questions=[question], binary=True).result()
+    assert scheduler.vqa_model.calls == [[question], [question]]
+    assert result == [{'question': question, 'answer': "no"}]
+
+
+class PreemptingVQA(FakeVQA):
+    """模拟推理执行期间到达的紧急请求：after_generate为False时在生成过程中抢占，否则在生成结束后抢占"""
+
+    scheduler = None
+    after_generate = False
+
+    def answer_frames(self, requests, binary=False, cancel_event=None, deadline=None):
+        if self.after_generate:
+            results = super().answer_frames(requests, binary, cancel_event, deadline)
+            self.scheduler.submit('ping', None, priority=PRIORITY_EMERGENCY)
+            assert cancel_event.is_set()
+            return results
+        self.scheduler.submit('ping', None, priority=PRIORITY_EMERGENCY)
+        assert cancel_event.is_set()
+        return super().answer_frames(requests, binary, cancel_event, deadline)
+
+
+@pytest.fixture
+def preempting_scheduler():
+    vqa = PreemptingVQA()
+    scheduler = InferenceScheduler(vqa_model=vqa, window_ms=0, preemption=True)
+    vqa.scheduler = scheduler
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def test_completed_binary_group_keeps_results_when_preempted(preempting_scheduler):
+    frame, _ = _frames()
+    future = preempting_scheduler.submit('vqa', frame, priority=PRIORITY_ROUTINE, questions=["Q?"], binary=True)
+    assert future.result() == [{'question': "Q?", 'answer': "no"}]
+    assert preempting_scheduler.get_statistics()['cancelled_jobs'] == 0
+
+
+def test_generate_finished_before_preemption_keeps_results(preempting_scheduler):
+    preempting_scheduler.vqa_model.after_generate = True
+    frame, _ = _frames()
+    future = preempting_scheduler.submit('vqa', frame, priority=PRIORITY_ROUTINE, questions=["Q?"], binary=False)
+    assert future.result() == [{'question': "Q?", 'answer': "no"}]
+    assert preempting_scheduler.get_statistics()['cancelled_jobs'] == 0
+
+
+def test_interrupted_generate_group_is_cancelled(preempting_scheduler):
+    frame, _ = _frames()
+    future = preempting_scheduler.submit('vqa', frame, priority=PRIORITY_ROUTINE, questions=["Q?"], binary=False)
+    with pytest.raises(InferenceCancelled):
+        future.result()
+    assert preempting_scheduler.get_statistics()['cancelled_jobs'] == 1
+
+
+class SlowVQA(FakeVQA):
+    """第一次生成耗时超过分组中最早的截止时间"""
+
+    def answer_frames(self, requests, binary=False, cancel_event=None, deadline=None):
+        if not self.calls:
+            time.sleep(0.3)
+        return super().answer_frames(requests, binary, cancel_event, deadline)
+
+
+def test_deadline_only_fails_jobs_past_their_own_deadline():
+    scheduler = InferenceScheduler(vqa_model=SlowVQA(), window_ms=100, preemption=False)
+    scheduler.start()
+    try:
+        frame, _ = _frames()
+        deadlined = scheduler.submit('vqa', frame, deadline=time.time() + 0.2, questions=["A?"], binary=False)
+        undeadlined = scheduler.submit('vqa', frame, questions=["B?"], binary=False)
+        with pytest.raises(DeadlineExceeded):
+            deadlined.result()
+        assert undeadlined.result() == [{'question': "B?", 'answer': "no"}]
+        # 两个请求先合批执行，没有截止时间的请求放回队列后单独重新执行
+        assert scheduler.vqa_model.calls == [["A?", "B?"], ["B?"]]
+        assert scheduler.get_statistics()['expired_jobs'] == 1
+    finally:
+        scheduler.stop()
+
+
+def test_stop_with_wait_returns_after_worker_finished_pending_jobs():
+    scheduler = InferenceScheduler(vqa_model=SlowVQA(), window_ms=0, preemption=False)
+    scheduler.start()
+    frame, _ = _frames()
+    future = scheduler.submit('vqa', frame, questions=["A?"], binary=True)
+    scheduler.stop(wait=True)
+    assert not scheduler._worker.is_alive()
+    assert future.result(timeout=0) == [{'question': "A?", 'answer': "no"}]
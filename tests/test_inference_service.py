@@ -0,0 +1,51 @@
+import os
+import socket
+import stat
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+from config_loader import CONFIG
+from inference_service import InferenceClient, InferenceService, load_authkey, start_shared_service
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def service_config(tmp_path, monkeypatch):
+    """使用临时密钥文件和空闲端口"""
+    config = dict(CONFIG["inference_service"], port=_free_port(), authkey_file=str(tmp_path / "service.key"))
+    monkeypatch.setitem(CONFIG, "inference_service", config)
+    return config
+
+
+def test_authkey_is_random_and_private(service_config):
+    authkey = load_authkey(create=True)
+    assert len(authkey) == 64
+    assert load_authkey() == authkey
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(service_config["authkey_file"]).st_mode) == 0o600
+
+
+def test_client_without_authkey_file_cannot_connect(service_config):
+    with pytest.raises(FileNotFoundError):
+        InferenceClient()
+
+
+def test_second_launcher_reuses_running_service(service_config):
+    service = InferenceService(vqa_model=object(), caption_model=object())
+    service.start_server()
+    try:
+        assert start_shared_service() is None
+        client = InferenceClient()
+        assert client.ping()
+        client.close()
+    finally:
+        service.stop()
@@ -0,0 +1,43 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("safetensors")
+
+from model_cache import load_prepared_model
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """保存一个随机初始化的小型BLIP模型"""
+    torch.manual_seed(0)
+    config = transformers.BlipConfig(
+        vision_config=dict(hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=2,
+                           image_size=64, patch_size=16),
+        text_config=dict(hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=2,
+                         vocab_size=1000, encoder_hidden_size=64),
+    )
+    path = tmp_path / "blip"
+    transformers.BlipForConditionalGeneration(config).save_pretrained(path)
+    return str(path)
+
+
+def test_cached_model_matches_original(model_path, tmp_path):
+    cls = transformers.BlipForConditionalGeneration
+    cache_dir = str(tmp_path / "cache")
+    original = load_prepared_model(cls, model_path, torch.float32, cache_dir=cache_dir).eval()
+    cached = load_prepared_model(cls, model_path, torch.float32, cache_dir=cache_dir).eval()
+
+    assert not any(t.is_meta for t in cached.parameters())
+    assert not any(t.is_meta for t in cached.buffers())
+    for name, tensor in original.state_dict().items():
+        assert torch.equal(tensor, cached.state_dict()[name]), name
+    # 绑定的权重仍然共享同一个张量
+    assert cached.text_decoder.cls.predictions.decoder.weight is cached.text_decoder.bert.embeddings.word_embeddings.weight
+
+    pixel_values = torch.randn(1, 3, 64, 64)
+    input_ids = torch.tensor([[1, 5, 7]])
+    with torch.no_grad():
+        expected = original(pixel_values=pixel_values, input_ids=input_ids).logits
+        actual = cached(pixel_values=pixel_values, input_ids=input_ids).logits
+    assert torch.equal(expected, actual)
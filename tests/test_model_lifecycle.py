@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from model_lifecycle import ModelLifecycleManager, ModelLoadTimeout
+
+
+class SlowLoader:
+    """加载时阻塞，直到测试放行"""
+
+    def __init__(self, fail=False):
+        self.release = threading.Event()
+        self.loads = 0
+        self.unloads = 0
+        self.fail = fail
+
+    def load(self):
+        self.loads += 1
+        self.release.wait(5)
+        if self.fail:
+            raise OSError("权重文件不存在")
+
+    def unload(self):
+        self.unloads += 1
+
+
+def test_acquire_times_out_while_load_continues_in_background():
+    loader = SlowLoader()
+    manager = ModelLifecycleManager(loader.load, loader.unload, idle_timeout=0)
+    manager.prewarm()
+    start_time = time.time()
+    with pytest.raises(ModelLoadTimeout):
+        manager.acquire(timeout=0.05)
+    assert time.time() - start_time < 1.0
+    assert manager.is_loading
+    # 加载期间锁不被占用：卸载和统计可以立即返回
+    assert manager.unload() is False
+    assert manager.get_statistics()['loads'] == 0
+
+    loader.release.set()
+    manager.acquire(timeout=5)
+    manager.release()
+    assert loader.loads == 1
+    assert manager.is_loaded and not manager.is_loading
+
+
+def test_concurrent_acquires_share_one_load():
+    loader = SlowLoader()
+    manager = ModelLifecycleManager(loader.load, loader.unload, idle_timeout=0)
+    threads = [threading.Thread(target=manager.acquire) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    loader.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert loader.loads == 1
+    assert manager.get_statistics()['misses'] == 3
+    assert manager.unload() is False
+
+
+def test_failed_load_raises_and_next_acquire_retries():
+    loader = SlowLoader(fail=True)
+    loader.release.set()
+    manager = ModelLifecycleManager(loader.load, loader.unload, idle_timeout=0)
+    with pytest.raises(RuntimeError):
+        manager.acquire(timeout=5)
+    assert not manager.is_loaded and not manager.is_loading
+    loader.fail = False
+    manager.acquire(timeout=5)
+    manager.release()
+    assert loader.loads == 2
+    assert manager.unload() is True
+    assert loader.unloads == 1
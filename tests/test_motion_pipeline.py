@@ -0,0 +1,34 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from motion_pipeline import MotionAnalyzer
+
+
+def _static_scene(count, width=160, height=120, seed=0):
+    """静止画面：固定纹理加少量逐帧传感器噪声"""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(40, 200, size=(height, width, 3)).astype(np.int16)
+    for _ in range(count):
+        noise = rng.integers(-3, 4, size=base.shape)
+        yield np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("engine", ["mog2", "knn"])
+def test_background_engine_reports_no_motion_on_static_scene_after_reset(engine):
+    analyzer = MotionAnalyzer(scale=1.0, frame_size=(160, 120), engine=engine)
+    frames = list(_static_scene(30))
+    for frame in frames[:10]:
+        analyzer.detect(frame, 10)
+
+    analyzer.reset()
+    areas = []
+    for frame in frames[10:]:
+        result = analyzer.detect(frame, 10)
+        areas.append(None if result is None else result[1])
+
+    assert areas[0] is None
+    assert all(area is None or area == 0 for area in areas), areas
+    # 预热结束后恢复正常输出
+    assert areas[-1] == 0
@@ -0,0 +1,43 @@
+from question_cascade import QuestionCascade, QuestionRule
+
+
+class FakeVQA:
+    """按预设答案回答，记录提交给模型的问题"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.asked = []
+
+    def batch_answer_questions(self, frame, questions, frame_key=None, binary=True, **kwargs):
+        self.asked.extend(questions)
+        return [{'question': question, 'answer': self.answers[question]} for question in questions]
+
+
+def test_short_circuit_counts_unasked_questions_as_saved():
+    vqa = FakeVQA({"A?": "no", "B?": "yes"})
+    evaluation = QuestionCascade(vqa).evaluate(None, QuestionRule("r", ["A?", "B?"], "q1 and q2"))
+    assert not evaluation['matched']
+    assert vqa.asked == ["A?"]
+    assert (evaluation['asked'], evaluation['reused'], evaluation['saved']) == (1, 0, 1)
+
+
+def test_answers_reused_across_rules_count_as_saved():
+    vqa = FakeVQA({"A?": "yes", "B?": "yes"})
+    cascade = QuestionCascade(vqa)
+    answers = {}
+    first = cascade.evaluate(None, QuestionRule("r1", ["A?", "B?"]), answers=answers)
+    second = cascade.evaluate(None, QuestionRule("r2", ["A?", "B?"], "q1 or q2"), answers=answers)
+    assert first['matched'] and second['matched']
+    assert sorted(vqa.asked) == ["A?", "B?"]
+    # 第二个规则没有提交任何问题：一个答案复用，另一个问题被短路
+    assert (second['asked'], second['reused'], second['saved']) == (0, 1, 2)
+    stats = cascade.get_statistics()
+    assert stats['model_calls'] == 2
+    assert stats['model_calls_saved'] == 2
+
+
+def test_repeated_question_in_rule_is_counted_once():
+    vqa = FakeVQA({"A?": "yes"})
+    evaluation = QuestionCascade(vqa).evaluate(None, QuestionRule("r", ["A?"], "q1 and not (not q1)"))
+    assert evaluation['matched']
+    assert (evaluation['asked'], evaluation['reused'], evaluation['saved']) == (1, 0, 0)
@@ -0,0 +1,35 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from roi import crop_with_context, union_box
+
+
+def _covers(box, x0, y0, x1, y1):
+    return box[0] <= x0 and box[1] <= y0 and box[2] >= x1 and box[3] >= y1
+
+
+def test_union_box_is_padded_square_inside_frame():
+    box = union_box([(200, 150, 100, 80)], (480, 640))
+    left, top, right, bottom = box
+    assert right - left == bottom - top
+    assert _covers(box, 200, 150, 300, 230)
+    assert 0 <= left and 0 <= top and right <= 640 and bottom <= 480
+
+
+def test_union_box_wider_than_frame_height_keeps_full_width():
+    box = union_box([(0, 0, 640, 100)], (480, 640))
+    assert _covers(box, 0, 0, 640, 100)
+    assert box[2] <= 640 and box[3] <= 480
+
+
+def test_union_box_without_boxes():
+    assert union_box([], (480, 640)) is None
+
+
+def test_crop_with_context_accepts_non_square_box():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    box = union_box([(0, 0, 640, 100)], frame.shape)
+    crop = crop_with_context(frame, box)
+    assert crop.shape[:2] == (box[3] - box[1], box[2] - box[0])
@@ -0,0 +1,40 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from vision_cache import vision_backbone_signature
+
+
+@pytest.fixture
+def model():
+    """随机初始化的小型BLIP模型"""
+    config = transformers.BlipConfig(
+        vision_config=dict(hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=2,
+                           image_size=64, patch_size=16),
+        text_config=dict(hidden_size=64, intermediate_size=128, num_hidden_layers=2, num_attention_heads=2,
+                         vocab_size=1000, encoder_hidden_size=64),
+    )
+    return transformers.BlipForQuestionAnswering(config).eval()
+
+
+def test_signature_is_stable(model):
+    assert vision_backbone_signature(model) == vision_backbone_signature(model)
+
+
+def test_signature_distinguishes_numeric_variants(model):
+    signatures = {vision_backbone_signature(model), vision_backbone_signature(model, torch.bfloat16)}
+    half = type(model)(model.config)
+    half.load_state_dict(model.state_dict())
+    signatures.add(vision_backbone_signature(half.half()))
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    signatures.add(vision_backbone_signature(quantized))
+    assert len(signatures) == 4
+
+
+def test_signature_covers_every_vision_parameter(model):
+    before = vision_backbone_signature(model)
+    params = list(model.vision_model.parameters())
+    with torch.no_grad():
+        params[len(params) // 2].add_(1.0)
+    assert vision_backbone_signature(model) != before
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+
+def compute_frame_key(image):
+    """
+    计算帧的缓存键（基于图像内容的哈希）
+
+    Args:
+        image: 文件路径、numpy数组（OpenCV格式）或PIL Image
+
+    Returns:
+        str: 帧的唯一键
+    """
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(image, str):
+        path = os.path.abspath(image)
+        h.update(f"path:{path}:{os.path.getmtime(path)}".encode("utf-8"))
+    elif isinstance(image, np.ndarray):
+        h.update(f"ndarray:{image.shape}:{image.dtype}".encode("utf-8"))
+        h.update(np.ascontiguousarray(image).data)
+    elif isinstance(image, Image.Image):
+        h.update(f"pil:{image.size}:{image.mode}".encode("utf-8"))
+        h.update(image.tobytes())
+    else:
+        raise ValueError(f"[{time.strftime('%H:%M:%S')}] 不支持的图片格式: {type(image)}")
+    return h.hexdigest()
+
+
+def processor_signature(processor):
+    """计算图像预处理配置的签名，配置相同的处理器可共享像素张量"""
+    image_processor = getattr(processor, "image_processor", processor)
+    fields = {}
+    for name in ("do_resize", "size", "resample", "do_rescale", "rescale_factor",
+                 "do_normalize", "image_mean", "image_std", "do_convert_rgb"):
+        value = getattr(image_processor, name, None)
+        fields[name] = value if isinstance(value, (dict, list, tuple, int, float, bool, str, type(None))) else str(value)
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def vision_backbone_signature(model, compute_dtype=None):
+    """
+    计算视觉编码器的签名（模型加载时计算一次）
+
+    使用视觉配置、量化模块类型、计算精度和全部视觉参数的原始字节（含精度）计算：
+    只有数值上完全相同的主干才共享编码结果，float16与float32、量化与未量化的副本签名不同。
+
+    Args:
+        model: BLIP模型
+        compute_dtype: 可选的autocast计算精度（影响编码结果）
+    """
+    import torch
+
+    vision_model = model.vision_model
+    h = hashlib.blake2b(digest_size=8)
+    h.update(vision_model.config.to_json_string().encode("utf-8"))
+    # 动态量化后的Linear权重打包在量化模块中，不在named_parameters里，单独按模块类型和量化权重哈希
+    quantized = sorted({
+        f"{type(module).__module__}.{type(module).__name__}"
+        for module in vision_model.modules() if "quantized" in type(module).__module__
+    })
+    h.update(f"quantized={','.join(quantized)};autocast={compute_dtype}".encode("utf-8"))
+    for name, module in vision_model.named_modules():
+        if "quantized" in type(module).__module__ and callable(getattr(module, "weight", None)):
+            weight = module.weight()
+            h.update(f"{name}:{weight.dtype}".encode("utf-8"))
+            # 反量化后的数值同时包含整数权重和缩放系数
+            h.update(weight.dequantize().contiguous().numpy().tobytes())
+    for name, param in vision_model.named_parameters():
+        h.update(f"{name}:{param.dtype}".encode("utf-8"))
+        # 按原始字节哈希，支持numpy没有的bfloat16
+        h.update(param.detach().to("cpu").contiguous().view(-1).view(torch.uint8).numpy().tobytes())
+    return h.hexdigest()
+
+
+class VisionEmbeddingCache:
+    """
+    以帧为键的视觉特征缓存（有界LRU）
+
+    每帧保存按类型区分的张量，例如预处理后的像素张量（"pixels:<预处理签名>"）
+    和视觉编码器输出（"embeds:<主干签名>"），同一帧上的所有问题和图像描述复用同一份结果。
+    """
+
+    def __init__(self, max_entries=4):
+        """
+        Args:
+            max_entries: 最多缓存的帧数，超出后淘汰最久未使用的帧
+        """
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame_key, kind):
+        """读取缓存，未命中返回None"""
+        with self._lock:
+            entry = self._entries.get(frame_key)
+            if entry is None or kind not in entry:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(frame_key)
+            self.hits += 1
+            return entry[kind]
+
+    def put(self, frame_key, kind, value):
+        """写入缓存并淘汰多余的帧"""
+        with self._lock:
+            entry = self._entries.setdefault(frame_key, {})
+            entry[kind] = value
+            self._entries.move_to_end(frame_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, frame_key, kind, compute_fn):
+        """命中则直接返回，否则调用compute_fn计算并写入缓存"""
+        if frame_key is None:
+            return compute_fn()
+        value = self.get(frame_key, kind)
+        if value is None:
+            value = compute_fn()
+            self.put(frame_key, kind, value)
+        return value
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_statistics(self):
+        """获取统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'frames': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total * 100 if total > 0 else 0
+            }
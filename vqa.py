@@ -1,9 +1,9 @@
-import torch
 import cv2
 import requests
 from PIL import Image
 from modelscope import BlipProcessor, BlipForQuestionAnswering
 import time
+from execution_backend import get_backend
 
 class RealTimeVQA:
     def __init__(self, model_path="./vqa", frame_interval=30):
@@ -12,15 +12,11 @@ class RealTimeVQA:
         :param model_path: 本地模型路径
         :param frame_interval: 处理间隔帧数（默认每30帧处理一次）
         """
-        # 加载模型和处理器
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"当前使用的设备: {device}")
+        # 加载模型和处理器（设备、精度和CPU线程数由执行后端决定）
+        self.backend = get_backend()
+        print(f"当前使用的设备: {self.backend.device}")
         self.processor = BlipProcessor.from_pretrained(model_path, local_files_only=True)
-        self.model = BlipForQuestionAnswering.from_pretrained(
-            model_path, 
-            local_files_only=True, 
-            dtype=torch.float16
-        ).to(device)
+        self.model = self.backend.load_model(BlipForQuestionAnswering, model_path)
         
         self.frame_interval = frame_interval
         self.frame_count = 0
@@ -47,9 +43,9 @@ class RealTimeVQA:
             pil_image = Image.fromarray(rgb_frame)
             
             # 预处理并推理
-            inputs = self.processor(pil_image, self.question, return_tensors="pt").to("cuda", torch.float16)
+            inputs = self.backend.move_inputs(self.processor(pil_image, self.question, return_tensors="pt"))
             
-            with torch.no_grad():
+            with self.backend.inference_context():
                 out = self.model.generate(**inputs)
                 answer = self.processor.decode(out[0], skip_special_tokens=True)
             
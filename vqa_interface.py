@@ -4,20 +4,69 @@ from PIL import Image
 from modelscope import BlipProcessor, BlipForQuestionAnswering
 import numpy as np
 import time
+from config_loader import CONFIG
+from execution_backend import get_backend
+from decoding_profiles import build_stopping_criteria
+from fast_preprocess import FramePreprocessor
+from vision_cache import compute_frame_key, processor_signature, vision_backbone_signature
 
 class VQAInterface:
     """VQA接口类，用于处理图片问答"""
     
-    def __init__(self, model_path="./vqa"):
-        """初始化VQA模型"""
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    def __init__(self, model_path="./vqa", vision_cache=None, backend=None, quantize=None):
+        """
+        初始化VQA模型
+        
+        Args:
+            model_path: 本地模型路径
+            vision_cache: 可选的VisionEmbeddingCache，与图像描述模型共享同一帧的预处理和视觉编码结果
+            backend: 可选的ExecutionBackend，默认使用进程内共享的后端
+            quantize: 是否使用动态int8量化模型（仅CPU），默认读取配置models.quantize
+        """
+        self.backend = backend or get_backend()
+        device = self.backend.device
         print(f"当前使用的设备: {device}")
+        self.device = device
+        self.dtype = self.backend.dtype
         self.processor = BlipProcessor.from_pretrained(model_path, local_files_only=True)
-        self.model = BlipForQuestionAnswering.from_pretrained(
-            model_path, local_files_only=True, dtype=torch.float16
-        ).to(device)
+        self.model = self.backend.load_model(BlipForQuestionAnswering, model_path, quantize=quantize)
+        self.vision_cache = vision_cache
+        self.frame_preprocessor = self._create_frame_preprocessor()
+        fast = ":fast" if self.frame_preprocessor is not None else ""
+        self.pixel_cache_kind = f"pixels:{processor_signature(self.processor)}:{device}{fast}"
+        self.embeds_cache_kind = f"embeds:{vision_backbone_signature(self.model, self.backend.autocast_dtype)}:{device}"
         print(f"[{time.strftime('%H:%M:%S')}] VQA模型加载成功至设备: {device}")
     
+    def warmup(self):
+        """
+        模型预热：按实际调用方式（摄像头尺寸的帧、经由answer_frames逐个提问的配置问题）运行是非题打分
+        和一次生成，避免首次紧急提问承担初始化开销；编译模式下重复backend.warmup_runs次，完成所有编译
+        """
+        try:
+            camera_config = CONFIG["camera"]
+            dummy_frame = np.zeros((camera_config["height"], camera_config["width"], 3), dtype=np.uint8)
+            emergency_config = CONFIG["emergency"]
+            questions = list(dict.fromkeys(emergency_config["questions"] + emergency_config["suspicious_questions"]))
+            binary = emergency_config.get("binary_fast_path", True)
+            start_time = time.time()
+            for _ in range(self.backend.warmup_runs):
+                # 问题级联每次只提问一个问题
+                for question in questions:
+                    self.answer_frames([(dummy_frame, [question], None)], binary=binary)
+                self.answer_frames([(dummy_frame, ["what is in the picture?"], None)])
+            print(f"[{time.strftime('%H:%M:%S')}] VQA模型预热完成，耗时 {time.time() - start_time:.2f}s")
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] VQA预热失败，但不影响使用: {e}")
+    
+    def _create_frame_preprocessor(self):
+        """摄像头帧的快速预处理（不经过PIL），可在配置preprocess.fast_path中关闭"""
+        preprocess_config = CONFIG.get("preprocess", {})
+        if not preprocess_config.get("fast_path", True):
+            return None
+        return FramePreprocessor.from_processor(
+            self.processor, interpolation=preprocess_config.get("interpolation", "auto")
+        )
+    
     def _preprocess_image(self, image):
         """预处理图片，支持多种输入格式"""
         if isinstance(image, str):
@@ -35,25 +84,259 @@ class VQAInterface:
             raise ValueError(f"[{time.strftime('%H:%M:%S')}] 不支持的图片格式: {type(image)}")
         return image
     
-    def answer_question(self, image, question):
-        """对图片回答问题"""
-        try:
+    def _resolve_frame_key(self, image, frame_key):
+        """未启用缓存时不计算帧键"""
+        if self.vision_cache is None:
+            return None
+        return frame_key if frame_key is not None else compute_frame_key(image)
+    
+    def _get_pixel_values(self, image, frame_key=None):
+        """获取像素张量，同一帧只预处理一次"""
+        def compute():
+            if self.frame_preprocessor is not None and isinstance(image, np.ndarray):
+                # 结果位于复用的缓冲区，拷贝到推理设备后才可缓存或拼接
+                return self.frame_preprocessor(image).to(self.device, copy=True)
             pil_image = self._preprocess_image(image)
-            inputs = self.processor(pil_image, question, return_tensors="pt").to("cuda", torch.float16)
+            return self.processor(images=pil_image, return_tensors="pt")["pixel_values"].to(self.device)
+        
+        if frame_key is None:
+            pixel_values = compute()
+        else:
+            pixel_values = self.vision_cache.get_or_compute(frame_key, self.pixel_cache_kind, compute)
+        return pixel_values.to(self.dtype)
+    
+    def _get_image_embeds(self, image, frame_key=None):
+        """获取视觉编码器输出，同一帧只编码一次"""
+        def compute():
+            return self._encode_image(self._get_pixel_values(image, frame_key))
+        
+        if frame_key is None:
+            return compute()
+        image_embeds = self.vision_cache.get_or_compute(frame_key, self.embeds_cache_kind, compute)
+        return image_embeds.to(self.dtype)
+    
+    def _encode_image(self, pixel_values):
+        """运行一次视觉编码器，返回图像特征"""
+        return self.model.vision_model(pixel_values=pixel_values)[0]
+    
+    def _encode_questions(self, image_embeds, input_ids, attention_mask):
+        """用文本编码器融合问题与图像特征"""
+        batch_size = input_ids.size(0)
+        # 图像特征在批次维度上广播，不复制显存
+        image_embeds = image_embeds.expand(batch_size, -1, -1)
+        image_attention_mask = torch.ones(image_embeds.size()[:-1], dtype=torch.long, device=image_embeds.device)
+        
+        return self.model.text_encoder(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            encoder_hidden_states=image_embeds,
+            encoder_attention_mask=image_attention_mask,
+            return_dict=False
+        )[0]
+    
+    def _decoder_start_ids(self, batch_size, device):
+        """解码器起始token"""
+        return torch.full((batch_size, 1), fill_value=self.model.decoder_start_token_id, device=device)
+    
+    def _generate_from_image_embeds(self, image_embeds, input_ids, attention_mask, **generate_kwargs):
+        """
+        基于已编码的图像特征，对一批问题一次性解码
+        
+        Args:
+            image_embeds: 单张图像的视觉特征 (1, seq_len, hidden)，或与问题一一对应 (batch, seq_len, hidden)
+            input_ids: 填充后的问题token (batch, max_len)
+            attention_mask: 问题的注意力掩码 (batch, max_len)
+            **generate_kwargs: 传给text_decoder.generate的其他参数
             
-            with torch.no_grad():
-                out = self.model.generate(**inputs)
-                answer = self.processor.decode(out[0], skip_special_tokens=True)
+        Returns:
+            Tensor: 生成的答案token
+        """
+        question_embeds = self._encode_questions(image_embeds, input_ids, attention_mask)
+        
+        # 解码器只关注问题的有效token，忽略填充部分
+        return self.model.text_decoder.generate(
+            input_ids=self._decoder_start_ids(input_ids.size(0), question_embeds.device),
+            eos_token_id=self.model.config.text_config.sep_token_id,
+            pad_token_id=self.model.config.text_config.pad_token_id,
+            encoder_hidden_states=question_embeds,
+            encoder_attention_mask=attention_mask,
+            **generate_kwargs
+        )
+    
+    def _answer_from_image_embeds(self, image_embeds, questions, stopping_criteria=None):
+        """所有问题填充为一个批次，在一次generate中解码（image_embeds为单张图像或与问题一一对应）"""
+        text_inputs = self.processor.tokenizer(list(questions), padding=True, return_tensors="pt").to(self.device)
+        generate_kwargs = {} if stopping_criteria is None else {'stopping_criteria': stopping_criteria}
+        out = self._generate_from_image_embeds(
+            image_embeds, text_inputs["input_ids"], text_inputs["attention_mask"], **generate_kwargs
+        )
+        return self.processor.batch_decode(out, skip_special_tokens=True)
+    
+    def _score_from_image_embeds(self, image_embeds, questions):
+        """是非题单步打分（image_embeds为单张图像或与问题一一对应）"""
+        tokenizer = self.processor.tokenizer
+        text_inputs = tokenizer(list(questions), padding=True, return_tensors="pt").to(self.device)
+        yes_no_ids = tokenizer.convert_tokens_to_ids(["yes", "no"])
+        
+        question_embeds = self._encode_questions(
+            image_embeds, text_inputs["input_ids"], text_inputs["attention_mask"]
+        )
+        logits = self.model.text_decoder(
+            input_ids=self._decoder_start_ids(len(questions), question_embeds.device),
+            encoder_hidden_states=question_embeds,
+            encoder_attention_mask=text_inputs["attention_mask"],
+            return_dict=True
+        ).logits[:, -1, yes_no_ids]
+        yes_probs = torch.softmax(logits.float(), dim=-1)[:, 0]
+        return yes_probs.tolist()
+    
+    def _answer(self, image, questions, frame_key=None):
+        """图像编码一次，所有问题填充为一个批次并在一次generate中解码"""
+        frame_key = self._resolve_frame_key(image, frame_key)
+        with self.backend.inference_context():
+            image_embeds = self._get_image_embeds(image, frame_key)
+            return self._answer_from_image_embeds(image_embeds, questions)
+    
+    def _score_yes_no(self, image, questions, frame_key=None):
+        """
+        是非题快速路径：只运行解码器第一步，比较"yes"和"no"两个token的得分
+        
+        Returns:
+            list: 每个问题回答"yes"的概率（在yes/no两个候选间归一化）
+        """
+        frame_key = self._resolve_frame_key(image, frame_key)
+        with self.backend.inference_context():
+            image_embeds = self._get_image_embeds(image, frame_key)
+            return self._score_from_image_embeds(image_embeds, questions)
+    
+    def _get_image_embeds_batch(self, images, frame_keys):
+        """多帧视觉特征：缓存未命中的帧合并为一个批次，只运行一次视觉编码器"""
+        image_embeds = [None] * len(images)
+        missing = []
+        for i, frame_key in enumerate(frame_keys):
+            cached = None if frame_key is None else self.vision_cache.get(frame_key, self.embeds_cache_kind)
+            if cached is not None:
+                image_embeds[i] = cached.to(self.dtype)
+            else:
+                missing.append(i)
+        
+        if missing:
+            pixel_values = torch.cat([self._get_pixel_values(images[i], frame_keys[i]) for i in missing])
+            encoded = self._encode_image(pixel_values)
+            for row, i in enumerate(missing):
+                image_embeds[i] = encoded[row:row + 1]
+                if frame_keys[i] is not None:
+                    self.vision_cache.put(frame_keys[i], self.embeds_cache_kind, image_embeds[i])
+        return image_embeds
+    
+    def answer_frames(self, requests, binary=False, cancel_event=None, deadline=None):
+        """
+        多帧多问题合批：所有帧的视觉编码合并为一次，所有 (帧, 问题) 对在一次generate或一次打分中完成
+        
+        Args:
+            requests: [(image, questions, frame_key), ...]，frame_key可为None
+            binary: 是否使用是非题单步打分
+            cancel_event: 可选的threading.Event，被设置后在下一个解码步停止（结果不完整，由调用方丢弃）
+            deadline: 可选的截止时间（time.time()时间戳），超过后同样停止生成
+            （是非题打分只有一步解码，不受这两个参数影响）
             
-            return answer
+        Returns:
+            list: 与requests一一对应，每项为batch_answer_questions格式的结果列表
+        """
+        requests = [(image, list(questions), frame_key) for image, questions, frame_key in requests]
+        if not any(questions for _, questions, _ in requests):
+            return [[] for _ in requests]
+        try:
+            frame_keys = [self._resolve_frame_key(image, frame_key) for image, _, frame_key in requests]
+            with self.backend.inference_context():
+                image_embeds = self._get_image_embeds_batch([image for image, _, _ in requests], frame_keys)
+                # 每个问题对应其所属帧的特征
+                pair_embeds = torch.cat([
+                    embeds.expand(len(questions), -1, -1)
+                    for embeds, (_, questions, _) in zip(image_embeds, requests) if questions
+                ])
+                all_questions = [question for _, questions, _ in requests for question in questions]
+                if binary:
+                    outputs = self._score_from_image_embeds(pair_embeds, all_questions)
+                else:
+                    # time_budget=0：图像描述的时间预算不适用于VQA，只保留取消条件
+                    stopping_criteria = build_stopping_criteria(0, cancel_event, deadline)
+                    outputs = self._answer_from_image_embeds(pair_embeds, all_questions, stopping_criteria)
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 多帧批量VQA处理出错: {e}")
+            outputs = [None] * sum(len(questions) for _, questions, _ in requests)
+        
+        results = []
+        offset = 0
+        for _, questions, _ in requests:
+            frame_outputs = outputs[offset:offset + len(questions)]
+            offset += len(questions)
+            if binary:
+                results.append([
+                    {'question': question, 'answer': "处理失败", 'yes_prob': 0.0} if prob is None else
+                    {'question': question, 'answer': 'yes' if prob >= 0.5 else 'no', 'yes_prob': prob}
+                    for question, prob in zip(questions, frame_outputs)
+                ])
+            else:
+                results.append([
+                    {'question': question, 'answer': "处理失败" if answer is None else answer}
+                    for question, answer in zip(questions, frame_outputs)
+                ])
+        return results
+    
+    def answer_question(self, image, question, frame_key=None):
+        """对图片回答问题"""
+        try:
+            return self._answer(image, [question], frame_key)[0]
         except Exception as e:
             print(f"[{time.strftime('%H:%M:%S')}] VQA处理出错: {e}")
             return "处理失败"
     
-    def batch_answer_questions(self, image, questions):
-        """批量回答多个问题"""
-        results = []
-        for question in questions:
-            answer = self.answer_question(image, question)
-            results.append({'question': question, 'answer': answer})
-        return results
+    def batch_answer_yes_no(self, image, questions, frame_key=None, yes_threshold=0.5):
+        """
+        批量回答是非题（单步打分，不做自回归生成）
+        
+        Args:
+            image: 图片（文件路径、numpy数组或PIL Image）
+            questions: 是非题列表
+            frame_key: 可选的帧键，传入后与其他模型共享该帧的视觉特征
+            yes_threshold: "yes"概率达到该值时回答"yes"
+            
+        Returns:
+            list: [{'question': 问题, 'answer': 'yes'/'no', 'yes_prob': 回答yes的概率}, ...]
+        """
+        if not questions:
+            return []
+        try:
+            yes_probs = self._score_yes_no(image, questions, frame_key)
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 是非题VQA处理出错: {e}")
+            return [{'question': question, 'answer': "处理失败", 'yes_prob': 0.0} for question in questions]
+        return [
+            {'question': question, 'answer': 'yes' if prob >= yes_threshold else 'no', 'yes_prob': prob}
+            for question, prob in zip(questions, yes_probs)
+        ]
+    
+    def batch_answer_questions(self, image, questions, frame_key=None, binary=False):
+        """
+        批量回答多个问题
+        
+        Args:
+            image: 图片（文件路径、numpy数组或PIL Image）
+            questions: 问题列表
+            frame_key: 可选的帧键，传入后与其他模型共享该帧的视觉特征
+            binary: 问题均为是非题时使用单步打分的快速路径，结果额外包含'yes_prob'
+            
+        Returns:
+            list: [{'question': 问题, 'answer': 回答}, ...]
+        """
+        if not questions:
+            return []
+        if binary:
+            return self.batch_answer_yes_no(image, questions, frame_key)
+        try:
+            answers = self._answer(image, questions, frame_key)
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] 批量VQA处理出错: {e}")
+            answers = ["处理失败"] * len(questions)
+        return [{'question': question, 'answer': answer} for question, answer in zip(questions, answers)]